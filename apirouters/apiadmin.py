@@ -5,6 +5,10 @@ from sql import schemes, crud
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError, DataError
 from auth.token import get_current_user, get_db, validate_username
+from media.images import thumbnail_url
+from events.audit import audit_log
+from config import settings
+from .responses import FastJSONResponse, rows_response, parse_fields, projected_response
 
 admin_router = APIRouter(
     prefix="/admin",
@@ -12,9 +16,19 @@ admin_router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
+def with_thumbnail(user):
+    
+    scheme = schemes.Student if user.role == "student" else schemes.Professor
+    
+    user_data = {field: getattr(user, field) for field in scheme.__fields__}
+    user_data["profile_picture"] = thumbnail_url(user.profile_picture)
+    
+    return user_data
+
 # Ruta para obtener todos los usuarios (students y professors)
 @admin_router.get("/get-all-users", response_model=List[schemes.Professor | schemes.Student])
-def get_all_users(payload: dict = Depends(get_current_user),
+def get_all_users(fields: str | None = None,
+                  payload: dict = Depends(get_current_user),
                   db: Session = Depends(get_db)):
     
     if not payload["role"] == "admin":
@@ -23,15 +37,42 @@ def get_all_users(payload: dict = Depends(get_current_user),
             status_code=403,
             detail="You do not have permission to access this resource.",
         )
+        
+    # '?fields=username,name' limita tanto las columnas de la consulta como la respuesta.
+    fields = parse_fields(fields, allowed=tuple(dict.fromkeys(crud.STUDENT_LIST_FIELDS + crud.PROFESSOR_LIST_FIELDS)))
+    
+    if fields:
+        
+        fields = crud.user_list_fields(fields)
+        users = [dict(row._mapping) for row in crud.get_all_users_rows(db=db, fields=fields)]
+        
+        if "profile_picture" in fields:
+            for user in users:
+                user["profile_picture"] = thumbnail_url(user["profile_picture"])
+                
+        return projected_response(users, fields, schemes.Student, schemes.Professor,
+                                  fast=settings.fast_json_responses)
+    
+    if settings.fast_json_responses:
+        
+        users = crud.get_all_users_rows(db=db)
+        
+        return FastJSONResponse(content=[
+            {**row._mapping, "profile_picture": thumbnail_url(row.profile_picture)} for row in users
+        ])
     
     try:
-        return crud.get_all_users(db=db)
+        users = crud.get_all_users(db=db)
     except Exception as e:
         return str(e)
     
+    # Los listados devuelven la miniatura en lugar de la imagen completa.
+    return [with_thumbnail(user) for user in users]
+    
 # Ruta para obtener todos los cursos '/admin/get-all-courses'
 @admin_router.get("/get-all-courses", response_model=List[schemes.Course])
-def get_all_courses(payload: dict = Depends(get_current_user),
+def get_all_courses(fields: str | None = None,
+                    payload: dict = Depends(get_current_user),
                     db: Session = Depends(get_db)):
     
     if not payload["role"] == "admin":
@@ -41,6 +82,17 @@ def get_all_courses(payload: dict = Depends(get_current_user),
             detail="You do not have permission to access this resource.",
         )
         
+    fields = parse_fields(fields, allowed=crud.COURSE_LIST_FIELDS)
+    
+    if fields:
+        
+        courses = [dict(row._mapping) for row in crud.get_all_courses_rows(db=db, fields=fields)]
+        
+        return projected_response(courses, fields, schemes.Course, fast=settings.fast_json_responses)
+        
+    if settings.fast_json_responses:
+        return rows_response(crud.get_all_courses_rows(db=db))
+        
     try:
         courses = crud.get_all_courses(db=db)
     except Exception as e:
@@ -109,6 +161,8 @@ def create_professor(professor: schemes.ProfessorCreate, payload: dict = Depends
         else:
             raise HTTPException(status_code=400, detail="Integrity error")
         
+    audit_log.record("create_professor", actor=payload, target=professor.username)
+        
     return db_professor
 
 # Ruta para crear un estudiante '/admin/create-student'.
@@ -142,6 +196,8 @@ def create_student(student: schemes.StudentCreate, payload: dict = Depends(get_c
         else:
             raise HTTPException(status_code=400, detail="Integrity error")
         
+    audit_log.record("create_student", actor=payload, target=student.username)
+        
     return db_student
 
 # Ruta para crear un curso '/admin/create-course'
@@ -187,6 +243,9 @@ def create_course(course: schemes.CourseCreate,
         else:
             raise HTTPException(status_code=400, detail="Integrity error")
         
+    audit_log.record("create_course", actor=payload, target=course.name,
+                     details={"professor_id": course.professor_id})
+        
     return course
 
 # Ruta para inscribir un estudiante a un curso '/admin/inscribe-student'
@@ -240,6 +299,9 @@ def inscribe_student(inscription: schemes.InscriptionCreate,
         else:
             raise HTTPException(status_code=400, detail="Integrity error")
         
+    audit_log.record("inscribe_student", actor=payload, target=course.name,
+                     details={"student_id": inscription.student_id, "course_id": inscription.course_id})
+        
     return db_inscription
     
 # Ruta para editar la contraseña de un curso '/admin/update-password-course'
@@ -272,6 +334,8 @@ def update_password_course(course_name: str,
         
         raise HTTPException(status_code=400, detail="Integrity error")
     
+    audit_log.record("update_password_course", actor=payload, target=course_name)
+    
     return {
         "status_code": 200,
         "detail": f"Password of the course {course_name} update."
@@ -300,6 +364,8 @@ def delete_course(course_name: str, current_user: dict = Depends(get_current_use
         
     message = crud.delete_course(db=db, course_name=course_name)
     
+    audit_log.record("delete_course", actor=current_user, target=course_name)
+    
     return {
         "status_code": 200,
         "message": message
@@ -0,0 +1,91 @@
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from sql import schemes, crud
+from auth.token import get_db, get_current_user
+
+archive_router = APIRouter(
+    prefix="/archive",
+    tags=["Archive"],
+    responses={404: {"description": "Not found"}},
+)
+
+# Función para obtener el filtro de cursos archivados que puede ver el usuario:
+# el administrador ve todos, el profesor los suyos y el estudiante los que cursó.
+def archive_scope(payload: dict, db: Session):
+    
+    if payload["role"] == "admin":
+        return {}
+    
+    if payload["role"] == "professor":
+        professor = crud.get_professor_by_username(db=db, username=payload["username"])
+        
+        if professor:
+            return {"professor_id": professor.professor_id}
+    
+    if payload["role"] == "student":
+        student = crud.get_student_by_username(db=db, username=payload["username"])
+        
+        if student:
+            return {"student_id": student.student_id}
+    
+    raise HTTPException(status_code=403, detail="You can't access the archive.")
+
+# Ruta para listar los cursos archivados '/archive/courses'
+@archive_router.get("/courses", response_model=List[schemes.ArchivedCourse])
+def get_archived_courses(semester: int | None = None,
+                         limit: int = 50,
+                         offset: int = 0,
+                         payload: dict = Depends(get_current_user),
+                         db: Session = Depends(get_db)):
+    
+    scope = archive_scope(payload=payload, db=db)
+    
+    return crud.get_archived_courses(db=db, semester=semester, limit=min(max(limit, 1), 200),
+                                     offset=max(offset, 0), **scope)
+
+# Ruta para obtener un curso archivado con sus tareas '/archive/courses/{course_id}'
+@archive_router.get("/courses/{course_id}", response_model=schemes.ArchivedCourseDetail)
+def get_archived_course(course_id: int,
+                        payload: dict = Depends(get_current_user),
+                        db: Session = Depends(get_db)):
+    
+    scope = archive_scope(payload=payload, db=db)
+    course = crud.get_archived_course(db=db, course_id=course_id)
+    
+    if course is None:
+        raise HTTPException(status_code=404, detail="Archived course not found.")
+    
+    if "professor_id" in scope and course.professor_id != scope["professor_id"]:
+        raise HTTPException(status_code=403, detail="You're not the professor of this course.")
+    
+    if "student_id" in scope and not crud.was_student_inscribed(db=db, course_id=course_id,
+                                                                 student_id=scope["student_id"]):
+        raise HTTPException(status_code=403, detail="You weren't inscribed in this course.")
+    
+    course_data = {field: getattr(course, field) for field in schemes.ArchivedCourse.__fields__}
+    
+    return {
+        **course_data,
+        "students": crud.count_archived_inscriptions(db=db, course_id=course_id),
+        "tasks": crud.get_archived_tasks_of_course(db=db, course_id=course_id),
+    }
+
+# Ruta para obtener las notas archivadas del estudiante '/archive/notes'
+@archive_router.get("/notes", response_model=List[schemes.ArchivedNote])
+def get_archived_notes(semester: int | None = None,
+                       student = Depends(get_current_user),
+                       db: Session = Depends(get_db)):
+    
+    if not student["role"] == "student":
+        
+        raise HTTPException(
+            status_code=403,
+            detail="You're not a student.",
+        )
+    
+    student_id = archive_scope(payload=student, db=db)["student_id"]
+    
+    return [row._asdict() for row in crud.get_archived_notes_of_student(db=db, student_id=student_id,
+                                                                        semester=semester)]
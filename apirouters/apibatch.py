@@ -0,0 +1,247 @@
+import json
+from urllib.parse import urlencode
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from starlette.concurrency import run_in_threadpool
+from starlette.exceptions import HTTPException as StarletteHTTPException
+from sql import schemes, crud
+from sql.database import SessionLocal, get_engine
+from sql.sqlite import writer_owner
+from auth.token import get_current_user
+from events.audit import audit_log
+from monitoring.requests import MetricsMiddleware
+from config import settings
+
+batch_router = APIRouter(
+    tags=["Batch"],
+    responses={404: {"description": "Not found"}},
+)
+
+BATCH_METHODS = {"GET", "POST", "PUT", "PATCH", "DELETE"}
+
+# Función para construir el scope ASGI de una operación del lote a partir de la
+# petición original: mismo usuario y cabecera de autorización, sesión compartida.
+def operation_scope(request: Request, operation: schemes.BatchOperation, body: bytes, db, payload):
+    
+    path, _, query_string = operation.path.partition("?")
+    
+    if operation.query:
+        extra = urlencode(operation.query, doseq=True)
+        query_string = f"{query_string}&{extra}" if query_string else extra
+    
+    headers = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+    authorization = request.headers.get("authorization")
+    
+    if authorization:
+        headers.append((b"authorization", authorization.encode("latin-1")))
+    
+    scope = {
+        "type": "http",
+        "asgi": request.scope.get("asgi", {"version": "3.0"}),
+        "http_version": request.scope.get("http_version", "1.1"),
+        "method": operation.method.upper(),
+        "scheme": request.scope.get("scheme", "http"),
+        "server": request.scope.get("server"),
+        "client": request.scope.get("client"),
+        "root_path": request.scope.get("root_path", ""),
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query_string.encode(),
+        "headers": headers,
+        "app": request.app,
+        "state": request.scope.get("state", {}),
+        "batch_db": db,
+        "batch_principal": payload,
+    }
+    
+    return scope
+
+# Función para obtener la capa de la aplicación por la que entran las operaciones
+# del lote: desde MetricsMiddleware hacia dentro. Así cada operación pasa por las
+# mismas instancias (con su estado) de métricas, límites de peticiones,
+# idempotencia y carriles de carga que una petición normal a su ruta.
+def operation_app(app):
+    
+    layer = app.middleware_stack
+    
+    while layer is not None and not isinstance(layer, MetricsMiddleware):
+        layer = getattr(layer, "app", None)
+    
+    return layer or app.middleware_stack
+
+# Función para ejecutar una operación del lote contra el router de la aplicación y
+# recoger su respuesta en memoria.
+async def run_operation(request: Request, operation: schemes.BatchOperation, db, payload):
+    
+    body = b"" if operation.body is None else json.dumps(operation.body).encode("utf-8")
+    scope = operation_scope(request, operation, body, db, payload)
+    
+    received = False
+    
+    async def receive():
+        
+        nonlocal received
+        
+        if received:
+            return {"type": "http.disconnect"}
+        
+        received = True
+        return {"type": "http.request", "body": body, "more_body": False}
+    
+    status_code = 500
+    content_type = ""
+    chunks = []
+    
+    async def send(message):
+        
+        nonlocal status_code, content_type
+        
+        if message["type"] == "http.response.start":
+            status_code = message["status"]
+            
+            for name, value in message.get("headers", []):
+                if name.lower() == b"content-type":
+                    content_type = value.decode("latin-1")
+        
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+    
+    try:
+        await operation_app(request.app)(scope, receive, send)
+    except StarletteHTTPException as exc:
+        return schemes.BatchOperationResult(status=exc.status_code, body={"detail": exc.detail})
+    except Exception:
+        return schemes.BatchOperationResult(status=500, body={"detail": "Internal Server Error"})
+    
+    raw = b"".join(chunks)
+    
+    if not raw:
+        content = None
+    elif "json" in content_type:
+        content = json.loads(raw)
+    else:
+        content = raw.decode("utf-8", errors="replace")
+    
+    return schemes.BatchOperationResult(status=status_code, body=content)
+
+# Ruta para ejecutar varias operaciones de la API en una sola petición '/batch'
+@batch_router.post("/batch", response_model=schemes.BatchResponse)
+async def run_batch(batch: schemes.BatchRequest, request: Request,
+                    payload: dict = Depends(get_current_user)):
+    
+    if not batch.requests:
+        raise HTTPException(status_code=400, detail="The batch is empty")
+    
+    if len(batch.requests) > settings.batch_max_requests:
+        raise HTTPException(status_code=413, detail=f"A batch can contain at most {settings.batch_max_requests} requests")
+    
+    for operation in batch.requests:
+        
+        if operation.method.upper() not in BATCH_METHODS:
+            raise HTTPException(status_code=400, detail=f"Method {operation.method} is not allowed in a batch")
+        
+        path = operation.path.partition("?")[0]
+        
+        if not path.startswith("/") or path.rstrip("/") in settings.batch_excluded_routes:
+            raise HTTPException(status_code=400, detail=f"Path {operation.path} is not allowed in a batch")
+    
+    if not batch.atomic:
+        return await run_independent(request, batch.requests, payload)
+    
+    return await run_atomic(request, batch.requests, payload)
+
+# Cada operación hace commit por su cuenta; un fallo no afecta a las demás.
+async def run_independent(request: Request, operations, payload):
+    
+    db = SessionLocal()
+    responses = []
+    
+    try:
+        
+        for operation in operations:
+            result = await run_operation(request, operation, db, payload)
+            
+            # Una operación fallida no debe dejar la sesión a medias para la siguiente.
+            if result.status >= 400:
+                await run_in_threadpool(db.rollback)
+            
+            responses.append(result)
+    
+    finally:
+        await run_in_threadpool(db.close)
+    
+    return schemes.BatchResponse(committed=True, responses=responses)
+
+# Función para abrir la conexión y la transacción externa de un lote atómico.
+# pysqlite abre y cierra las transacciones por su cuenta y rompe los SAVEPOINT, así
+# que en SQLite se desactiva en esta conexión y se emite el BEGIN a mano.
+def open_transaction():
+    
+    connection = get_engine().connect()
+    transaction = connection.begin()
+    
+    if connection.dialect.name == "sqlite":
+        driver_connection = connection.connection.driver_connection
+        connection.info["isolation_level"] = driver_connection.isolation_level
+        driver_connection.isolation_level = None
+        driver_connection.execute("BEGIN")
+        
+    return connection, transaction
+
+def close_transaction(connection, transaction):
+    
+    if transaction.is_active:
+        transaction.rollback()
+        
+    # La conexión vuelve al pool con el comportamiento por defecto de pysqlite.
+    if "isolation_level" in connection.info:
+        connection.connection.driver_connection.isolation_level = connection.info.pop("isolation_level")
+        
+    connection.close()
+
+# Todas las operaciones comparten una transacción: los commits de cada ruta solo
+# liberan un savepoint y la primera respuesta de error deshace el lote completo.
+# Los eventos y los registros de auditoría se emiten solo si el lote hace commit.
+async def run_atomic(request: Request, operations, payload):
+    
+    connection, transaction = await run_in_threadpool(open_transaction)
+    owner = writer_owner.set(connection.info)
+    db = SessionLocal(bind=connection, join_transaction_mode="create_savepoint")
+    db.info["defer_after_commit"] = True
+    
+    responses = []
+    failed = False
+    
+    try:
+        
+        with audit_log.deferred() as audit_events:
+            
+            for operation in operations:
+                
+                if failed:
+                    responses.append(schemes.BatchOperationResult(
+                        status=424, body={"detail": "Not executed because a previous request in the batch failed"}
+                    ))
+                    continue
+                
+                result = await run_operation(request, operation, db, payload)
+                responses.append(result)
+                failed = result.status >= 400
+            
+            db.info.pop("defer_after_commit")
+            
+            if failed:
+                await run_in_threadpool(transaction.rollback)
+                crud.after_rollback(db)
+            else:
+                await run_in_threadpool(transaction.commit)
+                crud.after_commit(db)
+                audit_log.commit_deferred(audit_events)
+    
+    finally:
+        db.info.pop("defer_after_commit", None)
+        await run_in_threadpool(db.close)
+        await run_in_threadpool(close_transaction, connection, transaction)
+        writer_owner.reset(owner)
+    
+    return schemes.BatchResponse(committed=not failed, responses=responses)
@@ -0,0 +1,45 @@
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import OperationalError
+from sql import schemes, crud
+from auth.token import get_current_user, get_db
+
+course_router = APIRouter(
+    prefix="/courses",
+    tags=["Courses"],
+    responses={404: {"description": "Not found"}},
+)
+
+# Ruta para buscar cursos por nombre, descripción y programa '/courses/search'
+@course_router.get("/search", response_model=schemes.CourseSearchPage)
+def search_courses(q: str,
+                   semester: int | None = None,
+                   program: str | None = None,
+                   limit: int = 20,
+                   offset: int = 0,
+                   payload: dict = Depends(get_current_user),
+                   db: Session = Depends(get_db)):
+    
+    limit = min(max(limit, 1), 100)
+    
+    try:
+        results = crud.search_courses(db=db, query=q, semester=semester, program=program,
+                                      limit=limit, offset=max(offset, 0))
+    except OperationalError:
+        raise HTTPException(status_code=400, detail="Invalid search query.")
+    
+    return {
+        "results": results,
+        "next_offset": max(offset, 0) + limit if len(results) == limit else None
+    }
+
+# Ruta para autocompletar nombres de cursos '/courses/autocomplete'
+@course_router.get("/autocomplete", response_model=List[schemes.CourseSuggestion])
+def autocomplete_courses(q: str,
+                         limit: int = 10,
+                         payload: dict = Depends(get_current_user),
+                         db: Session = Depends(get_db)):
+    
+    return crud.autocomplete_courses(db=db, prefix=q, limit=min(max(limit, 1), 50))
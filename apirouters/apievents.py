@@ -0,0 +1,132 @@
+import asyncio
+import json
+from datetime import timedelta
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from jose import JWTError
+from starlette.concurrency import run_in_threadpool
+from sql import crud
+from sql.database import SessionLocal
+from auth.keys import key_ring
+from auth.revocation import revocation_store
+from auth.token import create_access_token, get_current_user, oauth2_scheme, token_expiration
+from events.broker import broker
+from config import settings
+
+events_router = APIRouter(
+    prefix="/events",
+    tags=["Events"],
+    responses={404: {"description": "Not found"}},
+)
+
+# Función para obtener los canales a los que se suscribe el usuario autenticado.
+def principal_channels(payload: dict):
+    
+    if payload["role"] == "admin":
+        return ["admin"]
+    
+    db = SessionLocal()
+    
+    try:
+        
+        if payload["role"] == "professor":
+            professor = crud.get_professor_by_username(db=db, username=payload["username"])
+            return [f"professor:{professor.professor_id}"] if professor else None
+        
+        if payload["role"] == "student":
+            student = crud.get_student_by_username(db=db, username=payload["username"])
+            return [f"student:{student.student_id}"] if student else None
+        
+    finally:
+        db.close()
+        
+    return None
+
+def format_event(event: dict):
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event['data'], default=str)}\n\n"
+
+# Función para canjear un ticket de '/events/ticket'. El jti se reclama en
+# revoked_tokens, así que cada ticket sirve una sola vez en cualquier worker.
+def redeem_ticket(ticket: str):
+    
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid or expired ticket",
+    )
+    
+    try:
+        payload = key_ring.decode(ticket)
+    except JWTError:
+        raise credentials_exception
+    
+    if not payload.get("type") == "stream" or not payload.get("jti"):
+        raise credentials_exception
+    
+    if not revocation_store.claim(payload["jti"], token_expiration(payload)):
+        raise credentials_exception
+    
+    return payload
+
+# Ruta para obtener un ticket de un solo uso para el feed de eventos '/events/ticket'.
+# EventSource no permite cabeceras, así que el navegador pasa el ticket como
+# ?ticket= en lugar del access token, que acabaría en los logs de acceso.
+@events_router.post("/ticket")
+def create_stream_ticket(payload: dict = Depends(get_current_user)):
+    
+    ticket = create_access_token(
+        data={"username": payload["username"], "role": payload["role"], "type": "stream"},
+        expires_delta=timedelta(seconds=settings.events_ticket_ttl)
+    )
+    
+    return {"ticket": ticket, "expires_in": settings.events_ticket_ttl}
+
+# Ruta con el feed de eventos del usuario (Server-Sent Events) '/events/stream'.
+# Acepta el token en la cabecera Authorization o un ticket de '/events/ticket'.
+@events_router.get("/stream")
+async def stream_events(request: Request, ticket: str | None = None):
+    
+    if ticket is not None:
+        payload = await run_in_threadpool(redeem_ticket, ticket)
+    else:
+        token = await oauth2_scheme(request)
+        payload = await run_in_threadpool(get_current_user, token=token)
+        
+    channels = await run_in_threadpool(principal_channels, payload)
+    
+    if not channels:
+        
+        raise HTTPException(
+            status_code=404,
+            detail="User not found.",
+        )
+        
+    subscription = broker.subscribe(channels)
+    
+    async def event_stream():
+        
+        try:
+            
+            yield "retry: 5000\n\n"
+            
+            while True:
+                
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), timeout=settings.events_heartbeat_interval)
+                except asyncio.TimeoutError:
+                    
+                    if await request.is_disconnected():
+                        break
+                    
+                    yield ": keep-alive\n\n"
+                    continue
+                
+                yield format_event(event)
+                
+        finally:
+            broker.unsubscribe(subscription)
+            
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
@@ -0,0 +1,150 @@
+import os
+
+from fastapi import APIRouter, Depends, HTTPException, Request, UploadFile, File
+from fastapi.responses import FileResponse, Response
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from sql import crud
+from auth.token import get_current_user, get_db
+from config import settings
+from media.images import process_image_async, variant_path, image_url, profile_picture_url, \
+    InvalidImageError, UnsupportedImageError
+
+media_router = APIRouter(
+    prefix="/media",
+    tags=["Media"],
+    responses={404: {"description": "Not found"}},
+)
+
+# Las variantes se direccionan por contenido, así que pueden cachearse indefinidamente.
+IMAGE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+async def read_image(file: UploadFile):
+    
+    data = await file.read(settings.max_upload_size + 1)
+    
+    if len(data) > settings.max_upload_size:
+        
+        raise HTTPException(
+            status_code=413,
+            detail="Image too large.",
+        )
+        
+    try:
+        digest = await process_image_async(data)
+    except UnsupportedImageError:
+        
+        raise HTTPException(
+            status_code=415,
+            detail="Unsupported image format.",
+        )
+    except InvalidImageError:
+        
+        raise HTTPException(
+            status_code=400,
+            detail="Invalid image.",
+        )
+        
+    return digest
+
+def get_principal(db: Session, payload: dict):
+    
+    if payload["role"] == "admin":
+        return crud.get_admin_by_username(db=db, username=payload["username"])
+    elif payload["role"] == "professor":
+        return crud.get_professor_by_username(db=db, username=payload["username"])
+    elif payload["role"] == "student":
+        return crud.get_student_by_username(db=db, username=payload["username"])
+    
+    return None
+
+# Ruta para subir la foto de perfil del usuario '/media/upload-profile-picture'
+@media_router.post("/upload-profile-picture", response_model=dict)
+async def upload_profile_picture(file: UploadFile = File(...),
+                                 payload: dict = Depends(get_current_user),
+                                 db: Session = Depends(get_db)):
+    
+    user = await run_in_threadpool(get_principal, db, payload)
+    
+    if not user:
+        
+        raise HTTPException(
+            status_code=404,
+            detail="User not found.",
+        )
+        
+    digest = await read_image(file)
+    
+    owner = f"{payload['role']}-{payload['username']}"
+    
+    await run_in_threadpool(crud.update_profile_picture, db, user, profile_picture_url(digest, owner))
+    
+    return {size: image_url(digest, size) for size in settings.thumbnail_sizes}
+
+# Ruta para subir la imagen de un curso '/media/upload-course-picture'
+@media_router.post("/upload-course-picture", response_model=dict)
+async def upload_course_picture(course_name: str,
+                                file: UploadFile = File(...),
+                                payload: dict = Depends(get_current_user),
+                                db: Session = Depends(get_db)):
+    
+    if payload["role"] not in ("admin", "professor"):
+        
+        raise HTTPException(
+            status_code=403,
+            detail="You do not have permission to access this resource.",
+        )
+        
+    course = await run_in_threadpool(crud.get_course_by_name, db, course_name)
+    
+    if not course:
+        
+        raise HTTPException(
+            status_code=404,
+            detail="Course not found.",
+        )
+        
+    if payload["role"] == "professor":
+        
+        professor = await run_in_threadpool(crud.get_professor_by_username, db, payload["username"])
+        
+        if not course.professor_id == professor.professor_id:
+            
+            raise HTTPException(
+                status_code=403,
+                detail="This is not your course.",
+            )
+            
+    digest = await read_image(file)
+    
+    await run_in_threadpool(crud.update_profile_picture, db, course, image_url(digest))
+    
+    return {size: image_url(digest, size) for size in settings.thumbnail_sizes}
+
+# Ruta para servir una variante de una imagen '/media/images/{digest}/{size}.jpg'
+@media_router.get("/images/{digest}/{size}.jpg")
+def get_image(digest: str, size: str, request: Request):
+    
+    if size not in settings.thumbnail_sizes or not digest.isalnum():
+        
+        raise HTTPException(
+            status_code=404,
+            detail="Image not found.",
+        )
+        
+    etag = f'"{digest}-{size}"'
+    headers = {"ETag": etag, "Cache-Control": IMAGE_CACHE_CONTROL}
+    
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    
+    path = variant_path(digest, size)
+    
+    if not os.path.exists(path):
+        
+        raise HTTPException(
+            status_code=404,
+            detail="Image not found.",
+        )
+        
+    return FileResponse(path, media_type="image/jpeg", headers=headers)
@@ -0,0 +1,28 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse, PlainTextResponse
+from monitoring.metrics import REGISTRY
+from monitoring.warmup import readiness
+from config import settings
+
+monitoring_router = APIRouter(
+    prefix="",
+    tags=["Monitoring"],
+    responses={404: {"description": "Not found"}},
+)
+
+# Ruta con las métricas en formato de texto de Prometheus '/metrics'
+@monitoring_router.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+# Ruta para el balanceador '/ready': 200 solo cuando el worker terminó el calentamiento
+@monitoring_router.get("/ready")
+def get_ready():
+    
+    status = readiness.status()
+    
+    if status["status"] == "ready":
+        return status
+    
+    return JSONResponse(status_code=503, content=status, headers={"Retry-After": str(settings.ready_retry_after)})
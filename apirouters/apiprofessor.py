@@ -1,9 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sql import schemes, crud
+from sql.cache import read_coalescer
+from events.audit import audit_log
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError, DataError
 from auth.token import get_current_user, get_db, validate_username, verify_password
 from typing import List
+from config import settings
+from .responses import FastJSONResponse, rows_response, make_etag, etag_matches, not_modified
 
 professor_router = APIRouter(
     prefix="/professor",
@@ -33,7 +37,8 @@ def get_professor(professor = Depends(get_current_user), db: Session = Depends(g
 
 # Ruta para obtener los cursos del profesor '/professor/get-courses'
 @professor_router.get("/get-courses", response_model=List[schemes.Course] | None)
-def get_courses_of_professor(professor = Depends(get_current_user), db: Session = Depends(get_db)):
+def get_courses_of_professor(request: Request, response: Response,
+                             professor = Depends(get_current_user), db: Session = Depends(get_db)):
     
     if not professor["role"] == "professor":
         
@@ -42,8 +47,24 @@ def get_courses_of_professor(professor = Depends(get_current_user), db: Session
             detail="You're not a professor.",
         )
         
+    # Si los cursos no han cambiado se responde 304 sin ejecutar la consulta principal.
+    versions = crud.get_table_versions(db=db, names=("courses",))
+    etag = make_etag("professor-courses", professor["username"], *versions)
+    
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    
+    response.headers["ETag"] = etag
+        
     db_professor = crud.get_professor_by_username(db=db, username=professor["username"])
     
+    if settings.fast_json_responses:
+        
+        fast_response = rows_response(crud.get_courses_of_professor_rows(db=db, professor_id=db_professor.professor_id))
+        fast_response.headers["ETag"] = etag
+        
+        return fast_response
+    
     try:
         courses = crud.get_courses_of_professor(db=db, professor_username=db_professor.username)
     except IntegrityError:
@@ -85,12 +106,21 @@ def get_students_of_course(course_name: str, payload: dict = Depends(get_current
         
     try:
         
-        students = crud.get_students_of_course_by_name(db=db, course_name=course_name)
+        # La autorización ya se comprobó, así que el resultado no depende del profesor.
+        # Con las versiones en la clave no se comparte un resultado anterior a una escritura.
+        versions = crud.get_table_versions(db=db, names=("courses", "inscriptions"))
+        students = read_coalescer.do(
+            "/professor/get-students-of-course", (course_name, *versions),
+            lambda: crud.get_students_of_course_by_name(db=db, course_name=course_name)
+        )
         
     except IntegrityError:
         
        raise HTTPException(status_code=400, detail="Integrity error")
    
+    if settings.fast_json_responses:
+        return FastJSONResponse(content=students)
+   
     return students
 
 # Ruta para inscribir a un estudiante en su curso '/professor/inscribe-student'
@@ -154,6 +184,9 @@ def inscribe_student(inscription: schemes.InscriptionCreate,
         else:
             raise HTTPException(status_code=400, detail="Integrity error")
         
+    audit_log.record("inscribe_student", actor=professor, target=course.name,
+                     details={"student_id": inscription.student_id, "course_id": inscription.course_id})
+        
     return db_inscription
 
 # Ruta para crear un curso '/professor/create-course'
@@ -178,19 +211,18 @@ def create_course(course: schemes.CourseCreate,
         detail="Name already exists.",
         )
     
-    db_professor = crud.get_professor_by_id(db=db, professor_id=course.professor_id)
-    
-    if not db_professor:
-        
-        raise HTTPException(
-        status_code=404,
-        detail="Professor ID not found.",
-        )
-        
     db_professor = crud.get_professor_by_username(db=db, username=professor["username"])
     
+    # Solo se busca el ID recibido cuando no es el del profesor autenticado.
     if not course.professor_id == db_professor.professor_id:
         
+        if not crud.get_professor_by_id(db=db, professor_id=course.professor_id):
+            
+            raise HTTPException(
+            status_code=404,
+            detail="Professor ID not found.",
+            )
+        
         raise HTTPException(
         status_code=403,
         detail=f"The ID '{course.professor_id}' is not your ID.",
@@ -203,6 +235,9 @@ def create_course(course: schemes.CourseCreate,
         
         raise HTTPException(status_code=400, detail="Integrity error")
         
+    audit_log.record("create_course", actor=professor, target=course.name,
+                     details={"professor_id": course.professor_id})
+        
     return db_course
 
 # Ruta para cambiar la contraseña de un curso '/professor/update-password-of-course' 
@@ -252,6 +287,8 @@ def update_course_password(course_name: str,
         
         raise HTTPException(status_code=400, detail="Integrity error")
     
+    audit_log.record("update_password_course", actor=payload, target=course_name)
+    
     return {
         "status_code": 200,
         "detail": f"Password of the course {course_name} update."
@@ -288,7 +325,140 @@ def delete_course(course_name: str, professor: dict = Depends(get_current_user),
         
     message = crud.delete_course(db=db, course_name=course_name)
     
+    audit_log.record("delete_course", actor=professor, target=course_name)
+    
     return {
         "status_code": 200,
         "message": message
-    }
\ No newline at end of file
+    }
+
+# Ruta para calificar la tarea de un estudiante '/professor/create-note'
+@professor_router.post("/create-note", response_model=schemes.Note)
+def create_note(note: schemes.NoteCreate,
+                professor: dict = Depends(get_current_user),
+                db: Session = Depends(get_db)):
+    
+    if not professor["role"] == "professor":
+        
+        raise HTTPException(
+            status_code=403,
+            detail="You're not a professor.",
+        )
+        
+    task = crud.get_task_by_id(db=db, task_id=note.task_id)
+    
+    if not task:
+        
+        raise HTTPException(
+            status_code=404,
+            detail="Task not found.",
+        )
+        
+    db_professor = crud.get_professor_by_username(db=db, username=professor["username"])
+    
+    if not task.course or not task.course.professor_id == db_professor.professor_id:
+        
+        raise HTTPException(
+            status_code=403,
+            detail="This is not your course, you can't grade this task.",
+        )
+        
+    if not crud.get_student_by_id(db=db, student_id=note.student_id):
+        
+        raise HTTPException(
+            status_code=404,
+            detail="Student not found.",
+        )
+        
+    if not crud.is_student_inscribed(db=db, course_id=task.course_id, student_id=note.student_id):
+        
+        raise HTTPException(
+            status_code=400,
+            detail="The student is not inscribed in this course.",
+        )
+        
+    try:
+        db_note = crud.create_note(db=db, note=note)
+        
+    except IntegrityError:
+        
+        raise HTTPException(status_code=400, detail="Integrity error")
+    
+    audit_log.record("create_note", actor=professor, target=str(note.task_id),
+                     details={"student_id": note.student_id, "note": note.note})
+    
+    return db_note
+
+# Ruta para obtener el ranking de los estudiantes en una tarea '/professor/task-ranking'
+@professor_router.get("/task-ranking", response_model=schemes.RankingPage)
+def get_task_ranking(task_id: int,
+                     after_rank: int | None = None,
+                     after_student_id: int | None = None,
+                     limit: int = 50,
+                     professor: dict = Depends(get_current_user),
+                     db: Session = Depends(get_db)):
+    
+    if not professor["role"] == "professor":
+        
+        raise HTTPException(
+            status_code=403,
+            detail="You're not a professor.",
+        )
+        
+    task = crud.get_task_by_id(db=db, task_id=task_id)
+    
+    if not task:
+        
+        raise HTTPException(
+            status_code=404,
+            detail="Task not found.",
+        )
+        
+    db_professor = crud.get_professor_by_username(db=db, username=professor["username"])
+    
+    if not task.course or not task.course.professor_id == db_professor.professor_id:
+        
+        raise HTTPException(
+            status_code=403,
+            detail="This is not your course, you can't see the ranking.",
+        )
+        
+    return crud.get_task_ranking(db=db, task_id=task_id, after_rank=after_rank,
+                                 after_student_id=after_student_id, limit=min(max(limit, 1), 200))
+
+# Ruta para obtener el ranking de los estudiantes en un curso '/professor/course-ranking'
+@professor_router.get("/course-ranking", response_model=schemes.RankingPage)
+def get_course_ranking(course_name: str,
+                       after_rank: int | None = None,
+                       after_student_id: int | None = None,
+                       limit: int = 50,
+                       professor: dict = Depends(get_current_user),
+                       db: Session = Depends(get_db)):
+    
+    if not professor["role"] == "professor":
+        
+        raise HTTPException(
+            status_code=403,
+            detail="You're not a professor.",
+        )
+        
+    course = crud.get_course_by_name(db=db, course_name=course_name)
+    
+    if not course:
+        
+        raise HTTPException(
+            status_code=404,
+            detail="Course not found.",
+        )
+        
+    db_professor = crud.get_professor_by_username(db=db, username=professor["username"])
+    
+    if not course.professor_id == db_professor.professor_id:
+        
+        raise HTTPException(
+            status_code=403,
+            detail="This is not your course, you can't see the ranking.",
+        )
+        
+    return crud.get_course_ranking(db=db, course_id=course.course_id, after_rank=after_rank,
+                                   after_student_id=after_student_id, limit=min(max(limit, 1), 200))
@@ -1,11 +1,13 @@
 from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.exc import IntegrityError, DataError
 from sqlalchemy.orm import Session
 from sql import schemes, models, crud
+from sql.cache import read_coalescer
 from auth.token import get_db, get_current_user, validate_username, verify_password
 from fastapi.exceptions import ResponseValidationError
+from .responses import make_etag, etag_matches, not_modified
 
 student_router = APIRouter(
     prefix="/student",
@@ -35,7 +37,8 @@ def get_student(student = Depends(get_current_user), db: Session = Depends(get_d
 
 # Ruta para obtener los cursos de un estudiante '/student/get-courses/
 @student_router.get("/get-courses", response_model=List[schemes.CourseResponse] | None)
-def get_courses(student = Depends(get_current_user), db: Session = Depends(get_db)):
+def get_courses(request: Request, response: Response,
+                student = Depends(get_current_user), db: Session = Depends(get_db)):
     
     if not student["role"] == "student":
         
@@ -44,13 +47,51 @@ def get_courses(student = Depends(get_current_user), db: Session = Depends(get_d
             detail="You're not a student.",
         )
         
+    # Si los datos no han cambiado se responde 304 sin ejecutar la consulta principal.
+    versions = crud.get_table_versions(db=db, names=("courses", "inscriptions", "professors"))
+    etag = make_etag("student-courses", student["username"], *versions)
+    
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    
+    response.headers["ETag"] = etag
+        
+    # Las versiones forman parte de la clave: el cuerpo sale del mismo estado que el ETag.
     try:
-        inscriptions = crud.get_course_info_of_student(db=db, student_username=student["username"])
+        inscriptions = read_coalescer.do(
+            "/student/get-courses", (student["username"], *versions),
+            lambda: crud.get_course_info_of_student(db=db, student_username=student["username"])
+        )
     except DataError:
         raise HTTPException(status_code=400, detail="Data Error")
     
     return inscriptions
 
+# Ruta para obtener en una sola llamada el perfil, cursos, tareas abiertas y notas '/student/dashboard'
+@student_router.get("/dashboard", response_model=schemes.StudentDashboard)
+def get_dashboard(student = Depends(get_current_user), db: Session = Depends(get_db)):
+    
+    if not student["role"] == "student":
+        
+        raise HTTPException(
+            status_code=403,
+            detail="You're not a student.",
+        )
+        
+    try:
+        dashboard = crud.get_student_dashboard(db=db, student_username=student["username"])
+    except DataError:
+        raise HTTPException(status_code=400, detail="Data Error")
+    
+    if not dashboard:
+        
+        raise HTTPException(
+            status_code=404,
+            detail="Student not found.",
+        )
+    
+    return dashboard
+
 # Ruta para inscribirse a un curso '/student/inscribe-course'
 @student_router.post("/inscribe-course", response_model=schemes.InscriptionCreate)
 def get_courses(course_id: int,
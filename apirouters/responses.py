@@ -0,0 +1,106 @@
+import json
+from functools import lru_cache
+from hashlib import sha1
+from typing import Any, Optional, get_type_hints
+
+from fastapi import HTTPException, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+from pydantic import create_model
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional, se usa json de la librería estándar en su lugar.
+    orjson = None
+
+# Respuesta JSON que serializa con orjson cuando está disponible.
+class FastJSONResponse(JSONResponse):
+    
+    def render(self, content: Any) -> bytes:
+        
+        if orjson is not None:
+            return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+        
+        return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+# Función para convertir filas de columnas (no entidades ORM) directamente en una
+# respuesta, sin volver a validar con los modelos de pydantic.
+def rows_response(rows) -> FastJSONResponse:
+    
+    return FastJSONResponse(content=[dict(row._mapping) for row in rows])
+
+# Función para construir un ETag a partir de los contadores de versión y el ámbito
+# (ruta y usuario) de la respuesta.
+def make_etag(*parts) -> str:
+    
+    digest = sha1(":".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+    
+    return f'"{digest}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    
+    if_none_match = request.headers.get("if-none-match")
+    
+    if not if_none_match:
+        return False
+    
+    candidates = [candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")]
+    
+    return "*" in candidates or etag in candidates
+
+def not_modified(etag: str) -> Response:
+    
+    return Response(status_code=304, headers={"ETag": etag})
+
+# Función para leer el parámetro 'fields' (nombres separados por comas) y validarlo
+# contra los campos que admite el listado.
+def parse_fields(fields: str | None, allowed) -> tuple | None:
+    
+    if fields is None:
+        return None
+    
+    requested = tuple(dict.fromkeys(field.strip() for field in fields.split(",") if field.strip()))
+    unknown = [field for field in requested if field not in allowed]
+    
+    if not requested or unknown:
+        
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid fields: {', '.join(unknown) or 'none given'}. Allowed fields: {', '.join(allowed)}.",
+        )
+    
+    return requested
+
+# Modelo de respuesta con solo los campos pedidos, a partir de uno o varios esquemas.
+# Los campos que no están en todos los esquemas (p. ej. semester en un listado de
+# estudiantes y profesores) son opcionales y se omiten cuando la fila no los tiene.
+@lru_cache(maxsize=128)
+def projection_model(fields: tuple, *scheme_types):
+    
+    hints = [get_type_hints(scheme) for scheme in scheme_types]
+    definitions = {}
+    
+    for field in fields:
+        
+        types = [scheme_hints[field] for scheme_hints in hints if field in scheme_hints]
+        
+        if len(types) == len(hints):
+            definitions[field] = (types[0], ...)
+        else:
+            definitions[field] = (Optional[types[0]], None)
+            
+    name = "".join(scheme.__name__ for scheme in scheme_types) + "Fields"
+    
+    return create_model(name, **definitions)
+
+# Función para construir la respuesta de un listado proyectado. Las filas siempre se
+# validan con el modelo dinámico; con las respuestas rápidas se serializan con orjson.
+def projected_response(rows, fields: tuple, *scheme_types, fast: bool = True) -> JSONResponse:
+    
+    model = projection_model(fields, *scheme_types)
+    content = [model(**row).model_dump(exclude_unset=True) for row in rows]
+    
+    if fast:
+        return FastJSONResponse(content=content)
+    
+    return JSONResponse(content=jsonable_encoder(content))
@@ -1,12 +1,24 @@
+from time import perf_counter
+
 from passlib.context import CryptContext
 from bcrypt import hashpw, gensalt
+from monitoring.metrics import PASSWORD_HASH_DURATION
+from monitoring.tracing import start_span
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 def hash_password(password: str):
-    salt = gensalt()
-    hashed_password = hashpw(password.encode("utf-8"), salt)
+    start = perf_counter()
+    with start_span("auth.hash_password"):
+        salt = gensalt()
+        hashed_password = hashpw(password.encode("utf-8"), salt)
+    PASSWORD_HASH_DURATION.observe(perf_counter() - start, "hash_password")
     return hashed_password
 
 def verify_password(plane_password, hashed_password):
-    return pwd_context.verify(plane_password, hashed_password)
\ No newline at end of file
+    start = perf_counter()
+    try:
+        with start_span("auth.verify_password"):
+            return pwd_context.verify(plane_password, hashed_password)
+    finally:
+        PASSWORD_HASH_DURATION.observe(perf_counter() - start, "verify_password")
@@ -0,0 +1,264 @@
+# Claves para firmar y verificar los JWT.
+#
+# Con ALGORITHM=HS256 (o cualquier HS*) se usa SECRET_KEY como hasta ahora. Con un
+# algoritmo asimétrico (RS256, ES256...) las claves privadas se leen de
+# JWT_KEYS_DIR como <kid>.pem; las claves retiradas pueden dejarse solo con su
+# parte pública como <kid>.pub.pem para que los tokens ya emitidos sigan siendo
+# válidos. Una clave nueva solo se publica en el JWKS; firma cuando se activa, con
+# JWT_ACTIVE_KID o con el fichero JWT_KEYS_DIR/active que escribe "activate".
+#
+# Rotación: generar una clave nueva (python -m auth.keys generate --kid <kid>),
+# esperar a que los demás servicios refresquen el JWKS (settings.jwks_max_age),
+# activarla (python -m auth.keys activate --kid <kid>), y sustituir la clave
+# antigua por su .pub.pem hasta que expiren los tokens que firmó. La primera clave
+# que se genera se activa directamente.
+import argparse
+import logging
+import os
+from threading import Lock
+from time import monotonic
+
+from dotenv import load_dotenv
+from jose import jwk, jwt, JWTError
+from config import settings
+
+logger = logging.getLogger("auth.keys")
+
+load_dotenv()
+
+SECRET_KEY = os.getenv("SECRET_KEY")
+ALGORITHM = os.getenv("ALGORITHM")
+JWT_KEYS_DIR = os.getenv("JWT_KEYS_DIR", "jwt_keys")
+JWT_ACTIVE_KID = os.getenv("JWT_ACTIVE_KID")
+
+# Fichero de JWT_KEYS_DIR con el kid activo.
+ACTIVE_KID_FILE = "active"
+
+def is_symmetric(algorithm: str | None):
+    return algorithm is None or algorithm.upper().startswith("HS")
+
+class KeyRing:
+    
+    def __init__(self, algorithm: str | None, keys_dir: str, active_kid: str | None = None):
+        self.algorithm = algorithm
+        self.keys_dir = keys_dir
+        self.active_kid = active_kid
+        self._lock = Lock()
+        self._signing_key = None
+        self._signing_kid = None
+        self._public_keys: dict = {}
+        self._jwks = {"keys": []}
+        self._loaded_mtime = None
+        self._next_check = 0.0
+        
+    def _directory_mtime(self):
+        
+        try:
+            return max([os.stat(self.keys_dir).st_mtime] + [
+                entry.stat().st_mtime for entry in os.scandir(self.keys_dir)
+                if entry.name.endswith(".pem") or entry.name == ACTIVE_KID_FILE
+            ])
+        except FileNotFoundError:
+            return None
+        
+    # Las claves se parsean una sola vez; solo se recargan si cambia el directorio.
+    def _ensure_loaded(self):
+        
+        if is_symmetric(self.algorithm) or monotonic() < self._next_check:
+            return
+        
+        with self._lock:
+            
+            if monotonic() < self._next_check:
+                return
+            
+            mtime = self._directory_mtime()
+            
+            # Sin directorio no hay nada que comparar: _load() falla con un error claro.
+            if mtime is None or mtime != self._loaded_mtime:
+                self._load()
+                self._loaded_mtime = mtime
+                
+            self._next_check = monotonic() + settings.jwt_keys_reload_interval
+            
+    def _load(self):
+        
+        private_keys = {}
+        public_keys = {}
+        oldest = None
+        
+        if not os.path.isdir(self.keys_dir):
+            raise RuntimeError(f"JWT key directory '{self.keys_dir}' does not exist; "
+                               f"create a key with 'python -m auth.keys generate --kid <kid>'.")
+        
+        for entry in sorted(os.scandir(self.keys_dir), key=lambda entry: entry.name):
+            
+            if not entry.name.endswith(".pem"):
+                continue
+            
+            with open(entry.path) as file:
+                pem = file.read()
+                
+            if entry.name.endswith(".pub.pem"):
+                public_keys[entry.name[:-len(".pub.pem")]] = jwk.construct(pem, self.algorithm)
+                continue
+            
+            kid = entry.name[:-len(".pem")]
+            private_keys[kid] = jwk.construct(pem, self.algorithm)
+            public_keys[kid] = private_keys[kid].public_key()
+            
+            if oldest is None or entry.stat().st_mtime < oldest[1]:
+                oldest = (kid, entry.stat().st_mtime)
+                
+        if not private_keys:
+            raise RuntimeError(f"No private key for {self.algorithm} found in '{self.keys_dir}'.")
+        
+        active_kid = self.active_kid or read_active_kid(self.keys_dir)
+        
+        if active_kid is not None and active_kid not in private_keys:
+            raise RuntimeError(f"Active JWT key '{active_kid}' has no private key in '{self.keys_dir}'.")
+        
+        # Sin clave activa solo se firma con la más antigua, nunca con una recién generada.
+        if active_kid is None and len(private_keys) > 1:
+            logger.warning("No active JWT key set; signing with the oldest key '%s'. "
+                           "Run 'python -m auth.keys activate --kid <kid>'.", oldest[0])
+            
+        signing_kid = active_kid or oldest[0]
+        
+        self._signing_kid = signing_kid
+        self._signing_key = private_keys[signing_kid]
+        self._public_keys = public_keys
+        self._jwks = {"keys": [
+            {**key.to_dict(), "kid": kid, "use": "sig", "alg": self.algorithm}
+            for kid, key in public_keys.items()
+        ]}
+        
+        logger.info("Loaded %d JWT key(s), signing with '%s'", len(public_keys), signing_kid)
+        
+    def encode(self, claims: dict):
+        
+        if is_symmetric(self.algorithm):
+            return jwt.encode(claims, SECRET_KEY, algorithm=self.algorithm)
+        
+        self._ensure_loaded()
+        
+        return jwt.encode(claims, self._signing_key, algorithm=self.algorithm, headers={"kid": self._signing_kid})
+    
+    def decode(self, token: str):
+        
+        if is_symmetric(self.algorithm):
+            return jwt.decode(token=token, key=SECRET_KEY, algorithms=[self.algorithm])
+        
+        self._ensure_loaded()
+        
+        kid = jwt.get_unverified_header(token).get("kid")
+        key = self._public_keys.get(kid)
+        
+        if key is None:
+            raise JWTError("Unknown key id.")
+        
+        return jwt.decode(token=token, key=key, algorithms=[self.algorithm])
+    
+    def jwks(self):
+        
+        self._ensure_loaded()
+        
+        return self._jwks
+
+def read_active_kid(keys_dir: str):
+    
+    try:
+        with open(os.path.join(keys_dir, ACTIVE_KID_FILE)) as file:
+            return file.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def write_active_kid(keys_dir: str, kid: str):
+    
+    path = os.path.join(keys_dir, ACTIVE_KID_FILE)
+    
+    with open(f"{path}.tmp", "w") as file:
+        file.write(kid + "\n")
+        
+    os.replace(f"{path}.tmp", path)
+
+key_ring = KeyRing(algorithm=ALGORITHM, keys_dir=JWT_KEYS_DIR, active_kid=JWT_ACTIVE_KID)
+
+def generate_private_key(algorithm: str) -> bytes:
+    
+    if algorithm.startswith("RS"):
+        
+        import rsa
+        
+        _, private_key = rsa.newkeys(2048)
+        
+        return private_key.save_pkcs1()
+    
+    if algorithm.startswith("ES"):
+        
+        from ecdsa import SigningKey, NIST256p, NIST384p, NIST521p
+        
+        curve = {"ES256": NIST256p, "ES384": NIST384p, "ES512": NIST521p}[algorithm]
+        
+        return SigningKey.generate(curve=curve).to_pem()
+    
+    raise SystemExit(f"Cannot generate keys for {algorithm}.")
+
+def main():
+    
+    parser = argparse.ArgumentParser(description="Manage JWT signing keys.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    generate = subparsers.add_parser("generate", help="Generate a new private key.")
+    generate.add_argument("--kid", required=True)
+    generate.add_argument("--algorithm", default=ALGORITHM or "RS256")
+    
+    activate = subparsers.add_parser("activate", help="Sign new tokens with a published key.")
+    activate.add_argument("--kid", required=True)
+    
+    retire = subparsers.add_parser("retire", help="Keep only the public part of a key.")
+    retire.add_argument("--kid", required=True)
+    retire.add_argument("--algorithm", default=ALGORITHM or "RS256")
+    
+    args = parser.parse_args()
+    os.makedirs(JWT_KEYS_DIR, exist_ok=True)
+    path = os.path.join(JWT_KEYS_DIR, f"{args.kid}.pem")
+    
+    if args.command == "generate":
+        
+        if os.path.exists(path):
+            raise SystemExit(f"{path} already exists.")
+        
+        with open(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600), "wb") as file:
+            file.write(generate_private_key(args.algorithm))
+            
+        if read_active_kid(JWT_KEYS_DIR) is None and not JWT_ACTIVE_KID:
+            write_active_kid(JWT_KEYS_DIR, args.kid)
+            print(f"Wrote {path} and activated it")
+        else:
+            print(f"Wrote {path}; it is only published until 'activate --kid {args.kid}'")
+            
+    elif args.command == "activate":
+        
+        if not os.path.exists(path):
+            raise SystemExit(f"{path} does not exist.")
+        
+        write_active_kid(JWT_KEYS_DIR, args.kid)
+        print(f"Activated {args.kid}")
+        
+    elif args.command == "retire":
+        
+        if args.kid in (read_active_kid(JWT_KEYS_DIR), JWT_ACTIVE_KID):
+            raise SystemExit(f"{args.kid} is the active key; activate another one first.")
+        
+        with open(path) as file:
+            public_key = jwk.construct(file.read(), args.algorithm).public_key()
+            
+        with open(os.path.join(JWT_KEYS_DIR, f"{args.kid}.pub.pem"), "wb") as file:
+            file.write(public_key.to_pem())
+            
+        os.remove(path)
+        print(f"Retired {args.kid}; only its public key remains.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+import logging
+from datetime import datetime, timedelta
+from hashlib import blake2b
+from math import ceil, log
+from threading import Lock
+from time import monotonic
+
+from sqlalchemy.exc import IntegrityError
+
+from sql import crud
+from sql.database import SessionLocal
+from config import settings
+
+logger = logging.getLogger("auth.revocation")
+
+class BloomFilter:
+    
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        self.capacity = capacity
+        self.size = max(8, ceil(-capacity * log(error_rate) / (log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        
+    def _positions(self, key: str):
+        
+        digest = blake2b(key.encode("utf-8"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        
+        return ((first + i * second) % self.size for i in range(self.hashes))
+        
+    def add(self, key: str):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+            
+    def __contains__(self, key: str):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+# Almacén de tokens revocados. La comprobación por petición no consulta la base de
+# datos: un filtro de Bloom descarta casi todos los tokens válidos y el conjunto
+# exacto (jti -> expiración) confirma los positivos. El conjunto se sincroniza
+# incrementalmente desde revoked_tokens cada settings.revocation_sync_interval.
+class RevocationStore:
+    
+    def __init__(self, capacity: int = 100_000):
+        self._lock = Lock()
+        self._sync_lock = Lock()
+        self._revoked: dict = {}
+        self._bloom = BloomFilter(capacity)
+        self._capacity = capacity
+        self._last_sync = None
+        self._next_sync = 0.0
+        self._next_prune = 0.0
+        
+    def _add_local(self, jti: str, expires_at: datetime):
+        
+        with self._lock:
+            
+            self._revoked[jti] = expires_at
+            
+            if len(self._revoked) > self._capacity:
+                self._rebuild(self._capacity * 2)
+            else:
+                self._bloom.add(jti)
+                
+    def _rebuild(self, capacity: int):
+        
+        bloom = BloomFilter(capacity)
+        
+        for jti in self._revoked:
+            bloom.add(jti)
+            
+        self._capacity = capacity
+        self._bloom = bloom
+        
+    def revoke(self, jti: str, expires_at: datetime):
+        
+        db = SessionLocal()
+        
+        try:
+            crud.revoke_token(db=db, jti=jti, expires_at=expires_at)
+        finally:
+            db.close()
+            
+        self._add_local(jti, expires_at)
+        
+    # Revoca el token solo si nadie lo había revocado antes; devuelve False si ya
+    # estaba en revoked_tokens (el refresh token se está reutilizando).
+    def claim(self, jti: str, expires_at: datetime) -> bool:
+        
+        db = SessionLocal()
+        
+        try:
+            crud.claim_token(db=db, jti=jti, expires_at=expires_at)
+        except IntegrityError:
+            db.rollback()
+            return False
+        finally:
+            db.close()
+            
+        self._add_local(jti, expires_at)
+        
+        return True
+        
+    def is_revoked(self, *keys: str) -> bool:
+        
+        self.sync_if_due()
+        
+        now = datetime.utcnow()
+        
+        with self._lock:
+            
+            for key in keys:
+                
+                if key is None or key not in self._bloom:
+                    continue
+                
+                expires_at = self._revoked.get(key)
+                
+                if expires_at is not None and expires_at > now:
+                    return True
+                
+        return False
+    
+    def sync_if_due(self):
+        
+        if monotonic() < self._next_sync:
+            return
+        
+        # Solo un hilo sincroniza; los demás siguen con los datos que ya hay en memoria.
+        if not self._sync_lock.acquire(blocking=False):
+            return
+        
+        try:
+            self.sync()
+        except Exception:
+            logger.exception("Could not sync revoked tokens")
+        finally:
+            self._next_sync = monotonic() + settings.revocation_sync_interval
+            self._sync_lock.release()
+            
+    def sync(self):
+        
+        started = datetime.utcnow()
+        
+        # Margen para no perder revocaciones escritas por otros workers con el reloj desfasado.
+        since = self._last_sync - timedelta(seconds=settings.revocation_sync_margin) if self._last_sync else None
+        
+        db = SessionLocal()
+        
+        try:
+            
+            for jti, expires_at in crud.get_revoked_tokens(db=db, since=since):
+                self._add_local(jti, expires_at)
+                
+            if monotonic() >= self._next_prune:
+                crud.prune_revoked_tokens(db=db)
+                self._next_prune = monotonic() + settings.revocation_prune_interval
+                
+        finally:
+            db.close()
+            
+        self._last_sync = started
+        self.prune_local()
+        
+    # Las entradas expiradas se eliminan y el filtro de Bloom se reconstruye sin ellas.
+    def prune_local(self):
+        
+        now = datetime.utcnow()
+        
+        with self._lock:
+            
+            expired = [jti for jti, expires_at in self._revoked.items() if expires_at <= now]
+            
+            if not expired:
+                return
+            
+            for jti in expired:
+                del self._revoked[jti]
+                
+            self._rebuild(self._capacity)
+
+revocation_store = RevocationStore()
@@ -1,14 +1,19 @@
 from datetime import timedelta, datetime
+from uuid import uuid4
 
-from fastapi import HTTPException, Depends, status, APIRouter
+from fastapi import HTTPException, Depends, status, APIRouter, Request, Response
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from sql import crud, schemes
 from sql.database import SessionLocal
-from jose import jwt, JWTError
+from jose import JWTError
 from os import getenv
 from dotenv import load_dotenv
 from .hash import verify_password
+from .revocation import revocation_store
+from .keys import key_ring
+from monitoring.tracing import start_span, traced
+from config import settings
 
 token_router = APIRouter(
     prefix="",
@@ -20,14 +25,21 @@ token_router = APIRouter(
 load_dotenv()
 
 # Variables de entorno.
-SECRET_KEY = getenv("SECRET_KEY")
-ALGORITHM = getenv("ALGORITHM")
-ACCESS_TOKEN_EXPIRES = getenv("ACCESS_TOKEN_EXPIRES")
+ACCESS_TOKEN_EXPIRE_MINUTES = int(getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "15"))
+REFRESH_TOKEN_EXPIRE_DAYS = int(getenv("REFRESH_TOKEN_EXPIRE_DAYS", "14"))
 
 # Ruta donde se mandará username y password.
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/token")
 
-def get_db():
+# Dentro de '/batch' todas las operaciones comparten la sesión del lote.
+def get_db(request: Request = None):
+    
+    batch_db = request.scope.get("batch_db") if request is not None else None
+    
+    if batch_db is not None:
+        yield batch_db
+        return
+    
     db = SessionLocal()
     try:
         yield db
@@ -35,6 +47,7 @@ def get_db():
         db.close()
 
 # Función para verificar que el usuario existe.
+@traced("auth.get_user")
 def get_user(username: str, db: Session = Depends(get_db)):
     
     admin = crud.get_admin_by_username(db=db, username=username)
@@ -79,14 +92,45 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
-        expire = datetime.utcnow() + timedelta(days=2)
+        expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
         
+    to_encode.setdefault("type", "access")
+    to_encode.setdefault("jti", uuid4().hex)
     to_encode.update({"exp": expire})
     
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    encoded_jwt = key_ring.encode(to_encode)
     
     return encoded_jwt
 
+# Función para crear el refresh token. Todos los tokens emitidos a partir del
+# mismo login comparten la familia "fam", que permite revocarlos juntos.
+def create_refresh_token(data: dict, family: str):
+    
+    return create_access_token(
+        data={**data, "type": "refresh", "fam": family},
+        expires_delta=timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    )
+
+def family_key(payload: dict):
+    
+    family = payload.get("fam")
+    
+    return f"family:{family}" if family else None
+
+def token_expiration(payload: dict):
+    return datetime.utcfromtimestamp(payload["exp"])
+
+def create_token_pair(username: str, role: str, family: str | None = None):
+    
+    family = family or uuid4().hex
+    
+    return {
+        "access_token": create_access_token(data={"username": username, "role": role, "fam": family}),
+        "refresh_token": create_refresh_token(data={"username": username, "role": role}, family=family),
+        "token_type": "bearer",
+        "expires_in": ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    }
+
 # Ruta que recibe y verifica la data, y retorna un token de acceso.
 @token_router.post("/token")
 async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(),
@@ -94,15 +138,79 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
     
     user = authenticate_user(form_data.username, form_data.password, db=db)
     
-    access_token_expires = timedelta(days=int(ACCESS_TOKEN_EXPIRES))
-    access_token = create_access_token(
-        data={"username": user.username, "role": user.role}, expires_delta=access_token_expires
+    return create_token_pair(username=user.username, role=user.role)
+
+# Ruta para obtener un nuevo par de tokens con un refresh token '/token/refresh'.
+# El refresh token usado se revoca; si se vuelve a presentar se revoca toda su familia.
+@token_router.post("/token/refresh")
+def refresh_access_token(body: schemes.RefreshTokenRequest, db: Session = Depends(get_db)):
+    
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
     )
     
-    return {"access_token": access_token, "token_type": "bearer"}
+    try:
+        payload = key_ring.decode(body.refresh_token)
+    except JWTError:
+        raise credentials_exception
+    
+    if not payload.get("type") == "refresh" or not payload.get("jti") or not payload.get("fam"):
+        raise credentials_exception
+    
+    if revocation_store.is_revoked(family_key(payload)):
+        raise credentials_exception
+    
+    if revocation_store.is_revoked(payload["jti"]):
+        
+        revocation_store.revoke(family_key(payload), token_expiration(payload))
+        raise credentials_exception
+    
+    user = get_user(username=payload["username"], db=db)
+    
+    if not user:
+        raise credentials_exception
+    
+    # La comprobación anterior usa la copia en memoria, que se sincroniza cada pocos
+    # segundos. El jti se reclama en la base de datos antes de emitir el par: si otra
+    # petición ya lo usó, es una reutilización y se revoca toda la familia.
+    if not revocation_store.claim(payload["jti"], token_expiration(payload)):
+        
+        revocation_store.revoke(family_key(payload), token_expiration(payload))
+        raise credentials_exception
+    
+    return create_token_pair(username=user.username, role=user.role, family=payload["fam"])
+
+# Ruta para cerrar la sesión '/logout': revoca el access token y toda su familia.
+@token_router.post("/logout")
+def logout(token: str = Depends(oauth2_scheme)):
+    
+    payload = get_current_user(token=token)
+    expires_at = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    
+    if payload.get("jti"):
+        revocation_store.revoke(payload["jti"], token_expiration(payload))
+        
+    if family_key(payload):
+        revocation_store.revoke(family_key(payload), expires_at)
+    
+    return {"detail": "Logged out."}
+
+# Ruta con las claves públicas para que otros servicios verifiquen los tokens '/.well-known/jwks.json'
+@token_router.get("/.well-known/jwks.json")
+def get_jwks(response: Response):
+    
+    response.headers["Cache-Control"] = f"public, max-age={settings.jwks_max_age}"
+    
+    return key_ring.jwks()
 
 # Función de la que dependerán las rutas protegidas, y devolverá la decodificación del token.
-def get_current_user(token: str = Depends(oauth2_scheme)):
+def get_current_user(request: Request = None, token: str = Depends(oauth2_scheme)):
+    
+    # Las operaciones de '/batch' usan el usuario ya autenticado por el lote.
+    if request is not None and "batch_principal" in request.scope:
+        return request.scope["batch_principal"]
     
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -111,10 +219,18 @@ def get_current_user(token: str = Depends(oauth2_scheme)):
     )
     
     try:
-        payload = jwt.decode(token=token, key=SECRET_KEY, algorithms=[ALGORITHM])
+        with start_span("auth.decode_token"):
+            payload = key_ring.decode(token)
         
     except JWTError:
-        return credentials_exception
+        raise credentials_exception
+    
+    # Los refresh tokens solo sirven para '/token/refresh' y los tickets para '/events/stream'.
+    if payload.get("type", "access") != "access":
+        raise credentials_exception
+    
+    if revocation_store.is_revoked(payload.get("jti"), family_key(payload)):
+        raise credentials_exception
     
     return payload
 
@@ -0,0 +1,83 @@
+# Compara la serialización de listados grandes: modelos pydantic + json frente a
+# filas de columnas + FastJSONResponse.
+#
+# Uso: python -m benchmarks.bench_serialization [--rows 10000] [--repeat 5]
+import argparse
+import os
+import time
+
+os.environ.setdefault("SQLALCHEMY_DATABASE_URL", "sqlite://")
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from apirouters.responses import rows_response
+from sql import crud, models, schemes
+
+def seed(db, rows: int):
+    
+    professor = models.Professor(username="professor", name="Professor", full_name="Professor",
+                                 phone_number="0", password="x", profile_picture="", role="professor")
+    db.add(professor)
+    db.flush()
+    
+    db.bulk_insert_mappings(models.Course, [{
+        "professor_id": professor.professor_id,
+        "name": f"course-{i}",
+        "password": f"password-{i}",
+        "description": "Lorem ipsum dolor sit amet, consectetur adipiscing elit." * 2,
+        "semester": i % 10 + 1,
+        "program": f"program-{i % 20}",
+        "profile_picture": f"https://example.com/courses/{i}.png"
+    } for i in range(rows)])
+    db.commit()
+
+# Camino actual: entidades ORM validadas con orm_mode y serializadas con json.
+def pydantic_path(db):
+    
+    courses = crud.get_all_courses(db=db)
+    validated = [schemes.Course.parse_obj({field: getattr(course, field) for field in schemes.Course.__fields__})
+                 for course in courses]
+    
+    return JSONResponse(content=jsonable_encoder(validated)).body
+
+# Camino rápido: filas de columnas codificadas directamente a bytes.
+def fast_path(db):
+    
+    return rows_response(crud.get_all_courses_rows(db=db)).body
+
+def measure(function, db, repeat: int):
+    
+    timings = []
+    
+    for _ in range(repeat):
+        db.expire_all()
+        start = time.perf_counter()
+        body = function(db)
+        timings.append(time.perf_counter() - start)
+        
+    return min(timings), sum(timings) / len(timings), len(body)
+
+def main():
+    
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    models.Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    seed(db, args.rows)
+    
+    print(f"{args.rows} rows, best/mean of {args.repeat} runs")
+    
+    for name, function in (("pydantic + json", pydantic_path), ("rows + FastJSONResponse", fast_path)):
+        best, mean, size = measure(function, db, args.repeat)
+        print(f"{name:<26} best {best * 1000:8.1f} ms   mean {mean * 1000:8.1f} ms   {size} bytes")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+# Compara SQLite con la configuración por defecto frente al perfil de sql/sqlite.py
+# (WAL, PRAGMAs y cola de un solo escritor) con inscripciones y lecturas concurrentes.
+#
+# Uso: python -m benchmarks.bench_sqlite [--operations 2000] [--threads 16] [--write-ratio 0.3]
+import argparse
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault("SQLALCHEMY_DATABASE_URL", "sqlite://")
+
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.common import percentile
+from sql import crud, models, schemes
+from sql.migrate import run_migrations
+from sql.sqlite import configure_sqlite
+
+def seed(Session, students: int, courses: int):
+    
+    db = Session()
+    
+    professor = models.Professor(username="professor", name="Professor", full_name="Professor",
+                                 phone_number="0", password="x", profile_picture="", role="professor")
+    db.add(professor)
+    db.flush()
+    
+    db.bulk_insert_mappings(models.Course, [{
+        "professor_id": professor.professor_id,
+        "name": f"course-{i}",
+        "password": f"password-{i}",
+        "description": "Benchmark course",
+        "semester": i % 10 + 1,
+        "program": f"program-{i % 5}",
+        "profile_picture": "",
+    } for i in range(courses)])
+    
+    db.bulk_insert_mappings(models.Student, [{
+        "username": f"student-{i}",
+        "name": f"Student {i}",
+        "full_name": f"Student {i}",
+        "phone_number": str(i),
+        "password": f"x-{i}",
+        "semester": 1,
+        "profile_picture": f"student-{i}.png",
+        "role": "student",
+    } for i in range(students)])
+    
+    db.commit()
+    db.close()
+
+def make_operation(Session, rng: random.Random, students: int, courses: int, write_ratio: float):
+    
+    student_id = rng.randrange(students) + 1
+    
+    if rng.random() < write_ratio:
+        
+        inscription = schemes.InscriptionCreate(student_id=student_id, course_id=rng.randrange(courses) + 1)
+        
+        def enroll():
+            db = Session()
+            try:
+                crud.create_inscription(db=db, inscription=inscription)
+            finally:
+                db.close()
+        
+        return "write", enroll
+    
+    def read():
+        db = Session()
+        try:
+            crud.get_course_info_of_student(db=db, student_username=f"student-{student_id - 1}")
+        finally:
+            db.close()
+    
+    return "read", read
+
+def timed(kind: str, operation):
+    
+    start = time.perf_counter()
+    
+    try:
+        operation()
+        error = None
+    except OperationalError as exc:
+        error = "locked" if "locked" in str(exc) else "operational"
+    
+    return kind, time.perf_counter() - start, error
+
+def run_profile(name: str, tuned: bool, args):
+    
+    with tempfile.TemporaryDirectory() as directory:
+        
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}",
+                               pool_size=args.threads, max_overflow=0)
+        
+        if tuned:
+            configure_sqlite(engine)
+        
+        run_migrations(engine)
+        Session = sessionmaker(bind=engine, autoflush=False)
+        seed(Session, args.students, args.courses)
+        
+        rng = random.Random(args.seed)
+        operations = [make_operation(Session, rng, args.students, args.courses, args.write_ratio)
+                      for _ in range(args.operations)]
+        
+        start = time.perf_counter()
+        
+        with ThreadPoolExecutor(max_workers=args.threads) as executor:
+            results = list(executor.map(lambda operation: timed(*operation), operations))
+        
+        elapsed = time.perf_counter() - start
+        engine.dispose()
+    
+    print(f"\n{name} ({elapsed:.2f} s, {len(results) / elapsed:.0f} ops/s)")
+    print(f"{'operation':<10}{'count':>8}{'errors':>8}{'locked':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    
+    for kind in ("write", "read"):
+        
+        entries = [(latency, error) for result_kind, latency, error in results if result_kind == kind]
+        latencies = sorted(latency for latency, _ in entries)
+        
+        print(f"{kind:<10}{len(entries):>8}{sum(1 for _, error in entries if error):>8}"
+              f"{sum(1 for _, error in entries if error == 'locked'):>8}"
+              f"{percentile(latencies, 0.50) * 1000:>9.1f}{percentile(latencies, 0.95) * 1000:>9.1f}"
+              f"{percentile(latencies, 0.99) * 1000:>9.1f}")
+
+def main():
+    
+    parser = argparse.ArgumentParser(description="Compare default SQLite settings with the tuned profile.")
+    parser.add_argument("--operations", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--write-ratio", type=float, default=0.3)
+    parser.add_argument("--students", type=int, default=500)
+    parser.add_argument("--courses", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    
+    print(f"{args.operations} operations, {args.threads} threads, {args.write_ratio:.0%} enrollments")
+    
+    run_profile("default settings", tuned=False, args=args)
+    run_profile("sqlite profile", tuned=True, args=args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+import os
+
+# Base de datos local por defecto para los benchmarks. Debe configurarse antes de
+# importar cualquier módulo de la aplicación.
+os.environ.setdefault("SQLALCHEMY_DATABASE_URL", "sqlite:///./bench.db")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-key")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "60")
+
+# Contraseñas conocidas de los datos generados, usadas por los escenarios.
+USER_PASSWORD = "benchmark-password"
+
+def course_password(course_index: int) -> str:
+    return f"course-password-{course_index}"
+
+def percentile(sorted_values, fraction: float):
+    
+    if not sorted_values:
+        return 0.0
+    
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    
+    return sorted_values[index]
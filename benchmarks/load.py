@@ -0,0 +1,206 @@
+# Escenarios de carga reproducibles contra la aplicación.
+#
+# Uso:
+#     python -m benchmarks.seed --reset
+#     python -m benchmarks.load --scenario all --requests 500 --concurrency 16
+#
+# Por defecto la aplicación se ejecuta en el mismo proceso; con --url se usa un
+# servidor ya levantado (que debe compartir SECRET_KEY y la base de datos sembrada).
+import argparse
+import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import USER_PASSWORD, course_password, percentile
+
+from auth.token import create_access_token
+from sql import models
+from sql.database import SessionLocal
+from config import settings
+
+class Population:
+    
+    def __init__(self, db):
+        self.students = [row[0] for row in db.query(models.Student.username)]
+        self.professors = [row[0] for row in db.query(models.Professor.username)]
+        self.admins = [row[0] for row in db.query(models.Admin.username)]
+        self.courses = [(row[0], row[1]) for row in db.query(models.Course.course_id, models.Course.name)]
+        
+        if not (self.students and self.professors and self.admins and self.courses):
+            raise SystemExit("The database is empty, run `python -m benchmarks.seed` first.")
+
+def auth_header(username: str, role: str):
+    return {"Authorization": "Bearer " + create_access_token({"username": username, "role": role})}
+
+# Cada escenario devuelve una función que genera una petición (método, ruta, kwargs).
+def login_storm(population: Population, rng: random.Random):
+    
+    def make_request():
+        return "POST", "/token", {"data": {"username": rng.choice(population.students), "password": USER_PASSWORD}}
+    
+    return make_request
+
+def enrollment_day(population: Population, rng: random.Random):
+    
+    headers = {username: auth_header(username, "student") for username in population.students}
+    
+    def make_request():
+        
+        username = rng.choice(population.students)
+        course_id, course_name = rng.choice(population.courses)
+        course_index = int(course_name.removeprefix("course"))
+        
+        return "POST", "/student/inscribe-course", {
+            "params": {"course_id": course_id, "password": course_password(course_index)},
+            "headers": headers[username]
+        }
+    
+    return make_request
+
+def dashboard_polling(population: Population, rng: random.Random):
+    
+    headers = {username: auth_header(username, "student") for username in population.students}
+    professor_headers = {username: auth_header(username, "professor") for username in population.professors}
+    
+    def make_request():
+        
+        choice = rng.random()
+        
+        if choice < 0.5:
+            return "GET", "/student/dashboard", {"headers": headers[rng.choice(population.students)]}
+        elif choice < 0.8:
+            return "GET", "/student/get-courses", {"headers": headers[rng.choice(population.students)]}
+        
+        return "GET", "/professor/get-courses", {"headers": professor_headers[rng.choice(population.professors)]}
+    
+    return make_request
+
+def admin_exports(population: Population, rng: random.Random):
+    
+    headers = auth_header(rng.choice(population.admins), "admin")
+    
+    def make_request():
+        
+        if rng.random() < 0.5:
+            return "GET", "/admin/get-all-users", {"headers": headers}
+        
+        return "GET", "/admin/get-all-courses", {"headers": headers}
+    
+    return make_request
+
+SCENARIOS = {
+    "login-storm": login_storm,
+    "enrollment-day": enrollment_day,
+    "dashboard-polling": dashboard_polling,
+    "admin-exports": admin_exports,
+}
+
+def run_scenario(client, make_request, requests: int, concurrency: int):
+    
+    # Las peticiones se generan antes de medir para que el azar sea reproducible.
+    planned = [make_request() for _ in range(requests)]
+    results = []
+    
+    def execute(request):
+        
+        method, path, kwargs = request
+        start = time.perf_counter()
+        response = client.request(method, path, **kwargs)
+        
+        return path, response.status_code, time.perf_counter() - start
+    
+    start = time.perf_counter()
+    
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(execute, planned))
+        
+    return results, time.perf_counter() - start
+
+def summarize(results, elapsed: float):
+    
+    by_path = {}
+    
+    for path, status_code, latency in results:
+        by_path.setdefault(path, []).append((status_code, latency))
+        
+    summary = {}
+    
+    for path, entries in sorted(by_path.items()):
+        
+        latencies = sorted(latency for _, latency in entries)
+        
+        summary[path] = {
+            "requests": len(entries),
+            "errors": sum(1 for status_code, _ in entries if status_code >= 500),
+            "throughput": len(entries) / elapsed,
+            "p50_ms": percentile(latencies, 0.50) * 1000,
+            "p95_ms": percentile(latencies, 0.95) * 1000,
+            "p99_ms": percentile(latencies, 0.99) * 1000,
+        }
+        
+    return summary
+
+def print_summary(name: str, summary: dict, elapsed: float):
+    
+    print(f"\n{name} ({elapsed:.2f} s)")
+    print(f"{'endpoint':<30}{'requests':>9}{'errors':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    
+    for path, stats in summary.items():
+        print(f"{path:<30}{stats['requests']:>9}{stats['errors']:>8}{stats['throughput']:>9.1f}"
+              f"{stats['p50_ms']:>9.1f}{stats['p95_ms']:>9.1f}{stats['p99_ms']:>9.1f}")
+
+def make_client(url: str | None):
+    
+    if url:
+        import httpx
+        return httpx.Client(base_url=url, timeout=30)
+    
+    from fastapi.testclient import TestClient
+    from main import app
+    
+    return TestClient(app)
+
+def main():
+    
+    parser = argparse.ArgumentParser(description="Run load scenarios and report latency percentiles.")
+    parser.add_argument("--scenario", choices=["all", *SCENARIOS], default="all")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--url", default=None, help="Base URL of a running server (default: in-process).")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", dest="json_path", default=None, help="Write the results to this file.")
+    parser.add_argument("--rate-limits", action="store_true",
+                        help="Keep settings.rate_limits for the in-process app (by default they are disabled).")
+    args = parser.parse_args()
+    
+    # Todas las peticiones llegan desde la misma IP y pocos usuarios: con los límites
+    # activos el escenario mediría respuestas 429 en lugar de la aplicación.
+    if not args.rate_limits:
+        settings.rate_limits = {}
+    
+    db = SessionLocal()
+    
+    try:
+        population = Population(db)
+    finally:
+        db.close()
+        
+    names = list(SCENARIOS) if args.scenario == "all" else [args.scenario]
+    report = {}
+    
+    with make_client(args.url) as client:
+        
+        for name in names:
+            
+            make_request = SCENARIOS[name](population, random.Random(args.seed))
+            results, elapsed = run_scenario(client, make_request, args.requests, args.concurrency)
+            report[name] = summarize(results, elapsed)
+            print_summary(name, report[name], elapsed)
+            
+    if args.json_path:
+        with open(args.json_path, "w") as file:
+            json.dump(report, file, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+# Generador de datos sintéticos para benchmarks.
+#
+# Uso: python -m benchmarks.seed --students 5000 --professors 100 --courses 300
+#
+# Las contraseñas se hashean con pocas rondas de bcrypt para que generar miles de
+# usuarios tarde segundos; cada hash usa su propia sal, así que siguen siendo únicos.
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.common import USER_PASSWORD, course_password
+
+from bcrypt import hashpw, gensalt
+from sqlalchemy import insert
+from sql import models
+from sql.database import get_engine, SessionLocal
+from sql.migrate import run_migrations, schema_migrations
+
+CHUNK_SIZE = 1000
+
+PROGRAMS = ["Systems Engineering", "Mathematics", "Physics", "Chemistry", "Economics",
+            "Law", "Medicine", "Architecture", "Biology", "Philosophy"]
+
+def fast_hash(password: str, rounds: int) -> str:
+    return hashpw(password.encode("utf-8"), gensalt(rounds=rounds)).decode("utf-8")
+
+def bulk_insert(db, model, rows):
+    
+    for start in range(0, len(rows), CHUNK_SIZE):
+        db.execute(insert(model), rows[start:start + CHUNK_SIZE])
+
+def seed(db, admins: int, professors: int, students: int, courses: int,
+         tasks_per_course: int, enrollments_per_student: float, rounds: int, rng: random.Random):
+    
+    bulk_insert(db, models.Admin, [{
+        "username": f"admin{i}",
+        "name": f"Admin {i}",
+        "full_name": f"Admin {i} Benchmark",
+        "phone_number": f"100{i:07d}",
+        "password": fast_hash(USER_PASSWORD, rounds),
+        "profile_picture": f"https://example.com/admins/{i}.png",
+        "role": "admin"
+    } for i in range(admins)])
+    
+    bulk_insert(db, models.Professor, [{
+        "username": f"professor{i}",
+        "name": f"Professor {i}",
+        "full_name": f"Professor {i} Benchmark",
+        "phone_number": f"200{i:07d}",
+        "password": fast_hash(USER_PASSWORD, rounds),
+        "profile_picture": f"https://example.com/professors/{i}.png",
+        "role": "professor"
+    } for i in range(professors)])
+    
+    bulk_insert(db, models.Student, [{
+        "username": f"student{i}",
+        "name": f"Student {i}",
+        "full_name": f"Student {i} Benchmark",
+        "phone_number": f"300{i:07d}",
+        "password": fast_hash(USER_PASSWORD, rounds),
+        "semester": rng.randint(1, 10),
+        "profile_picture": f"https://example.com/students/{i}.png",
+        "role": "student"
+    } for i in range(students)])
+    
+    professor_ids = [row[0] for row in db.query(models.Professor.professor_id).order_by(models.Professor.professor_id)]
+    
+    bulk_insert(db, models.Course, [{
+        "professor_id": rng.choice(professor_ids),
+        "name": f"course{i}",
+        "password": fast_hash(course_password(i), rounds),
+        "description": f"Benchmark course {i}",
+        "semester": rng.randint(1, 10),
+        "program": rng.choice(PROGRAMS),
+        "profile_picture": f"https://example.com/courses/{i}.png"
+    } for i in range(courses)])
+    
+    course_ids = [row[0] for row in db.query(models.Course.course_id).order_by(models.Course.course_id)]
+    student_ids = [row[0] for row in db.query(models.Student.student_id).order_by(models.Student.student_id)]
+    
+    # Popularidad de los cursos con cola larga: unos pocos cursos concentran la mayoría de inscripciones.
+    weights = [1 / (rank + 1) for rank in range(len(course_ids))]
+    
+    inscriptions = []
+    enrolled = {}
+    
+    for student_id in student_ids:
+        
+        count = min(len(course_ids), max(1, int(rng.expovariate(1 / enrollments_per_student))))
+        chosen = set()
+        
+        while len(chosen) < count:
+            chosen.add(rng.choices(course_ids, weights=weights)[0])
+            
+        enrolled[student_id] = chosen
+        inscriptions.extend({"student_id": student_id, "course_id": course_id} for course_id in chosen)
+        
+    bulk_insert(db, models.Inscription, inscriptions)
+    
+    now = datetime.utcnow()
+    
+    bulk_insert(db, models.Task, [{
+        "course_id": course_id,
+        "name": f"course{course_id}-task{t}",
+        "description": f"Task {t} of course {course_id}",
+        "start_date": now - timedelta(days=7 * (tasks_per_course - t)),
+        "end_date": now - timedelta(days=7 * (tasks_per_course - t) - 7),
+        "unique_filename": f"c{course_id}t{t}.pdf",
+        "active": t >= tasks_per_course - 2
+    } for course_id in course_ids for t in range(tasks_per_course)])
+    
+    tasks_by_course = {}
+    
+    for task_id, course_id, active in db.query(models.Task.task_id, models.Task.course_id, models.Task.active):
+        tasks_by_course.setdefault(course_id, []).append((task_id, active))
+    
+    # Solo las tareas cerradas tienen notas; la mayoría de estudiantes entrega.
+    notes = [{
+        "note": round(min(5.0, max(0.0, rng.gauss(3.6, 0.8))), 2),
+        "task_id": task_id,
+        "student_id": student_id
+    } for student_id, course_ids_of_student in enrolled.items()
+      for course_id in course_ids_of_student
+      for task_id, active in tasks_by_course.get(course_id, [])
+      if not active and rng.random() < 0.9]
+    
+    bulk_insert(db, models.Note, notes)
+    db.commit()
+    
+    return {
+        "admins": admins,
+        "professors": professors,
+        "students": students,
+        "courses": courses,
+        "inscriptions": len(inscriptions),
+        "tasks": len(course_ids) * tasks_per_course,
+        "notes": len(notes)
+    }
+
+def main():
+    
+    parser = argparse.ArgumentParser(description="Seed a database with synthetic benchmark data.")
+    parser.add_argument("--admins", type=int, default=5)
+    parser.add_argument("--professors", type=int, default=50)
+    parser.add_argument("--students", type=int, default=2000)
+    parser.add_argument("--courses", type=int, default=150)
+    parser.add_argument("--tasks-per-course", type=int, default=6)
+    parser.add_argument("--enrollments-per-student", type=float, default=4)
+    parser.add_argument("--bcrypt-rounds", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reset", action="store_true", help="Drop and recreate all tables first.")
+    args = parser.parse_args()
+    
+    if args.reset:
+        models.Base.metadata.drop_all(bind=get_engine())
+        schema_migrations.drop(bind=get_engine(), checkfirst=True)
+        
+    run_migrations()
+    
+    start = time.perf_counter()
+    db = SessionLocal()
+    
+    try:
+        counts = seed(db, args.admins, args.professors, args.students, args.courses,
+                      args.tasks_per_course, args.enrollments_per_student, args.bcrypt_rounds,
+                      random.Random(args.seed))
+    finally:
+        db.close()
+        
+    print(", ".join(f"{count} {name}" for name, count in counts.items()))
+    print(f"Seeded in {time.perf_counter() - start:.1f} s")
+
+if __name__ == "__main__":
+    main()
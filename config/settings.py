@@ -1,3 +1,225 @@
 origins = [
     "http://localhost:5073",
-]
\ No newline at end of file
+]
+
+# Directorio donde se guardan las imágenes procesadas y sus miniaturas.
+media_root = "media_files"
+
+# URL pública bajo la que se sirven las imágenes.
+media_url = "/media/images"
+
+# Tamaños fijos (lado mayor en píxeles) de las variantes de cada imagen.
+thumbnail_sizes = {
+    "small": 64,
+    "medium": 256,
+    "large": 1024,
+}
+
+# Tamaño máximo aceptado para una imagen subida (bytes).
+max_upload_size = 5 * 1024 * 1024
+
+# Número de procesos usados para decodificar y redimensionar imágenes.
+image_workers = 2
+
+# Los listados grandes se serializan directamente desde las filas de la base de
+# datos con FastJSONResponse en lugar de validarse con los modelos de pydantic.
+fast_json_responses = True
+
+# Las consultas SQL que superen este tiempo (segundos) se registran en el log.
+slow_query_threshold = 0.2
+
+# Número máximo de consultas SQL esperadas por ruta. Si una petición lo supera
+# se registra un aviso en el log.
+query_budgets = {
+    "/student/dashboard": 5,
+    "/student/get-courses": 3,
+    "/professor/get-courses": 3,
+    "/professor/create-course": 6,
+}
+
+# Tamaño del pool de conexiones a la base de datos (por worker).
+db_pool_size = 5
+db_max_overflow = 10
+
+# Hilos disponibles para los handlers síncronos. Se alinea con el pool de la base
+# de datos para que los hilos no esperen conexiones que no existen.
+threadpool_size = db_pool_size + db_max_overflow
+
+# Carriles de prioridad para el control de carga. Cada carril tiene un máximo de
+# peticiones en curso y de peticiones en cola; al superarse se responde 503. Las
+# peticiones en curso se reparten el threadpool (20 %, 30 %, 40 % y 10 %) y entre
+# todas no lo superan, así ninguna petición admitida espera un hilo dentro de anyio.
+load_shedding_lanes = {
+    "auth": {"max_in_flight": max(1, threadpool_size * 2 // 10), "max_queue": 16},
+    "write": {"max_in_flight": max(1, threadpool_size * 3 // 10), "max_queue": 24},
+    "read": {"max_in_flight": max(1, threadpool_size * 4 // 10), "max_queue": 50},
+    "bulk": {"max_in_flight": max(1, threadpool_size // 10), "max_queue": 4},
+}
+
+# Rutas de listados masivos que van al carril "bulk".
+bulk_routes = {
+    "/admin/get-all-users",
+    "/admin/get-all-courses",
+}
+
+# Rutas que no pasan por el control de carga. Las operaciones de '/batch' pasan
+# cada una por el carril de su propia ruta.
+load_shedding_exempt_routes = {
+    "/metrics",
+    "/ready",
+    "/events/stream",
+    "/batch",
+}
+
+# Tiempo máximo (segundos) que una petición espera en cola antes de rechazarse.
+load_shedding_queue_timeout = 2.0
+
+# Valor de la cabecera Retry-After (segundos) en las respuestas 503.
+load_shedding_retry_after = 1
+
+# Tiempo (segundos) que se reutiliza el resultado de una lectura coalescida
+# después de terminar. 0 desactiva la reutilización y solo se comparten las
+# consultas que están en curso.
+singleflight_ttl = 0.5
+
+# Tiempo (segundos) que se guarda una página de ranking y número máximo de páginas
+# guardadas por worker. Una nota nueva las invalida antes en todos los workers.
+ranking_cache_ttl = 60.0
+ranking_cache_max_entries = 1024
+
+# Cada cuántos segundos se sincronizan los tokens revocados desde la base de datos.
+# Una revocación hecha en otro worker tarda como máximo este tiempo en aplicarse.
+revocation_sync_interval = 5.0
+
+# Margen (segundos) que se resta a la última sincronización para tolerar desfases de reloj.
+revocation_sync_margin = 10.0
+
+# Cada cuántos segundos se borran de la base de datos las revocaciones ya expiradas.
+revocation_prune_interval = 600.0
+
+# Cada cuántos segundos se comprueba si cambiaron las claves de JWT_KEYS_DIR.
+jwt_keys_reload_interval = 30.0
+
+# Tiempo (segundos) que los clientes pueden cachear /.well-known/jwks.json.
+jwks_max_age = 300
+
+# Eventos pendientes por conexión SSE; si el cliente no los consume se descartan los más antiguos.
+events_queue_size = 100
+
+# Cada cuántos segundos se envía un comentario para mantener viva la conexión SSE.
+events_heartbeat_interval = 15.0
+
+# Validez (segundos) de los tickets de un solo uso para abrir '/events/stream'.
+events_ticket_ttl = 30
+
+# Destino del registro de auditoría: "jsonl" (ficheros rotativos) o "database" (tabla audit_events).
+audit_sink = "jsonl"
+
+# Directorio y tamaño máximo (bytes) de cada fichero JSONL de auditoría.
+audit_dir = "audit_logs"
+audit_file_max_bytes = 50 * 1024 * 1024
+
+# Eventos en memoria como máximo; si la cola se llena los nuevos se descartan.
+audit_queue_size = 10_000
+
+# Los eventos se escriben en lotes de este tamaño o cada audit_flush_interval segundos.
+audit_batch_size = 500
+audit_flush_interval = 2.0
+
+# Rutas POST que aceptan la cabecera Idempotency-Key.
+idempotent_routes = {
+    "/admin/create-professor",
+    "/admin/create-student",
+    "/admin/create-course",
+    "/admin/inscribe-student",
+    "/professor/create-course",
+    "/professor/inscribe-student",
+    "/professor/create-note",
+    "/student/inscribe-course",
+}
+
+# Tiempo (segundos) que se guarda la respuesta de una petición idempotente, y
+# número máximo de respuestas guardadas por worker.
+idempotency_ttl = 24 * 60 * 60
+idempotency_max_entries = 10_000
+
+# Las respuestas más grandes que esto (bytes) no se guardan para repetirlas.
+idempotency_max_body_size = 1024 * 1024
+
+# Número máximo de operaciones en una petición a '/batch'.
+batch_max_requests = 50
+
+# Rutas que no se pueden ejecutar dentro de '/batch'.
+batch_excluded_routes = {
+    "/batch",
+    "/token",
+    "/token/refresh",
+    "/logout",
+    "/events/stream",
+}
+
+# Cursos que se archivan en cada transacción de 'python -m sql.archive'.
+archive_batch_size = 200
+
+# Segundos entre reintentos de los pasos del calentamiento que fallaron (p. ej. si
+# la base de datos todavía no acepta conexiones).
+warmup_retry_interval = 5.0
+
+# Cabecera Retry-After de '/ready' mientras el worker no está listo.
+ready_retry_after = 5
+
+# Límites de peticiones por ruta. Cada regla cuenta las peticiones en una ventana
+# deslizante de "window" segundos, agrupadas por "key":
+#   "ip"    dirección del cliente
+#   "user"  username del token (o del formulario en '/token')
+#   "role"  rol del token, compartido por todos los usuarios de ese rol
+# "roles" permite un límite distinto según el rol del usuario autenticado.
+rate_limits = {
+    "/token": [
+        {"key": "ip", "limit": 20, "window": 60},
+        {"key": "user", "limit": 5, "window": 60},
+    ],
+    "/token/refresh": [
+        {"key": "ip", "limit": 60, "window": 60},
+    ],
+    "/admin/get-all-users": [
+        {"key": "user", "limit": 30, "window": 60},
+    ],
+    "/admin/get-all-courses": [
+        {"key": "user", "limit": 30, "window": 60},
+    ],
+    "/batch": [
+        {"key": "user", "limit": 60, "window": 60, "roles": {"admin": 120}},
+    ],
+    "/courses/search": [
+        {"key": "user", "limit": 120, "window": 60},
+        {"key": "role", "limit": 1000, "window": 60, "roles": {"admin": 5000}},
+    ],
+}
+
+# Usar la primera IP de X-Forwarded-For solo si la aplicación está detrás de un proxy de confianza.
+rate_limit_trust_forwarded = False
+
+# Entradas máximas del almacén en memoria antes de purgar las ventanas caducadas.
+rate_limit_max_entries = 100_000
+
+# Perfil de SQLite: PRAGMAs que se aplican a cada conexión nueva. journal_mode WAL
+# permite leer mientras otro escribe y se ignora en bases de datos en memoria.
+sqlite_pragmas = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "foreign_keys": "ON",
+    "busy_timeout": 5000,
+    "cache_size": -64000,
+    "mmap_size": 256 * 1024 * 1024,
+    "temp_store": "MEMORY",
+}
+
+# SQLite admite un solo escritor: las transacciones que escriben esperan su turno
+# en el proceso en lugar de competir por el bloqueo del fichero.
+sqlite_single_writer = True
+
+# Espera máxima (segundos) por el turno de escritura; después se deja a SQLite
+# esperar con busy_timeout. Un '/batch' atómico guarda el turno durante todo el lote,
+# así que las demás escrituras del proceso esperan a que termine.
+sqlite_writer_timeout = 5.0
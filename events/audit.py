@@ -0,0 +1,273 @@
+# Registro de auditoría con escritura diferida.
+#
+# Los handlers llaman a audit_log.record(), que solo añade el evento a una cola
+# acotada en memoria. Un hilo en segundo plano lo escribe en lotes (por tamaño o
+# por intervalo) en ficheros JSONL rotativos o en la tabla audit_events, así que
+# la petición no hace ninguna escritura adicional. Con varios workers cada proceso
+# escribe sus propios ficheros (audit-<pid>.jsonl) para que las rotaciones no se
+# pisen. Un lote que no se puede escribir vuelve a la cola y se reintenta.
+import json
+import logging
+import os
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from threading import Condition, Thread
+
+from config import settings
+from monitoring.metrics import REGISTRY, Counter, Gauge
+
+logger = logging.getLogger("audit")
+
+AUDIT_EVENTS = REGISTRY.register(Counter(
+    "audit_events_total", "Audit events by outcome (queued, written, dropped, failed).", ("outcome",)
+))
+
+AUDIT_QUEUE = REGISTRY.register(Gauge(
+    "audit_queue_size", "Audit events waiting to be written."
+))
+
+class JsonlSink:
+    
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        
+    # El pid se lee en cada escritura: tras un fork el worker pasa a su propio fichero.
+    def _path(self):
+        return os.path.join(self.directory, f"audit-{os.getpid()}.jsonl")
+    
+    def _rotate(self):
+        
+        path = self._path()
+        
+        if os.path.exists(path) and os.path.getsize(path) >= self.max_bytes:
+            os.replace(path, os.path.join(
+                self.directory, f"audit-{os.getpid()}-{datetime.utcnow():%Y%m%dT%H%M%S%f}.jsonl"
+            ))
+            
+    def write(self, events):
+        
+        os.makedirs(self.directory, exist_ok=True)
+        self._rotate()
+        
+        with open(self._path(), "a", encoding="utf-8") as file:
+            file.write("".join(json.dumps(event, default=str) + "\n" for event in events))
+
+class DatabaseSink:
+    
+    def write(self, events):
+        
+        from sqlalchemy import insert
+        from sql import models
+        from sql.database import SessionLocal
+        
+        db = SessionLocal()
+        
+        try:
+            db.execute(insert(models.AuditEvent), [{
+                **event,
+                "created_at": datetime.fromisoformat(event["created_at"]),
+                "details": json.dumps(event["details"], default=str) if event["details"] is not None else None,
+            } for event in events])
+            db.commit()
+        finally:
+            db.close()
+
+def create_sink():
+    
+    if settings.audit_sink == "database":
+        return DatabaseSink()
+    
+    return JsonlSink(settings.audit_dir, settings.audit_file_max_bytes)
+
+# Eventos retenidos mientras dura la transacción de un lote atómico de '/batch'; se
+# encolan si el lote hace commit y se descartan si se deshace.
+pending_audit_events: ContextVar[list | None] = ContextVar("pending_audit_events", default=None)
+
+class AuditLog:
+    
+    def __init__(self, sink=None):
+        self.sink = sink
+        self._queue = deque()
+        self._condition = Condition()
+        self._thread = None
+        self._closed = False
+        
+    def record(self, action: str, actor: dict, target: str | None = None, details: dict | None = None):
+        
+        event = {
+            "created_at": datetime.utcnow().isoformat(),
+            "actor": actor.get("username"),
+            "role": actor.get("role"),
+            "action": action,
+            "target": target,
+            "details": details,
+        }
+        
+        pending = pending_audit_events.get()
+        
+        if pending is not None:
+            pending.append(event)
+            return
+        
+        self._enqueue(event)
+        
+    def _enqueue(self, event: dict):
+        
+        with self._condition:
+            
+            if len(self._queue) >= settings.audit_queue_size:
+                AUDIT_EVENTS.inc("dropped")
+                return
+            
+            self._queue.append(event)
+            AUDIT_EVENTS.inc("queued")
+            AUDIT_QUEUE.set(len(self._queue))
+            
+            if len(self._queue) >= settings.audit_batch_size:
+                self._condition.notify()
+                
+        self._ensure_thread()
+        
+    # Retiene los eventos registrados dentro del bloque; quien lo abre decide con
+    # commit_deferred o al salir sin llamarlo (se descartan).
+    @contextmanager
+    def deferred(self):
+        
+        pending = []
+        token = pending_audit_events.set(pending)
+        
+        try:
+            yield pending
+        finally:
+            pending_audit_events.reset(token)
+            
+    def commit_deferred(self, pending: list):
+        
+        for event in pending:
+            self._enqueue(event)
+            
+        pending.clear()
+        
+    def _ensure_thread(self):
+        
+        if self._thread is not None and self._thread.is_alive():
+            return
+        
+        with self._condition:
+            
+            if self._closed or (self._thread is not None and self._thread.is_alive()):
+                return
+            
+            self._thread = Thread(target=self._run, name="audit-writer", daemon=True)
+            self._thread.start()
+            
+    def _take_batch(self):
+        
+        batch = []
+        
+        while self._queue and len(batch) < settings.audit_batch_size:
+            batch.append(self._queue.popleft())
+            
+        AUDIT_QUEUE.set(len(self._queue))
+        
+        return batch
+    
+    def _write(self, batch) -> bool:
+        
+        if not batch:
+            return True
+        
+        try:
+            (self.sink or create_sink()).write(batch)
+            AUDIT_EVENTS.inc("written", amount=len(batch))
+        except Exception:
+            AUDIT_EVENTS.inc("failed", amount=len(batch))
+            logger.exception("Could not write %d audit events", len(batch))
+            return False
+        
+        return True
+    
+    # El lote fallido vuelve al principio de la cola; si ya no cabe se descartan los
+    # eventos más recientes.
+    def _requeue(self, batch):
+        
+        with self._condition:
+            
+            self._queue.extendleft(reversed(batch))
+            
+            while len(self._queue) > settings.audit_queue_size:
+                self._queue.pop()
+                AUDIT_EVENTS.inc("dropped")
+                
+            AUDIT_QUEUE.set(len(self._queue))
+            
+    def _run(self):
+        
+        retrying = False
+        
+        while True:
+            
+            with self._condition:
+                
+                # Tras un fallo se espera el intervalo completo antes de reintentar.
+                if not self._closed and (retrying or len(self._queue) < settings.audit_batch_size):
+                    self._condition.wait(timeout=settings.audit_flush_interval)
+                    
+                batch = self._take_batch()
+                closed = self._closed
+                
+            retrying = not self._write(batch)
+            
+            # El lote vuelve a la cola; al cerrar, flush() lo intenta una última vez.
+            if retrying:
+                self._requeue(batch)
+                
+            if closed:
+                return
+            
+    # Escribe todo lo pendiente; se llama al apagar el worker. Cada lote se intenta
+    # una vez más y, si vuelve a fallar, se descarta lo que queda.
+    def flush(self):
+        
+        while True:
+            
+            with self._condition:
+                batch = self._take_batch()
+                
+            if not batch:
+                return
+            
+            if not self._write(batch):
+                
+                with self._condition:
+                    dropped = len(batch) + len(self._queue)
+                    self._queue.clear()
+                    AUDIT_QUEUE.set(0)
+                    
+                AUDIT_EVENTS.inc("dropped", amount=dropped)
+                logger.error("Dropped %d audit events on shutdown", dropped)
+                return
+            
+    def close(self):
+        
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+            thread = self._thread
+            
+        if thread is not None:
+            thread.join(timeout=10)
+            
+        self.flush()
+        
+    # El hilo del padre no existe en un proceso hijo; se creará otro al primer evento.
+    def reset_after_fork(self):
+        
+        self._condition = Condition()
+        self._thread = None
+        self._closed = False
+
+audit_log = AuditLog()
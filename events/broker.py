@@ -0,0 +1,156 @@
+# Pub/sub de eventos (inscripciones, cursos, notas) para el feed SSE.
+#
+# Los escritores publican después del commit desde el threadpool; cada suscriptor
+# es una cola asyncio en el event loop de su conexión. Con EVENTS_BROKER_URL
+# (redis://...) los eventos se reenvían a través de Redis para que lleguen a los
+# suscriptores de todos los workers.
+import asyncio
+import json
+import logging
+from itertools import count
+from os import getenv
+from threading import Lock, Thread
+
+from dotenv import load_dotenv
+from config import settings
+
+logger = logging.getLogger("events")
+
+load_dotenv()
+
+EVENTS_BROKER_URL = getenv("EVENTS_BROKER_URL")
+
+class Subscription:
+    
+    def __init__(self, channels, loop):
+        self.channels = tuple(channels)
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=settings.events_queue_size)
+        self.dropped = 0
+        
+    # Se ejecuta en el event loop del suscriptor. Si el cliente no consume, se
+    # descarta el evento más antiguo en lugar de acumular memoria.
+    def _put(self, event):
+        
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+            
+        self.queue.put_nowait(event)
+
+class InProcessBroker:
+    
+    def __init__(self):
+        self._lock = Lock()
+        self._subscriptions: dict = {}
+        self._ids = count(1)
+        
+    def subscribe(self, channels) -> Subscription:
+        
+        subscription = Subscription(channels, asyncio.get_running_loop())
+        
+        with self._lock:
+            for channel in subscription.channels:
+                self._subscriptions.setdefault(channel, set()).add(subscription)
+                
+        return subscription
+    
+    def unsubscribe(self, subscription: Subscription):
+        
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._subscriptions.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscriptions[channel]
+                        
+    # Entrega a los suscriptores de este proceso. Es seguro llamarlo desde cualquier hilo.
+    def deliver(self, channels, event: dict):
+        
+        with self._lock:
+            subscriptions = {subscription for channel in channels for subscription in self._subscriptions.get(channel, ())}
+            
+        if not subscriptions:
+            return
+        
+        event = {**event, "id": next(self._ids)}
+        
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._put, event)
+            except RuntimeError:
+                # El event loop del suscriptor ya se cerró.
+                self.unsubscribe(subscription)
+                
+    def publish(self, channels, event: dict):
+        self.deliver(channels, event)
+
+class RedisBroker(InProcessBroker):
+    
+    def __init__(self, url: str, prefix: str = "events"):
+        
+        import redis
+        
+        super().__init__()
+        self.prefix = prefix
+        self._redis = redis.Redis.from_url(url)
+        self._listener = None
+        
+    def _ensure_listener(self):
+        
+        if self._listener is not None:
+            return
+        
+        with self._lock:
+            
+            if self._listener is None:
+                self._listener = Thread(target=self._listen, name="events-redis-listener", daemon=True)
+                self._listener.start()
+                
+    def _listen(self):
+        
+        pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(self.prefix)
+        
+        for message in pubsub.listen():
+            try:
+                payload = json.loads(message["data"])
+                self.deliver(payload["channels"], payload["event"])
+            except Exception:
+                logger.exception("Invalid event received from Redis")
+                
+    def subscribe(self, channels) -> Subscription:
+        
+        self._ensure_listener()
+        
+        return super().subscribe(channels)
+    
+    def publish(self, channels, event: dict):
+        
+        # Se publica solo en Redis; este mismo proceso lo recibe a través del listener.
+        self._redis.publish(self.prefix, json.dumps({"channels": list(channels), "event": event}, default=str))
+
+def create_broker():
+    
+    if EVENTS_BROKER_URL:
+        return RedisBroker(EVENTS_BROKER_URL)
+    
+    return InProcessBroker()
+
+broker = create_broker()
+
+# Función para preparar un evento que se publicará cuando la sesión haga commit.
+def stage_event(session, channels, event_type: str, data: dict):
+    session.info.setdefault("pending_events", []).append((tuple(channels) + ("admin",), {"type": event_type, "data": data}))
+
+def publish_staged_events(session):
+    
+    for channels, event in session.info.pop("pending_events", ()):
+        try:
+            broker.publish(channels, event)
+        except Exception:
+            logger.exception("Could not publish event %s", event["type"])
+
+def discard_staged_events(session):
+    session.info.pop("pending_events", None)
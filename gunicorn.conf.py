@@ -0,0 +1,44 @@
+# Configuración de producción: gunicorn -c gunicorn.conf.py
+#
+# La aplicación se precarga en el proceso maestro (memoria compartida y arranque
+# rápido de los workers) y cada worker rehace el pool de conexiones tras el fork.
+import multiprocessing
+from os import getenv
+
+wsgi_app = "main:app"
+worker_class = "uvicorn.workers.UvicornWorker"
+
+bind = getenv("BIND", f"0.0.0.0:{getenv('PORT', '8000')}")
+
+# Los handlers son síncronos y esperan a la base de datos, así que se usa la
+# fórmula clásica de 2 * núcleos + 1 salvo que se indique otra cosa.
+workers = int(getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+
+preload_app = getenv("PRELOAD_APP", "true").lower() == "true"
+
+# Conexiones keep-alive detrás de un balanceador (debe ser menor que su idle timeout).
+keepalive = int(getenv("KEEPALIVE", "5"))
+
+# Tiempo máximo de una petición y tiempo para terminar las peticiones en curso al reiniciar.
+timeout = int(getenv("TIMEOUT", "60"))
+graceful_timeout = int(getenv("GRACEFUL_TIMEOUT", "30"))
+
+# Reciclar workers periódicamente para acotar el crecimiento de memoria.
+max_requests = int(getenv("MAX_REQUESTS", "10000"))
+max_requests_jitter = int(getenv("MAX_REQUESTS_JITTER", "1000"))
+
+accesslog = getenv("ACCESS_LOG", "-")
+errorlog = "-"
+loglevel = getenv("LOG_LEVEL", "info")
+
+def post_fork(server, worker):
+    
+    from sql.database import reset_engine_after_fork
+    from media.images import reset_executor_after_fork
+    from events.audit import audit_log
+    
+    reset_engine_after_fork()
+    reset_executor_after_fork()
+    audit_log.reset_after_fork()
+    
+    server.log.info("Worker %s: connection pool reset after fork", worker.pid)
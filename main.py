@@ -1,29 +1,92 @@
+import asyncio
+from contextlib import asynccontextmanager, suppress
+from time import perf_counter
+
+import anyio.to_thread
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from auth.token import token_router
-from sql import models
-from sql.database import engine
+from sql.database import dispose_engine, on_engine_created
 from apirouters.apistudent import student_router
 from apirouters.apiprofessor import professor_router
 from apirouters.apiadmin import admin_router
+from apirouters.apimedia import media_router
+from apirouters.apicourse import course_router
+from apirouters.apievents import events_router
+from apirouters.apimonitoring import monitoring_router
+from apirouters.apibatch import batch_router
+from apirouters.apiarchive import archive_router
+from monitoring.requests import MetricsMiddleware, instrument_engine
+from monitoring.warmup import readiness, warm_up
+from monitoring.tracing import TracingMiddleware, trace_engine, exporter as trace_exporter
+from middleware.loadshedding import LoadSheddingMiddleware, check_lane_capacity
+from middleware.idempotency import IdempotencyMiddleware
+from middleware.ratelimit import RateLimitMiddleware
+from media.images import shutdown_executor
+from events.audit import audit_log
 from config import settings
 
-models.Base.metadata.create_all(bind=engine)
+# El esquema se gestiona con `python -m sql.migrate`; al arrancar solo se conecta.
+on_engine_created(instrument_engine)
+on_engine_created(trace_engine)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    
+    start = perf_counter()
+    
+    # Los handlers síncronos no pueden usar más hilos que conexiones tiene el pool,
+    # y los carriles del control de carga no pueden admitir más peticiones que hilos.
+    check_lane_capacity()
+    anyio.to_thread.current_default_thread_limiter().total_tokens = settings.threadpool_size
+    
+    # El calentamiento (pool, consultas, bcrypt, JWT) corre en segundo plano;
+    # '/ready' responde 503 hasta que termina.
+    # 'app_startup_seconds' se mide desde aquí hasta que el worker está listo.
+    warmup_task = asyncio.create_task(warm_up(start))
+    
+    yield
+    
+    readiness.mark_not_ready("shutting down")
+    warmup_task.cancel()
+    
+    with suppress(asyncio.CancelledError):
+        await warmup_task
+    
+    shutdown_executor()
+    audit_log.close()
+    trace_exporter.close()
+    dispose_engine()
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 origins = settings.origins
 
+app.add_middleware(LoadSheddingMiddleware)
+app.add_middleware(IdempotencyMiddleware)
+app.add_middleware(RateLimitMiddleware)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(TracingMiddleware)
+
+# CORS se registra el último para quedar por fuera: los 503 y 429 del control de
+# carga y del limitador llevan sus cabeceras y los preflight no ocupan cupo.
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE"],
     allow_headers=["*"],
+    expose_headers=["Retry-After", "RateLimit-Limit", "RateLimit-Remaining", "RateLimit-Reset"],
 )
 
 
 app.include_router(router=token_router)
 app.include_router(router=student_router)
 app.include_router(router=professor_router)
-app.include_router(router=admin_router)
\ No newline at end of file
+app.include_router(router=admin_router)
+app.include_router(router=media_router)
+app.include_router(router=course_router)
+app.include_router(router=events_router)
+app.include_router(router=monitoring_router)
+app.include_router(router=batch_router)
+app.include_router(router=archive_router)
@@ -0,0 +1,123 @@
+import asyncio
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from hashlib import sha256
+from io import BytesIO
+
+from config import settings
+
+try:
+    from PIL import Image, UnidentifiedImageError
+    from PIL.Image import DecompressionBombError
+except ImportError:  # Pillow es opcional, solo se necesita para subir imágenes.
+    Image = None
+    UnidentifiedImageError = OSError
+    DecompressionBombError = OSError
+
+_executor: ProcessPoolExecutor | None = None
+
+class InvalidImageError(ValueError):
+    pass
+
+# Formato que no se reconoce, o servidor sin Pillow para procesar imágenes.
+class UnsupportedImageError(InvalidImageError):
+    pass
+
+def get_executor():
+    
+    global _executor
+    
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=settings.image_workers)
+        
+    return _executor
+
+def shutdown_executor():
+    
+    global _executor
+    
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+# El pool de procesos del padre no se puede usar en un hijo creado con fork.
+def reset_executor_after_fork():
+    
+    global _executor
+    
+    _executor = None
+
+def variant_path(digest: str, size: str):
+    return os.path.join(settings.media_root, digest[:2], digest, f"{size}.jpg")
+
+def image_url(digest: str, size: str = "large"):
+    return f"{settings.media_url}/{digest}/{size}.jpg"
+
+# URL guardada como foto de perfil. La imagen se comparte entre usuarios con el
+# mismo contenido, pero el valor guardado incluye al dueño porque
+# students.profile_picture es único.
+def profile_picture_url(digest: str, owner: str):
+    return f"{image_url(digest)}?owner={owner}"
+
+# Función para convertir la URL de una imagen procesada en la de su miniatura.
+# Las URLs externas (imágenes no subidas a través de la API) se devuelven tal cual.
+def thumbnail_url(url: str | None, size: str = "small"):
+    
+    if not url or not url.startswith(settings.media_url + "/"):
+        return url
+    
+    digest = url[len(settings.media_url) + 1:].split("/", 1)[0]
+    
+    return image_url(digest=digest, size=size)
+
+# Función que se ejecuta en el pool de procesos: decodifica la imagen y guarda
+# todas sus variantes en disco. Devuelve el digest del contenido original.
+def process_image(data: bytes):
+    
+    if Image is None:
+        raise UnsupportedImageError("Pillow is required to process images.")
+    
+    digest = sha256(data).hexdigest()[:32]
+    
+    # Las imágenes se direccionan por contenido: si ya existen no se procesan otra vez.
+    if all(os.path.exists(variant_path(digest, size)) for size in settings.thumbnail_sizes):
+        return digest
+    
+    try:
+        with Image.open(BytesIO(data)) as image:
+            image.load()
+            image = image.convert("RGB")
+    except UnidentifiedImageError as e:
+        raise UnsupportedImageError(str(e))
+    except (DecompressionBombError, OSError) as e:
+        raise InvalidImageError(str(e))
+    
+    os.makedirs(os.path.dirname(variant_path(digest, "large")), exist_ok=True)
+    
+    for size, pixels in settings.thumbnail_sizes.items():
+        
+        variant = image.copy()
+        variant.thumbnail((pixels, pixels))
+        
+        path = variant_path(digest, size)
+        
+        # Cada subida escribe en su propio temporal: dos subidas de la misma imagen
+        # a la vez no se pisan y el rename deja siempre un fichero completo.
+        with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), suffix=".tmp", delete=False) as tmp_file:
+            try:
+                variant.save(tmp_file, format="JPEG", quality=85, optimize=True)
+            except BaseException:
+                os.remove(tmp_file.name)
+                raise
+            
+        os.replace(tmp_file.name, path)
+        
+    return digest
+
+# Función para procesar la imagen fuera del hilo de la petición.
+async def process_image_async(data: bytes):
+    
+    loop = asyncio.get_running_loop()
+    
+    return await loop.run_in_executor(get_executor(), process_image, data)
@@ -0,0 +1,200 @@
+# Soporte de la cabecera Idempotency-Key para las rutas de settings.idempotent_routes.
+#
+# La primera petición con una clave se ejecuta normalmente y su respuesta se guarda;
+# los reintentos con la misma clave (y el mismo usuario) reciben esa respuesta byte a
+# byte sin volver a ejecutar el handler. Si llega un duplicado mientras el original
+# sigue en curso, espera a que termine. Las respuestas 5xx no se guardan para que el
+# cliente pueda reintentar. El almacén es por worker y tiene un tamaño máximo: se
+# descartan las respuestas guardadas más antiguas y, si todas las entradas siguen en
+# curso, las claves nuevas reciben 503.
+import asyncio
+from collections import OrderedDict
+from hashlib import sha256
+from time import monotonic
+
+from jose import JWTError
+
+from auth.keys import key_ring
+from config import settings
+from monitoring.metrics import REGISTRY, Counter
+
+IDEMPOTENT_REQUESTS = REGISTRY.register(Counter(
+    "idempotent_requests_total", "Requests with an Idempotency-Key by outcome.", ("outcome",)
+))
+
+class StoredResponse:
+    
+    __slots__ = ("fingerprint", "done", "status", "headers", "body", "expires")
+    
+    def __init__(self, fingerprint: str):
+        self.fingerprint = fingerprint
+        self.done = asyncio.Event()
+        self.status = None
+        self.headers = None
+        self.body = None
+        self.expires = None
+
+class IdempotencyStore:
+    
+    def __init__(self):
+        self._entries: OrderedDict = OrderedDict()
+        
+    def get(self, key):
+        
+        entry = self._entries.get(key)
+        
+        if entry is not None and entry.expires is not None and entry.expires <= monotonic():
+            del self._entries[key]
+            return None
+        
+        return entry
+    
+    # Devuelve None si el almacén está lleno de peticiones en curso.
+    def start(self, key, fingerprint: str) -> StoredResponse | None:
+        
+        if len(self._entries) >= settings.idempotency_max_entries:
+            self._evict()
+            
+        if len(self._entries) >= settings.idempotency_max_entries:
+            return None
+        
+        entry = self._entries[key] = StoredResponse(fingerprint)
+        
+        return entry
+    
+    # Se descartan las entradas terminadas más antiguas; las que siguen en curso se saltan.
+    def _evict(self):
+        
+        for key, entry in list(self._entries.items()):
+            
+            if len(self._entries) < settings.idempotency_max_entries:
+                return
+            
+            if entry.done.is_set():
+                del self._entries[key]
+    
+    def discard(self, key, entry: StoredResponse):
+        
+        if self._entries.get(key) is entry:
+            del self._entries[key]
+            
+        entry.done.set()
+
+def principal_scope(headers: dict) -> str:
+    
+    authorization = headers.get(b"authorization", b"").decode("latin-1")
+    
+    try:
+        return key_ring.decode(authorization.removeprefix("Bearer ").strip())["username"]
+    except (JWTError, KeyError, ValueError):
+        return sha256(authorization.encode()).hexdigest()
+
+async def send_json(send, status: int, body: bytes, headers=()):
+    
+    await send({"type": "http.response.start", "status": status,
+                "headers": [(b"content-type", b"application/json"), *headers]})
+    await send({"type": "http.response.body", "body": body})
+
+class IdempotencyMiddleware:
+    
+    def __init__(self, app):
+        self.app = app
+        self.store = IdempotencyStore()
+        
+    async def __call__(self, scope, receive, send):
+        
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in settings.idempotent_routes:
+            await self.app(scope, receive, send)
+            return
+        
+        headers = dict(scope["headers"])
+        idempotency_key = headers.get(b"idempotency-key")
+        
+        if not idempotency_key:
+            await self.app(scope, receive, send)
+            return
+        
+        # Se lee el cuerpo completo para identificar la petición y se vuelve a entregar al handler.
+        chunks = []
+        more_body = True
+        
+        while more_body:
+            message = await receive()
+            chunks.append(message.get("body", b""))
+            more_body = message.get("more_body", False)
+            
+        body = b"".join(chunks)
+        fingerprint = sha256(scope["query_string"] + b"\0" + body).hexdigest()
+        key = (principal_scope(headers), scope["path"], idempotency_key)
+        
+        entry = self.store.get(key)
+        
+        if entry is not None:
+            
+            if entry.fingerprint != fingerprint:
+                IDEMPOTENT_REQUESTS.inc("mismatch")
+                await send_json(send, 422, b'{"detail":"Idempotency-Key was already used with a different request."}')
+                return
+            
+            await entry.done.wait()
+            
+            if entry.status is not None:
+                IDEMPOTENT_REQUESTS.inc("replayed")
+                await send({"type": "http.response.start", "status": entry.status,
+                            "headers": entry.headers + [(b"idempotent-replayed", b"true")]})
+                await send({"type": "http.response.body", "body": entry.body})
+                return
+            
+            # El original falló sin guardar respuesta: esta petición se ejecuta de nuevo.
+            
+        entry = self.store.start(key, fingerprint)
+        
+        if entry is None:
+            IDEMPOTENT_REQUESTS.inc("rejected")
+            await send_json(send, 503, b'{"detail":"Too many requests in progress, retry later."}',
+                            [(b"retry-after", str(settings.load_shedding_retry_after).encode())])
+            return
+        
+        IDEMPOTENT_REQUESTS.inc("executed")
+        
+        body_sent = False
+        
+        async def replay_receive():
+            
+            nonlocal body_sent
+            
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            
+            return await receive()
+        
+        response = {"status": None, "headers": [], "body": []}
+        
+        async def capture_send(message):
+            
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["headers"] = list(message.get("headers", []))
+            elif message["type"] == "http.response.body":
+                response["body"].append(message.get("body", b""))
+                
+            await send(message)
+            
+        try:
+            await self.app(scope, replay_receive, capture_send)
+        except BaseException:
+            self.store.discard(key, entry)
+            raise
+        
+        response_body = b"".join(response["body"])
+        
+        if response["status"] is None or response["status"] >= 500 or len(response_body) > settings.idempotency_max_body_size:
+            self.store.discard(key, entry)
+            return
+        
+        entry.status = response["status"]
+        entry.headers = response["headers"]
+        entry.body = response_body
+        entry.expires = monotonic() + settings.idempotency_ttl
+        entry.done.set()
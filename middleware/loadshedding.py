@@ -0,0 +1,135 @@
+import asyncio
+
+from monitoring.metrics import REGISTRY, Counter, Gauge
+from config import settings
+
+REQUESTS_SHED = REGISTRY.register(Counter(
+    "http_requests_shed_total", "Requests rejected with 503 by load shedding.", ("lane",)
+))
+
+REQUESTS_IN_FLIGHT = REGISTRY.register(Gauge(
+    "http_requests_in_flight", "Requests currently being processed.", ("lane",)
+))
+
+REQUESTS_QUEUED = REGISTRY.register(Gauge(
+    "http_requests_queued", "Requests waiting for a free slot.", ("lane",)
+))
+
+# Función para decidir a qué carril de prioridad va una petición.
+def request_lane(method: str, path: str) -> str | None:
+    
+    if path in settings.load_shedding_exempt_routes:
+        return None
+    
+    if path == "/token":
+        return "auth"
+    
+    if path in settings.bulk_routes:
+        return "bulk"
+    
+    if method in ("POST", "PUT", "PATCH", "DELETE"):
+        return "write"
+    
+    return "read"
+
+# Función para comprobar al arrancar que los carriles caben en el threadpool.
+def check_lane_capacity():
+    
+    total = sum(limits["max_in_flight"] for limits in settings.load_shedding_lanes.values())
+    
+    if total > settings.threadpool_size:
+        raise RuntimeError(
+            f"load_shedding_lanes admit {total} requests in flight but threadpool_size is "
+            f"{settings.threadpool_size}; the excess would queue inside the threadpool."
+        )
+
+class Lane:
+    
+    def __init__(self, name: str, max_in_flight: int, max_queue: int):
+        self.name = name
+        self.max_queue = max_queue
+        self.semaphore = asyncio.Semaphore(max_in_flight)
+        self.waiting = 0
+
+async def send_overloaded(send, lane: str):
+    
+    await send({
+        "type": "http.response.start",
+        "status": 503,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"retry-after", str(settings.load_shedding_retry_after).encode()),
+        ],
+    })
+    await send({
+        "type": "http.response.body",
+        "body": b'{"detail":"Server overloaded, retry later."}',
+    })
+    
+    REQUESTS_SHED.inc(lane)
+
+# Middleware ASGI que limita las peticiones en curso por carril y responde 503 con
+# Retry-After cuando la cola se llena o la espera supera el tiempo máximo.
+class LoadSheddingMiddleware:
+    
+    def __init__(self, app):
+        self.app = app
+        self._lanes: dict = {}
+        self._loop = None
+        
+    def get_lane(self, name: str) -> Lane:
+        
+        loop = asyncio.get_running_loop()
+        
+        # Los semáforos pertenecen a un event loop; se recrean si cambia.
+        if loop is not self._loop:
+            self._loop = loop
+            self._lanes = {
+                lane_name: Lane(lane_name, **limits)
+                for lane_name, limits in settings.load_shedding_lanes.items()
+            }
+            
+        return self._lanes[name]
+        
+    async def __call__(self, scope, receive, send):
+        
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        lane_name = request_lane(scope["method"], scope["path"])
+        
+        if lane_name is None:
+            await self.app(scope, receive, send)
+            return
+        
+        lane = self.get_lane(lane_name)
+        
+        if lane.semaphore.locked():
+            
+            if lane.waiting >= lane.max_queue:
+                await send_overloaded(send, lane_name)
+                return
+            
+            lane.waiting += 1
+            REQUESTS_QUEUED.inc(lane_name)
+            
+            try:
+                await asyncio.wait_for(lane.semaphore.acquire(), timeout=settings.load_shedding_queue_timeout)
+            except asyncio.TimeoutError:
+                await send_overloaded(send, lane_name)
+                return
+            finally:
+                lane.waiting -= 1
+                REQUESTS_QUEUED.dec(lane_name)
+                
+        else:
+            await lane.semaphore.acquire()
+            
+        REQUESTS_IN_FLIGHT.inc(lane_name)
+        
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            REQUESTS_IN_FLIGHT.dec(lane_name)
+            lane.semaphore.release()
@@ -0,0 +1,291 @@
+# Límite de peticiones por IP, usuario y rol para las rutas de settings.rate_limits.
+#
+# Cada regla usa una ventana deslizante aproximada: se guardan las peticiones de la
+# ventana fija actual y de la anterior, y la anterior cuenta en proporción al tiempo
+# que todavía se solapa con la ventana deslizante. Las peticiones rechazadas no
+# cuentan. El rechazo ocurre en el middleware, antes de abrir sesión de base de
+# datos o verificar contraseñas, y todas las respuestas de las rutas limitadas
+# llevan las cabeceras RateLimit-Limit, RateLimit-Remaining y RateLimit-Reset.
+#
+# Por defecto los contadores son por worker; con RATE_LIMIT_STORE_URL (redis://...)
+# se comparten entre todos los workers.
+import logging
+from math import ceil, floor
+from os import getenv
+from time import time
+from urllib.parse import parse_qs
+
+from dotenv import load_dotenv
+from jose import JWTError
+
+from auth.keys import key_ring
+from config import settings
+from monitoring.metrics import REGISTRY, Counter
+
+logger = logging.getLogger("middleware.ratelimit")
+
+load_dotenv()
+
+RATE_LIMIT_STORE_URL = getenv("RATE_LIMIT_STORE_URL")
+
+REQUESTS_RATE_LIMITED = REGISTRY.register(Counter(
+    "http_requests_rate_limited_total", "Requests rejected with 429 by rate limiting.", ("route", "key")
+))
+
+class RateLimitResult:
+    
+    __slots__ = ("allowed", "limit", "remaining", "reset", "retry_after")
+    
+    def __init__(self, allowed: bool, limit: int, remaining: int, reset: int, retry_after: int):
+        self.allowed = allowed
+        self.limit = limit
+        self.remaining = remaining
+        self.reset = reset
+        self.retry_after = retry_after
+
+# Función para calcular el resultado de una regla a partir de los contadores de la
+# ventana actual y la anterior. "elapsed" es el tiempo transcurrido de la actual.
+def window_result(allowed: bool, limit: int, window: float, elapsed: float, current: int, previous: int):
+    
+    weight = 1 - elapsed / window
+    count = previous * weight + current
+    remaining = max(0, floor(limit - count))
+    reset = ceil(window - elapsed)
+    
+    if allowed:
+        return RateLimitResult(True, limit, remaining, reset, 0)
+    
+    # Tiempo hasta que el contador baje del límite si no llegan más peticiones:
+    # primero decae la ventana anterior y, en la siguiente, la actual.
+    if current < limit and previous:
+        wait = window * (1 - (limit - current) / previous) - elapsed
+        if wait < window - elapsed:
+            return RateLimitResult(False, limit, remaining, reset, max(1, ceil(wait)))
+    
+    wait = window - elapsed + max(0.0, window * (1 - limit / current)) if current else window - elapsed
+    
+    return RateLimitResult(False, limit, remaining, reset, max(1, ceil(wait)))
+
+class MemoryRateLimitStore:
+    
+    def __init__(self):
+        # key -> [window, índice de la ventana actual, peticiones actuales, peticiones anteriores]
+        self._windows: dict = {}
+    
+    def _purge(self, now: float):
+        
+        expired = [key for key, (window, index, _, _) in self._windows.items() if index < now // window - 1]
+        
+        for key in expired:
+            del self._windows[key]
+    
+    async def hit(self, key: str, limit: int, window: float) -> RateLimitResult:
+        
+        now = time()
+        index = int(now // window)
+        entry = self._windows.get(key)
+        
+        if entry is None or entry[1] < index - 1:
+            current, previous = 0, 0
+        elif entry[1] == index - 1:
+            current, previous = 0, entry[2]
+        else:
+            current, previous = entry[2], entry[3]
+        
+        elapsed = now - index * window
+        allowed = previous * (1 - elapsed / window) + current < limit
+        
+        if allowed:
+            current += 1
+            
+            if entry is None and len(self._windows) >= settings.rate_limit_max_entries:
+                self._purge(now)
+            
+            self._windows[key] = [window, index, current, previous]
+        
+        return window_result(allowed, limit, window, elapsed, current, previous)
+
+# Comprueba e incrementa el contador de forma atómica en Redis.
+REDIS_SLIDING_WINDOW = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+if previous * tonumber(ARGV[1]) + current >= tonumber(ARGV[2]) then
+    return {0, current, previous}
+end
+current = redis.call('INCR', KEYS[1])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return {1, current, previous}
+"""
+
+class RedisRateLimitStore:
+    
+    def __init__(self, url: str, prefix: str = "ratelimit"):
+        
+        import redis.asyncio
+        
+        self.prefix = prefix
+        self._redis = redis.asyncio.Redis.from_url(url)
+        self._script = self._redis.register_script(REDIS_SLIDING_WINDOW)
+    
+    async def hit(self, key: str, limit: int, window: float) -> RateLimitResult:
+        
+        now = time()
+        index = int(now // window)
+        elapsed = now - index * window
+        
+        allowed, current, previous = await self._script(
+            keys=[f"{self.prefix}:{key}:{index}", f"{self.prefix}:{key}:{index - 1}"],
+            args=[1 - elapsed / window, limit, ceil(window * 2)],
+        )
+        
+        return window_result(bool(allowed), limit, window, elapsed, int(current), int(previous))
+
+def create_store():
+    
+    if RATE_LIMIT_STORE_URL:
+        return RedisRateLimitStore(RATE_LIMIT_STORE_URL)
+    
+    return MemoryRateLimitStore()
+
+def client_ip(scope, headers: dict) -> str:
+    
+    if settings.rate_limit_trust_forwarded and b"x-forwarded-for" in headers:
+        return headers[b"x-forwarded-for"].decode("latin-1").split(",")[0].strip()
+    
+    client = scope.get("client")
+    
+    return client[0] if client else "unknown"
+
+def token_payload(headers: dict) -> dict:
+    
+    authorization = headers.get(b"authorization", b"").decode("latin-1")
+    
+    if not authorization.startswith("Bearer "):
+        return {}
+    
+    try:
+        return key_ring.decode(authorization.removeprefix("Bearer ").strip())
+    except (JWTError, ValueError):
+        return {}
+
+def rate_limit_headers(result: RateLimitResult):
+    
+    headers = [
+        (b"ratelimit-limit", str(result.limit).encode()),
+        (b"ratelimit-remaining", str(result.remaining).encode()),
+        (b"ratelimit-reset", str(result.reset).encode()),
+    ]
+    
+    if not result.allowed:
+        headers.append((b"retry-after", str(result.retry_after).encode()))
+    
+    return headers
+
+async def send_rate_limited(send, result: RateLimitResult):
+    
+    await send({
+        "type": "http.response.start",
+        "status": 429,
+        "headers": [(b"content-type", b"application/json")] + rate_limit_headers(result),
+    })
+    await send({
+        "type": "http.response.body",
+        "body": b'{"detail":"Too many requests, retry later."}',
+    })
+
+# Función para leer el cuerpo completo y devolver un receive que lo entrega de nuevo.
+async def buffer_body(receive):
+    
+    chunks = []
+    more_body = True
+    
+    while more_body:
+        message = await receive()
+        chunks.append(message.get("body", b""))
+        more_body = message.get("more_body", False)
+    
+    body = b"".join(chunks)
+    body_sent = False
+    
+    async def replay_receive():
+        
+        nonlocal body_sent
+        
+        if not body_sent:
+            body_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        
+        return await receive()
+    
+    return body, replay_receive
+
+class RateLimitMiddleware:
+    
+    def __init__(self, app, store=None):
+        self.app = app
+        self.store = store or create_store()
+    
+    async def __call__(self, scope, receive, send):
+        
+        rules = settings.rate_limits.get(scope["path"]) if scope["type"] == "http" else None
+        
+        if not rules:
+            await self.app(scope, receive, send)
+            return
+        
+        headers = dict(scope["headers"])
+        payload = token_payload(headers)
+        username = payload.get("username")
+        
+        # En '/token' el usuario todavía no tiene token: se toma del formulario, que
+        # se vuelve a entregar intacto al handler.
+        if username is None and scope["method"] == "POST" and any(rule["key"] == "user" for rule in rules) \
+                and headers.get(b"content-type", b"").startswith(b"application/x-www-form-urlencoded"):
+            
+            body, receive = await buffer_body(receive)
+            username = parse_qs(body.decode("latin-1")).get("username", [None])[0]
+        
+        identities = {
+            "ip": client_ip(scope, headers),
+            "user": username[:100] if username else None,
+            "role": payload.get("role"),
+        }
+        
+        tightest = None
+        
+        for index, rule in enumerate(rules):
+            
+            identity = identities[rule["key"]]
+            
+            if identity is None:
+                continue
+            
+            limit = rule.get("roles", {}).get(payload.get("role"), rule["limit"])
+            
+            try:
+                result = await self.store.hit(f"{scope['path']}:{index}:{identity}", limit, rule["window"])
+            except Exception:
+                # Si el almacén compartido no responde se deja pasar la petición.
+                logger.exception("Rate limit store unavailable")
+                continue
+            
+            if not result.allowed:
+                REQUESTS_RATE_LIMITED.inc(scope["path"], rule["key"])
+                await send_rate_limited(send, result)
+                return
+            
+            if tightest is None or result.remaining < tightest.remaining:
+                tightest = result
+        
+        if tightest is None:
+            await self.app(scope, receive, send)
+            return
+        
+        async def send_with_headers(message):
+            
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": list(message.get("headers", [])) + rate_limit_headers(tightest)}
+            
+            await send(message)
+        
+        await self.app(scope, receive, send_with_headers)
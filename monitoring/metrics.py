@@ -0,0 +1,186 @@
+from bisect import bisect_left
+from threading import Lock
+
+# Buckets por defecto de Prometheus (segundos).
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+
+# Buckets para contar consultas SQL por petición.
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 4, 5, 7, 10, 15, 20, 30, 50, 100)
+
+def _format_labels(names, values, extra: str = ""):
+    
+    pairs = [f'{name}="{str(value)}"' for name, value in zip(names, values)]
+    
+    if extra:
+        pairs.append(extra)
+        
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value):
+    
+    if value == float("inf"):
+        return "+Inf"
+    
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: dict = {}
+        self._lock = Lock()
+        
+    def inc(self, *labelvalues, amount: float = 1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+            
+    def value(self, *labelvalues):
+        with self._lock:
+            return self._values.get(labelvalues, 0)
+            
+    def render(self):
+        
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        
+        with self._lock:
+            for labelvalues, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}")
+                
+        return lines
+
+class Gauge:
+    
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: dict = {}
+        self._lock = Lock()
+        
+    def set(self, value: float, *labelvalues):
+        with self._lock:
+            self._values[labelvalues] = value
+            
+    def inc(self, *labelvalues, amount: float = 1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+            
+    def dec(self, *labelvalues, amount: float = 1):
+        self.inc(*labelvalues, amount=-amount)
+            
+    def value(self, *labelvalues):
+        with self._lock:
+            return self._values.get(labelvalues, 0)
+            
+    def render(self):
+        
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        
+        with self._lock:
+            for labelvalues, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}")
+                
+        return lines
+
+class Histogram:
+    
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets) + (float("inf"),)
+        self._values: dict = {}
+        self._lock = Lock()
+        
+    def observe(self, value: float, *labelvalues):
+        
+        index = bisect_left(self.buckets, value)
+        
+        with self._lock:
+            
+            counts, total = self._values.get(labelvalues, ([0] * len(self.buckets), 0))
+            counts[index] += 1
+            self._values[labelvalues] = (counts, total + value)
+            
+    def count(self, *labelvalues):
+        with self._lock:
+            counts, _ = self._values.get(labelvalues, ([0], 0))
+            return sum(counts)
+            
+    def render(self):
+        
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        
+        with self._lock:
+            for labelvalues, (counts, total) in sorted(self._values.items()):
+                
+                cumulative = 0
+                
+                for bound, count in zip(self.buckets, counts):
+                    cumulative += count
+                    labels = _format_labels(self.labelnames, labelvalues, f'le="{_format_value(bound)}"')
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                    
+                labels = _format_labels(self.labelnames, labelvalues)
+                lines.append(f"{self.name}_sum{labels} {_format_value(float(total))}")
+                lines.append(f"{self.name}_count{labels} {cumulative}")
+                
+        return lines
+
+class Registry:
+    
+    def __init__(self):
+        self._metrics = []
+        
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+        
+    def render(self) -> str:
+        
+        lines = []
+        
+        for metric in self._metrics:
+            lines.extend(metric.render())
+            
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+REQUESTS_TOTAL = REGISTRY.register(Counter(
+    "http_requests_total", "Total HTTP requests.", ("method", "route", "status")
+))
+
+REQUEST_DURATION = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency.", ("method", "route")
+))
+
+DB_QUERIES_PER_REQUEST = REGISTRY.register(Histogram(
+    "db_queries_per_request", "SQL statements executed per request.", ("route",), QUERY_COUNT_BUCKETS
+))
+
+DB_TIME_PER_REQUEST = REGISTRY.register(Histogram(
+    "db_time_per_request_seconds", "Total time spent in SQL statements per request.", ("route",)
+))
+
+PASSWORD_HASH_DURATION = REGISTRY.register(Histogram(
+    "password_hash_duration_seconds", "Time spent in auth.hash functions.", ("function",)
+))
+
+STARTUP_DURATION = REGISTRY.register(Gauge(
+    "app_startup_seconds", "Time from the lifespan startup of this worker until it is ready."
+))
+
+WARMUP_DURATION = REGISTRY.register(Gauge(
+    "app_warmup_seconds", "Time spent in each warm-up step of this worker.", ("step",)
+))
+
+SQLITE_WRITER_WAIT = REGISTRY.register(Histogram(
+    "sqlite_writer_wait_seconds", "Time write transactions waited for the SQLite single-writer lock."
+))
+
+READY = REGISTRY.register(Gauge(
+    "app_ready", "1 when this worker is warmed up and reports ready on /ready."
+))
@@ -0,0 +1,87 @@
+import logging
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from config import settings
+
+logger = logging.getLogger("sql.queries")
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+# Función para describir la forma de los parámetros sin registrar sus valores.
+def parameters_shape(parameters, executemany: bool = False):
+    
+    if executemany and isinstance(parameters, (list, tuple)):
+        shape = parameters_shape(parameters[0]) if parameters else "[]"
+        return f"{len(parameters)} x {shape}"
+    
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{key}: {type(value).__name__}" for key, value in parameters.items()) + "}"
+    
+    if isinstance(parameters, (list, tuple)):
+        return "(" + ", ".join(type(value).__name__ for value in parameters) + ")"
+    
+    return type(parameters).__name__
+
+def log_slow_query(statement: str, parameters, executemany: bool, elapsed: float, route: str | None):
+    
+    if elapsed < settings.slow_query_threshold:
+        return
+    
+    logger.warning(
+        "Slow query (%.1f ms) on %s: %s params=%s",
+        elapsed * 1000, route or "no request", " ".join(statement.split()),
+        parameters_shape(parameters, executemany)
+    )
+
+def check_query_budget(route: str, queries: int):
+    
+    budget = settings.query_budgets.get(route)
+    
+    if budget is not None and queries > budget:
+        logger.warning("Query budget exceeded on %s: %d queries (budget %d)", route, queries, budget)
+
+# Contador de consultas para usar en tests: registra todas las sentencias que se
+# ejecutan sobre el engine mientras está activo, sin importar el hilo.
+class QueryCounter:
+    
+    def __init__(self):
+        self.statements = []
+        
+    @property
+    def count(self):
+        return len(self.statements)
+        
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+@contextmanager
+def count_queries(engine):
+    
+    counter = QueryCounter()
+    event.listen(engine, "before_cursor_execute", counter._record)
+    
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", counter._record)
+
+# Falla si el bloque ejecuta más consultas de las declaradas, por ejemplo:
+#
+#     with query_budget(engine, 3):
+#         client.get("/student/get-courses", headers=headers)
+@contextmanager
+def query_budget(engine, max_queries: int):
+    
+    with count_queries(engine) as counter:
+        yield counter
+        
+    if counter.count > max_queries:
+        
+        statements = "\n".join(f"  {' '.join(statement.split())}" for statement in counter.statements)
+        
+        raise QueryBudgetExceeded(
+            f"Expected at most {max_queries} queries, got {counter.count}:\n{statements}"
+        )
@@ -0,0 +1,102 @@
+from contextvars import ContextVar
+from time import perf_counter
+
+from sqlalchemy import event
+
+from .metrics import REQUESTS_TOTAL, REQUEST_DURATION, DB_QUERIES_PER_REQUEST, DB_TIME_PER_REQUEST
+from .queries import log_slow_query, check_query_budget
+
+# Estadísticas de la petición en curso. Es un objeto mutable para que las consultas
+# ejecutadas en el threadpool (que recibe una copia del contexto) se acumulen aquí.
+class RequestStats:
+    
+    __slots__ = ("scope", "queries", "db_time")
+    
+    def __init__(self, scope=None):
+        self.scope = scope
+        self.queries = 0
+        self.db_time = 0.0
+
+current_request_stats: ContextVar[RequestStats | None] = ContextVar("current_request_stats", default=None)
+
+# Función para registrar los eventos de SQLAlchemy que cuentan y cronometran las consultas.
+def instrument_engine(engine):
+    
+    if getattr(engine, "_request_stats_instrumented", False):
+        return
+    
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(perf_counter())
+        
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        
+        elapsed = perf_counter() - conn.info["query_start_time"].pop()
+        stats = current_request_stats.get()
+        
+        if stats is not None:
+            stats.queries += 1
+            stats.db_time += elapsed
+            
+        route = route_template(stats.scope) if stats is not None else None
+        log_slow_query(statement, parameters, executemany, elapsed, route)
+        
+    # after_cursor_execute no se ejecuta si la sentencia falla.
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        
+        connection = exception_context.connection
+        start_times = connection.info.get("query_start_time") if connection is not None else None
+        
+        if start_times:
+            start_times.pop()
+            
+    engine._request_stats_instrumented = True
+
+def route_template(scope) -> str:
+    
+    route = scope.get("route")
+    
+    # Las rutas no encontradas se agrupan para no crear una serie por URL.
+    return getattr(route, "path", None) or "unmatched"
+
+# Middleware ASGI que registra latencia, códigos de estado y consultas por ruta.
+class MetricsMiddleware:
+    
+    def __init__(self, app):
+        self.app = app
+        
+    async def __call__(self, scope, receive, send):
+        
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        stats = RequestStats(scope)
+        token = current_request_stats.set(stats)
+        status_code = 500
+        start = perf_counter()
+        
+        async def send_wrapper(message):
+            
+            nonlocal status_code
+            
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                
+            await send(message)
+            
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            
+            elapsed = perf_counter() - start
+            current_request_stats.reset(token)
+            route = route_template(scope)
+            
+            REQUESTS_TOTAL.inc(scope["method"], route, status_code)
+            REQUEST_DURATION.observe(elapsed, scope["method"], route)
+            DB_QUERIES_PER_REQUEST.observe(stats.queries, route)
+            DB_TIME_PER_REQUEST.observe(stats.db_time, route)
+            check_query_budget(route, stats.queries)
@@ -0,0 +1,329 @@
+# Trazas de las peticiones: un span por petición con spans hijos por cada sentencia
+# SQL, cada llamada de auth.hash y las funciones marcadas con @traced.
+#
+# El contexto se propaga con la cabecera W3C traceparent, así que las trazas se
+# encadenan con las de servicios instrumentados con OpenTelemetry, y los spans se
+# exportan con los nombres de campo de OTLP/JSON (traceId, spanId, parentSpanId...).
+#
+# Configuración por variables de entorno:
+#     TRACING_EXPORTER    none (por defecto), console o file
+#     TRACING_FILE        fichero JSONL para el exportador file (traces/spans.jsonl)
+#     TRACE_SAMPLE_RATE   fracción de peticiones nuevas que se trazan (1.0)
+# Si la petición trae traceparent, se respeta su decisión de muestreo.
+import json
+import logging
+import os
+import random
+import sys
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from threading import Lock
+from time import time_ns
+
+from dotenv import load_dotenv
+from sqlalchemy import event
+
+logger = logging.getLogger("monitoring.tracing")
+
+load_dotenv()
+
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "none").lower()
+TRACING_FILE = os.getenv("TRACING_FILE", "traces/spans.jsonl")
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))
+
+class Span:
+    
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "start", "end", "attributes", "error")
+    
+    def __init__(self, name: str, trace_id: str, parent_id: str | None = None, kind: str = "internal",
+                 attributes: dict | None = None):
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start = time_ns()
+        self.end = None
+        self.attributes = dict(attributes or {})
+        self.error = None
+    
+    def child(self, name: str, kind: str = "internal", attributes: dict | None = None):
+        return Span(name, self.trace_id, self.span_id, kind, attributes)
+    
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+    
+    def finish(self, error: BaseException | None = None):
+        
+        self.end = time_ns()
+        
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        
+        exporter.export(self)
+    
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+    
+    def to_dict(self):
+        
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": f"SPAN_KIND_{self.kind.upper()}",
+            "startTimeUnixNano": self.start,
+            "endTimeUnixNano": self.end,
+            "attributes": self.attributes,
+            "status": {"code": "STATUS_CODE_ERROR", "message": self.error} if self.error else {"code": "STATUS_CODE_UNSET"},
+        }
+        
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        
+        return span
+
+# Span de la operación en curso. Es None fuera de una petición trazada, así que
+# los spans hijos no cuestan nada cuando la petición no se muestrea.
+current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+class NoopExporter:
+    
+    enabled = False
+    
+    def export(self, span: Span):
+        pass
+    
+    def close(self):
+        pass
+
+class ConsoleExporter:
+    
+    enabled = True
+    
+    def __init__(self):
+        self._lock = Lock()
+    
+    def export(self, span: Span):
+        
+        line = json.dumps(span.to_dict(), default=str)
+        
+        with self._lock:
+            sys.stderr.write(line + "\n")
+    
+    def close(self):
+        pass
+
+class FileExporter:
+    
+    enabled = True
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = Lock()
+        self._file = None
+    
+    def export(self, span: Span):
+        
+        line = json.dumps(span.to_dict(), default=str)
+        
+        with self._lock:
+            
+            # Se abre en el primer span para que cada worker tenga su propio descriptor.
+            if self._file is None:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                self._file = open(self.path, "a", buffering=1, encoding="utf-8")
+            
+            self._file.write(line + "\n")
+    
+    def close(self):
+        
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+def create_exporter():
+    
+    if TRACING_EXPORTER == "console":
+        return ConsoleExporter()
+    
+    if TRACING_EXPORTER == "file":
+        return FileExporter(TRACING_FILE)
+    
+    if TRACING_EXPORTER not in ("", "none"):
+        logger.warning("Unknown TRACING_EXPORTER %r, tracing is disabled", TRACING_EXPORTER)
+    
+    return NoopExporter()
+
+exporter = create_exporter()
+
+# Función para leer la cabecera traceparent: (trace_id, parent_id, sampled) o None.
+def parse_traceparent(value: str | None):
+    
+    if not value:
+        return None
+    
+    parts = value.strip().split("-")
+    
+    if len(parts) < 4 or len(parts[1]) != 32 or len(parts[2]) != 16 or parts[1] == "0" * 32 or parts[2] == "0" * 16:
+        return None
+    
+    try:
+        int(parts[1], 16), int(parts[2], 16)
+        sampled = bool(int(parts[3][:2], 16) & 1)
+    except ValueError:
+        return None
+    
+    return parts[1], parts[2], sampled
+
+# Span raíz de una petición, o None si no se traza.
+def start_request_span(name: str, traceparent: str | None, attributes: dict | None = None):
+    
+    if not exporter.enabled:
+        return None
+    
+    incoming = parse_traceparent(traceparent)
+    
+    if incoming is not None:
+        
+        trace_id, parent_id, sampled = incoming
+        
+        if not sampled:
+            return None
+        
+        return Span(name, trace_id, parent_id, "server", attributes)
+    
+    if random.random() >= TRACE_SAMPLE_RATE:
+        return None
+    
+    return Span(name, os.urandom(16).hex(), None, "server", attributes)
+
+@contextmanager
+def start_span(name: str, attributes: dict | None = None):
+    
+    parent = current_span.get()
+    
+    if parent is None:
+        yield None
+        return
+    
+    span = parent.child(name, attributes=attributes)
+    token = current_span.set(span)
+    
+    try:
+        yield span
+    except BaseException as error:
+        span.finish(error)
+        raise
+    else:
+        span.finish()
+    finally:
+        current_span.reset(token)
+
+# Decorador para trazar una función como span hijo de la operación en curso.
+def traced(name: str):
+    
+    def decorator(function):
+        
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            with start_span(name):
+                return function(*args, **kwargs)
+        
+        return wrapper
+    
+    return decorator
+
+# Función para registrar un span por cada sentencia SQL del engine.
+def trace_engine(engine):
+    
+    if getattr(engine, "_tracing_instrumented", False):
+        return
+    
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        
+        parent = current_span.get()
+        
+        conn.info.setdefault("trace_spans", []).append(parent.child("db.query", "client", {
+            "db.system": engine.dialect.name,
+            "db.statement": statement[:1000],
+        }) if parent is not None else None)
+    
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        
+        span = conn.info["trace_spans"].pop()
+        
+        if span is not None:
+            span.finish()
+    
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        
+        connection = exception_context.connection
+        spans = connection.info.get("trace_spans") if connection is not None else None
+        
+        if spans:
+            span = spans.pop()
+            if span is not None:
+                span.finish(exception_context.original_exception)
+    
+    engine._tracing_instrumented = True
+
+# Middleware ASGI que abre el span de cada petición y lo deja como contexto para
+# los spans hijos, también en el threadpool (que recibe una copia del contexto).
+class TracingMiddleware:
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        headers = dict(scope["headers"])
+        traceparent = headers.get(b"traceparent", b"").decode("latin-1") or None
+        
+        span = start_request_span(f"{scope['method']} {scope['path']}", traceparent, {
+            "http.method": scope["method"],
+            "http.target": scope["path"],
+        })
+        
+        if span is None:
+            await self.app(scope, receive, send)
+            return
+        
+        token = current_span.set(span)
+        
+        async def send_wrapper(message):
+            
+            if message["type"] == "http.response.start":
+                span.set_attribute("http.status_code", message["status"])
+                message = {**message, "headers": list(message.get("headers", [])) + [
+                    (b"traceparent", span.traceparent().encode())
+                ]}
+            
+            await send(message)
+        
+        error = None
+        
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException as exc:
+            error = exc
+            raise
+        finally:
+            
+            current_span.reset(token)
+            route = getattr(scope.get("route"), "path", None)
+            
+            if route:
+                span.name = f"{scope['method']} {route}"
+                span.set_attribute("http.route", route)
+            
+            span.finish(error)
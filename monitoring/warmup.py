@@ -0,0 +1,161 @@
+# Calentamiento de cada worker y estado de '/ready'.
+#
+# Las primeras peticiones tras un despliegue pagan la apertura de conexiones, la
+# compilación de las consultas de crud, la carga del backend de bcrypt y de las
+# claves JWT. El lifespan lanza estos pasos en segundo plano y '/ready' no responde
+# 200 hasta que terminan, así el balanceador no manda tráfico a workers en frío.
+import asyncio
+import logging
+from threading import Lock
+from time import perf_counter
+
+import anyio.to_thread
+from bcrypt import gensalt, hashpw
+from sqlalchemy import text
+from sqlalchemy.orm import configure_mappers
+from sqlalchemy.pool import QueuePool
+
+from auth.hash import pwd_context
+from auth.token import create_access_token, get_current_user
+from sql import crud
+from sql.database import SessionLocal, get_engine
+from monitoring.metrics import READY, STARTUP_DURATION, WARMUP_DURATION
+from config import settings
+
+logger = logging.getLogger("app.warmup")
+
+class Readiness:
+    
+    def __init__(self):
+        self._lock = Lock()
+        self.ready = False
+        self.reason = "starting"
+    
+    def mark_ready(self):
+        
+        with self._lock:
+            self.ready = True
+            self.reason = None
+        
+        READY.set(1)
+    
+    def mark_not_ready(self, reason: str):
+        
+        with self._lock:
+            self.ready = False
+            self.reason = reason
+        
+        READY.set(0)
+    
+    def status(self):
+        
+        with self._lock:
+            return {"status": "ready"} if self.ready else {"status": "not ready", "reason": self.reason}
+
+readiness = Readiness()
+
+# Abre a la vez tantas conexiones como el tamaño mínimo del pool y las devuelve.
+def warm_pool():
+    
+    engine = get_engine()
+    size = engine.pool.size() if isinstance(engine.pool, QueuePool) else 1
+    connections = []
+    
+    try:
+        
+        for _ in range(size):
+            connection = engine.connect()
+            connections.append(connection)
+            connection.execute(text("SELECT 1"))
+    
+    finally:
+        for connection in connections:
+            connection.close()
+
+# Ejecuta una vez las consultas más usadas para que queden en la caché de
+# compilación del engine. Los valores no existen: solo importa el SQL.
+HOT_QUERIES = (
+    lambda db: crud.get_admin_by_username(db=db, username=""),
+    lambda db: crud.get_professor_by_username(db=db, username=""),
+    lambda db: crud.get_student_by_username(db=db, username=""),
+    lambda db: crud.get_table_versions(db=db, names=("courses", "inscriptions", "professors")),
+    lambda db: crud.get_table_versions(db=db, names=("courses",)),
+    lambda db: crud.get_table_versions(db=db, names=("courses", "inscriptions")),
+    lambda db: crud.get_course_by_name(db=db, course_name=""),
+    lambda db: crud.get_courses_of_professor_rows(db=db, professor_id=0),
+    lambda db: crud.get_task_by_id(db=db, task_id=0),
+)
+
+def warm_queries():
+    
+    configure_mappers()
+    db = SessionLocal()
+    
+    try:
+        
+        for query in HOT_QUERIES:
+            query(db)
+    
+    finally:
+        db.rollback()
+        db.close()
+
+# Carga el backend de bcrypt de passlib con un hash de coste mínimo.
+def warm_hashing():
+    
+    pwd_context.verify("warmup", hashpw(b"warmup", gensalt(rounds=4)))
+
+# Carga las claves de firma y sincroniza los tokens revocados.
+def warm_jwt():
+    
+    get_current_user(token=create_access_token(data={"username": "warmup", "role": "warmup"}))
+
+WARMUP_STEPS = (
+    ("pool", warm_pool),
+    ("queries", warm_queries),
+    ("hashing", warm_hashing),
+    ("jwt", warm_jwt),
+)
+
+# Función para ejecutar los pasos indicados; devuelve los que fallaron.
+def run_steps(steps):
+    
+    failed = []
+    
+    for name, step in steps:
+        
+        start = perf_counter()
+        
+        try:
+            step()
+        except Exception:
+            logger.exception("Warm-up step %r failed", name)
+            failed.append((name, step))
+            continue
+        
+        WARMUP_DURATION.set(perf_counter() - start, name)
+    
+    return failed
+
+# Se repiten los pasos fallidos hasta que todos terminan bien. 'started' es el
+# inicio del lifespan: el arranque del worker termina cuando está listo.
+async def warm_up(started: float | None = None):
+    
+    start = perf_counter()
+    started = start if started is None else started
+    pending = list(WARMUP_STEPS)
+    
+    while True:
+        
+        pending = await anyio.to_thread.run_sync(run_steps, pending)
+        
+        if not pending:
+            break
+        
+        readiness.mark_not_ready(f"warm-up failed: {', '.join(name for name, _ in pending)}")
+        await asyncio.sleep(settings.warmup_retry_interval)
+    
+    readiness.mark_ready()
+    STARTUP_DURATION.set(perf_counter() - started)
+    logger.info("Worker warmed up in %.1f ms, ready %.1f ms after startup",
+                (perf_counter() - start) * 1000, (perf_counter() - started) * 1000)
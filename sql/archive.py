@@ -0,0 +1,174 @@
+# Comando para mover a las tablas de archivo los cursos cerrados, con sus
+# inscripciones, tareas y notas.
+#
+# Uso:
+#     python -m sql.archive --ended-before 2026-07-01             archiva los cursos cerrados
+#     python -m sql.archive --ended-before 2026-07-01 --dry-run   solo cuenta lo que se archivaría
+#
+# courses.semester es el nivel del plan de estudios (1-10), no un periodo del
+# calendario, así que no dice si un curso ha terminado. Un curso está cerrado si
+# tiene tareas, ninguna sigue activa y todas terminaron antes de la fecha de corte,
+# que no puede ser futura. Los cursos sin tareas no se archivan. Cada lote de
+# cursos se copia y se borra de las tablas vivas en una única transacción, así que
+# el comando puede interrumpirse y volver a lanzarse sin perder ni duplicar filas.
+import argparse
+import logging
+from datetime import datetime
+
+from sqlalchemy import DateTime, exists, insert, literal, or_, select
+from sqlalchemy.orm import Session
+
+from . import models
+from .crud import bump_table_versions
+from .database import SessionLocal
+from config import settings
+
+logger = logging.getLogger("sql.archive")
+
+# Filtro de los cursos que se pueden archivar: con tareas, todas inactivas y
+# terminadas antes de 'ended_before'.
+def archivable_courses(ended_before: datetime):
+    
+    any_task = exists().where(models.Task.course_id == models.Course.course_id)
+    open_task = exists().where(
+        models.Task.course_id == models.Course.course_id,
+        or_(models.Task.active.is_(True), models.Task.end_date >= ended_before)
+    )
+    
+    return select(models.Course.course_id).where(
+        any_task,
+        ~open_task
+    ).order_by(models.Course.course_id)
+
+def count_archivable(db: Session, ended_before: datetime):
+    
+    course_ids = archivable_courses(ended_before).subquery()
+    task_ids = select(models.Task.task_id).where(models.Task.course_id.in_(select(course_ids)))
+    
+    return {
+        "courses": db.query(course_ids).count(),
+        "inscriptions": db.query(models.Inscription).filter(models.Inscription.course_id.in_(select(course_ids))).count(),
+        "tasks": db.query(models.Task).filter(models.Task.course_id.in_(select(course_ids))).count(),
+        "notes": db.query(models.Note).filter(models.Note.task_id.in_(task_ids)).count(),
+    }
+
+# Función para copiar un lote de cursos a las tablas de archivo y borrarlos de las
+# tablas vivas. No hace commit: la transacción la controla quien la llama.
+def archive_batch(db: Session, course_ids: list, archived_at: datetime):
+    
+    archived_at = literal(archived_at, DateTime)
+    task_ids = select(models.Task.task_id).where(models.Task.course_id.in_(course_ids))
+    
+    db.execute(insert(models.ArchivedNote).from_select(
+        ["note_id", "note", "task_id", "student_id", "archived_at"],
+        select(models.Note.note_id, models.Note.note, models.Note.task_id, models.Note.student_id, archived_at)
+        .where(models.Note.task_id.in_(task_ids))
+    ))
+    
+    db.execute(insert(models.ArchivedTask).from_select(
+        ["task_id", "course_id", "name", "description", "start_date", "end_date", "unique_filename", "active", "archived_at"],
+        select(models.Task.task_id, models.Task.course_id, models.Task.name, models.Task.description,
+               models.Task.start_date, models.Task.end_date, models.Task.unique_filename, models.Task.active,
+               archived_at)
+        .where(models.Task.course_id.in_(course_ids))
+    ))
+    
+    db.execute(insert(models.ArchivedInscription).from_select(
+        ["inscription_id", "course_id", "student_id", "archived_at"],
+        select(models.Inscription.inscription_id, models.Inscription.course_id, models.Inscription.student_id,
+               archived_at)
+        .where(models.Inscription.course_id.in_(course_ids))
+    ))
+    
+    db.execute(insert(models.ArchivedCourse).from_select(
+        ["course_id", "professor_id", "name", "password", "description", "semester", "program",
+         "profile_picture", "archived_at"],
+        select(models.Course.course_id, models.Course.professor_id, models.Course.name, models.Course.password,
+               models.Course.description, models.Course.semester, models.Course.program,
+               models.Course.profile_picture, archived_at)
+        .where(models.Course.course_id.in_(course_ids))
+    ))
+    
+    counts = {
+        "notes": db.query(models.Note).filter(models.Note.task_id.in_(task_ids)).delete(synchronize_session=False),
+        "tasks": db.query(models.Task).filter(models.Task.course_id.in_(course_ids)).delete(synchronize_session=False),
+        "inscriptions": db.query(models.Inscription).filter(
+            models.Inscription.course_id.in_(course_ids)
+        ).delete(synchronize_session=False),
+        "courses": db.query(models.Course).filter(models.Course.course_id.in_(course_ids)).delete(synchronize_session=False),
+    }
+    
+    # Invalida los ETag, el índice de autocompletado y los rankings de los demás procesos.
+    bump_table_versions(db, "courses", "inscriptions", "notes")
+    
+    return counts
+
+# Función para archivar todos los cursos cerrados antes de 'ended_before', en lotes
+# de batch_size cursos por transacción.
+def archive_closed_courses(ended_before: datetime, batch_size: int = settings.archive_batch_size):
+    
+    if ended_before > datetime.utcnow():
+        raise ValueError("ended_before can't be in the future: courses still running would be archived.")
+    
+    totals = {"courses": 0, "inscriptions": 0, "tasks": 0, "notes": 0}
+    archived_at = datetime.utcnow()
+    db = SessionLocal()
+    
+    try:
+        
+        while True:
+            
+            course_ids = list(db.scalars(archivable_courses(ended_before).limit(batch_size)))
+            
+            if not course_ids:
+                break
+            
+            try:
+                counts = archive_batch(db=db, course_ids=course_ids, archived_at=archived_at)
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+            
+            for name, count in counts.items():
+                totals[name] += count
+            
+            logger.info("Archived %d course(s) up to course_id %d", counts["courses"], course_ids[-1])
+    
+    finally:
+        db.close()
+    
+    return totals
+
+def main():
+    
+    parser = argparse.ArgumentParser(description="Move closed courses to the archive tables.")
+    parser.add_argument("--ended-before", type=datetime.fromisoformat, required=True,
+                        help="Archive courses whose tasks are all inactive and ended before this date (UTC).")
+    parser.add_argument("--batch-size", type=int, default=settings.archive_batch_size,
+                        help="Courses moved per transaction.")
+    parser.add_argument("--dry-run", action="store_true", help="Only count what would be archived.")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    
+    if args.ended_before > datetime.utcnow():
+        parser.error("--ended-before can't be in the future.")
+    
+    if args.dry_run:
+        
+        db = SessionLocal()
+        
+        try:
+            counts = count_archivable(db=db, ended_before=args.ended_before)
+        finally:
+            db.close()
+        
+        print("Would archive " + ", ".join(f"{count} {name}" for name, count in counts.items()) + ".")
+        return
+    
+    totals = archive_closed_courses(ended_before=args.ended_before, batch_size=max(args.batch_size, 1))
+    print("Archived " + ", ".join(f"{count} {name}" for name, count in totals.items()) + ".")
+
+if __name__ == "__main__":
+    main()
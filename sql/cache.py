@@ -0,0 +1,154 @@
+from collections import OrderedDict
+from threading import Event, Lock
+from time import monotonic
+
+from config import settings
+from monitoring.metrics import REGISTRY, Counter
+
+SINGLEFLIGHT_REQUESTS = REGISTRY.register(Counter(
+    "singleflight_requests_total",
+    "Coalesced reads by outcome: leader ran the query, shared waited for it, cached reused it.",
+    ("route", "outcome")
+))
+
+# Caché en memoria de los rankings. Cada entrada se guarda con la versión de la
+# tabla notes con la que se calculó: una nota nueva (en cualquier worker) cambia la
+# versión y las páginas anteriores dejan de encontrarse. Además caducan tras
+# settings.ranking_cache_ttl y se descartan las menos usadas al superar el tamaño.
+class RankingCache:
+    
+    def __init__(self, max_entries: int | None = None):
+        self._lock = Lock()
+        self._entries: OrderedDict = OrderedDict()
+        self.max_entries = max_entries or settings.ranking_cache_max_entries
+    
+    def get(self, kind: str, object_id: int, version: int, key: tuple):
+        
+        full_key = (kind, object_id, version, *key)
+        
+        with self._lock:
+            
+            entry = self._entries.get(full_key)
+            
+            if entry is None:
+                return None
+            
+            expires, value = entry
+            
+            if expires <= monotonic():
+                del self._entries[full_key]
+                return None
+            
+            self._entries.move_to_end(full_key)
+            
+            return value
+    
+    def set(self, kind: str, object_id: int, version: int, key: tuple, value):
+        
+        with self._lock:
+            
+            self._entries[(kind, object_id, version, *key)] = (monotonic() + settings.ranking_cache_ttl, value)
+            
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+ranking_cache = RankingCache()
+
+
+class _Call:
+    
+    __slots__ = ("done", "result", "error", "expires", "generation")
+    
+    def __init__(self, generation: int):
+        self.done = Event()
+        self.result = None
+        self.error = None
+        self.expires = 0.0
+        self.generation = generation
+
+# Coalescencia de lecturas idénticas (single-flight): mientras una consulta con la
+# misma clave está en curso, las demás peticiones esperan y comparten su resultado.
+# Los resultados se comparten entre peticiones, así que no deben modificarse.
+class SingleFlight:
+    
+    def __init__(self, max_entries: int = 4096):
+        self._lock = Lock()
+        self._calls: dict = {}
+        self._generation = 0
+        self.max_entries = max_entries
+        
+    def do(self, route: str, key: tuple, function):
+        
+        full_key = (route, *key)
+        now = monotonic()
+        
+        with self._lock:
+            
+            call = self._calls.get(full_key)
+            
+            if call is not None and call.done.is_set() and call.expires <= now:
+                call = None
+                
+            if call is None:
+                
+                if len(self._calls) >= self.max_entries:
+                    self._sweep(now)
+                    
+                call = self._calls[full_key] = _Call(self._generation)
+                leader = True
+            else:
+                leader = False
+                
+        if not leader:
+            
+            SINGLEFLIGHT_REQUESTS.inc(route, "cached" if call.done.is_set() else "shared")
+            call.done.wait()
+            
+            if call.error is not None:
+                raise call.error
+            
+            return call.result
+        
+        SINGLEFLIGHT_REQUESTS.inc(route, "leader")
+        
+        try:
+            call.result = function()
+        except Exception as e:
+            call.error = e
+            
+            with self._lock:
+                if self._calls.get(full_key) is call:
+                    del self._calls[full_key]
+            raise
+        finally:
+            call.expires = monotonic() + settings.singleflight_ttl
+            call.done.set()
+            
+        # Un resultado empezado antes de la última escritura no se reutiliza.
+        if settings.singleflight_ttl <= 0 or call.generation != self._generation:
+            
+            with self._lock:
+                if self._calls.get(full_key) is call:
+                    del self._calls[full_key]
+                    
+        return call.result
+    
+    def _sweep(self, now: float):
+        
+        for key in [key for key, call in self._calls.items() if call.done.is_set() and call.expires <= now]:
+            del self._calls[key]
+            
+    # Se llama tras cada escritura para que nadie reciba un resultado anterior a ella.
+    # Las consultas en curso también se retiran: quien llegue después lanza una
+    # nueva, y la antigua solo responde a quienes ya la esperaban y no se guarda.
+    def clear(self):
+        
+        with self._lock:
+            self._generation += 1
+            self._calls.clear()
+
+read_coalescer = SingleFlight()
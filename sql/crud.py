@@ -1,6 +1,71 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import event, func, and_, or_, case, select, text, Float, Integer
+from datetime import datetime
+from functools import partial
+
+from sqlalchemy.orm import Session, joinedload, selectinload
 from . import models, schemes
+from .cache import ranking_cache, read_coalescer
+from .search import course_prefix_index, fts5_query, words
 from auth.hash import hash_password
+from events.broker import stage_event, publish_staged_events, discard_staged_events
+from monitoring.tracing import traced
+
+# Función para incrementar los contadores de versión de las tablas modificadas.
+# Se llama antes del commit para que el cambio y la versión se guarden juntos. Las
+# filas existen desde la migración, así que dos escrituras concurrentes solo
+# compiten por el UPDATE y nunca insertan el mismo contador.
+def bump_table_versions(db: Session, *names: str):
+    
+    db.query(models.TableVersion).filter(models.TableVersion.name.in_(names)).update(
+        {models.TableVersion.version: models.TableVersion.version + 1},
+        synchronize_session=False
+    )
+    
+    db.info.setdefault("changed_tables", set()).update(names)
+
+# Después de cada commit que modificó tablas se descartan las lecturas coalescidas,
+# para que ninguna petición reciba un resultado anterior a la escritura, y se
+# publican los eventos preparados durante la transacción.
+@event.listens_for(Session, "after_commit")
+def after_commit(session):
+    
+    # En un lote atómico los commits solo cierran savepoints; esto se ejecuta al final.
+    if session.info.get("defer_after_commit"):
+        return
+    
+    if session.info.pop("changed_tables", None):
+        read_coalescer.clear()
+        
+    publish_staged_events(session)
+    
+    for callback in session.info.pop("after_commit_callbacks", ()):
+        callback()
+
+@event.listens_for(Session, "after_rollback")
+def after_rollback(session):
+    
+    if session.info.get("defer_after_commit"):
+        return
+    
+    session.info.pop("changed_tables", None)
+    session.info.pop("after_commit_callbacks", None)
+    discard_staged_events(session)
+
+# Función para actualizar estado en memoria (p. ej. el índice de autocompletado)
+# solo cuando la transacción hace commit, igual que los eventos: en un lote atómico
+# de '/batch' espera al commit del lote y se descarta si se deshace.
+def call_after_commit(db: Session, callback):
+    db.info.setdefault("after_commit_callbacks", []).append(callback)
+
+def get_table_versions(db: Session, names):
+    
+    rows = db.query(models.TableVersion.name, models.TableVersion.version).filter(
+        models.TableVersion.name.in_(names)
+    ).all()
+    
+    versions = dict(rows)
+    
+    return [versions.get(name, 0) for name in names]
 
 def get_admin_by_username(db: Session, username: str):
     return db.query(models.Admin).filter(models.Admin.username == username).first()
@@ -21,6 +86,36 @@ def get_all_users(db: Session):
     
     return students + professors
 
+# Igual que get_all_users, pero devuelve solo las columnas públicas como filas.
+STUDENT_LIST_FIELDS = ("username", "name", "full_name", "phone_number", "profile_picture", "semester", "role", "student_id")
+PROFESSOR_LIST_FIELDS = ("username", "name", "full_name", "phone_number", "profile_picture", "role")
+
+# Campos comunes a students y professors que siempre se incluyen en un listado
+# proyectado, para que ninguna fila quede vacía (p. ej. con '?fields=semester').
+USER_KEY_FIELDS = ("username", "role")
+
+def user_list_fields(fields: tuple) -> tuple:
+    
+    return tuple(dict.fromkeys(fields + USER_KEY_FIELDS))
+
+# Con 'fields' solo se seleccionan esas columnas (más los campos comunes); los que no
+# existen en una de las tablas (p. ej. semester en professors) se omiten en sus filas.
+def get_all_users_rows(db: Session, fields: tuple | None = None):
+    
+    fields = user_list_fields(fields) if fields else None
+    student_fields = [field for field in fields if field in STUDENT_LIST_FIELDS] if fields else STUDENT_LIST_FIELDS
+    professor_fields = [field for field in fields if field in PROFESSOR_LIST_FIELDS] if fields else PROFESSOR_LIST_FIELDS
+    
+    students = db.query(
+        *(getattr(models.Student, field) for field in student_fields)
+    ).all()
+    
+    professors = db.query(
+        *(getattr(models.Professor, field) for field in professor_fields)
+    ).all()
+    
+    return students + professors
+
 def create_student(db: Session, student: schemes.StudentCreate):
     
     db_student = models.Student(
@@ -57,6 +152,7 @@ def create_professor(db: Session, professor: schemes.ProfessorCreate):
     )
     
     db.add(db_professor)
+    bump_table_versions(db, "professors")
     db.commit()
     db.refresh(db_professor)
     
@@ -75,6 +171,15 @@ def create_course(db: Session, course: schemes.CourseCreate):
     )
     
     db.add(db_course)
+    bump_table_versions(db, "courses")
+    
+    # La versión se lee dentro de la transacción, después de incrementarla: es la
+    # que tendrá la tabla cuando este commit sea visible.
+    if course_prefix_index.version is not None:
+        db.flush()
+        version = get_table_versions(db=db, names=("courses",))[0]
+        call_after_commit(db, partial(course_prefix_index.add, db_course.course_id, db_course.name, version=version))
+        
     db.commit()
     db.refresh(db_course)
     
@@ -94,6 +199,16 @@ def get_courses_of_professor(db: Session, professor_username: str):
     
     return db.query(models.Course).filter(models.Course.professor_id == professor.professor_id)
 
+COURSE_LIST_FIELDS = ("name", "description", "semester", "program", "professor_id", "course_id")
+
+def course_columns(fields: tuple | None = None):
+    
+    return tuple(getattr(models.Course, field) for field in (fields or COURSE_LIST_FIELDS))
+
+def get_courses_of_professor_rows(db: Session, professor_id: int):
+    
+    return db.query(*course_columns()).filter(models.Course.professor_id == professor_id).all()
+
 def verify_inscription_of_student(db: Session, course_name: str, student_username: str):
     
     db_course = get_course_by_name(db=db, course_name=course_name)
@@ -117,6 +232,15 @@ def create_inscription(db: Session, inscription: schemes.InscriptionCreate):
     )
     
     db.add(db_inscription)
+    bump_table_versions(db, "inscriptions")
+    
+    course = db.get(models.Course, inscription.course_id)
+    
+    stage_event(db, (
+        f"student:{inscription.student_id}",
+        f"professor:{course.professor_id if course else None}",
+    ), "inscription.created", {"student_id": inscription.student_id, "course_id": inscription.course_id})
+    
     db.commit()
     db.refresh(db_inscription)
     
@@ -126,6 +250,11 @@ def get_all_courses(db: Session):
     
     return db.query(models.Course).all()
 
+def get_all_courses_rows(db: Session, fields: tuple | None = None):
+    
+    return db.query(*course_columns(fields)).all()
+
+@traced("crud.get_course_info_of_student")
 def get_course_info_of_student(db: Session, student_username: str):
     student = get_student_by_username(db=db, username=student_username)
     
@@ -183,6 +312,7 @@ def update_password_course(db: Session, course_name: str, updated_password: str)
         return None 
 
     db_course.password = hash_password(updated_password)
+    bump_table_versions(db, "courses")
 
     db.commit()
     db.refresh(db_course)
@@ -193,11 +323,394 @@ def delete_course(db: Session, course_name: str):
     
     course = get_course_by_name(db=db, course_name=course_name)
     
+    student_ids = [row[0] for row in db.query(models.Inscription.student_id).filter(
+        models.Inscription.course_id == course.course_id
+    )]
+    
     inscriptions = db.query(models.Inscription).filter(models.Inscription.course_id == course.course_id).delete()
     
+    course_id = course.course_id
+    
+    stage_event(db, [f"professor:{course.professor_id}"] + [f"student:{student_id}" for student_id in student_ids],
+                "course.deleted", {"course_id": course_id, "name": course_name})
+    
     db.delete(course)
+    bump_table_versions(db, "courses", "inscriptions")
+    
+    if course_prefix_index.version is not None:
+        version = get_table_versions(db=db, names=("courses",))[0]
+        call_after_commit(db, partial(course_prefix_index.remove, course_id, version=version))
+        
     db.commit()
     
     return f"Course '{course_name}' deleted."
     
-    
\ No newline at end of file
+    
+@traced("crud.get_student_dashboard")
+def get_student_dashboard(db: Session, student_username: str, notes_limit: int = 10):
+    
+    # Carga el estudiante con sus inscripciones, cursos, profesores y tareas en un
+    # número fijo de consultas (una por nivel de relación).
+    student = db.query(models.Student).options(
+        selectinload(models.Student.inscriptions)
+        .joinedload(models.Inscription.course)
+        .joinedload(models.Course.professor),
+        selectinload(models.Student.inscriptions)
+        .joinedload(models.Inscription.course)
+        .selectinload(models.Course.tasks)
+    ).filter(models.Student.username == student_username).first()
+    
+    if not student:
+        return None
+    
+    courses = [inscription.course for inscription in student.inscriptions if inscription.course]
+    
+    course_info = [{
+        "course_id": course.course_id,
+        "course_name": course.name,
+        "description": course.description,
+        "semester": course.semester,
+        "program_name": course.program,
+        "professor_name": course.professor.name if course.professor else None
+    } for course in courses]
+    
+    open_tasks = [{
+        "task_id": task.task_id,
+        "course_id": task.course_id,
+        "name": task.name,
+        "description": task.description,
+        "start_date": task.start_date,
+        "end_date": task.end_date
+    } for course in courses for task in course.tasks if task.active]
+    
+    # Solo las últimas notas: el límite se aplica en la consulta, no en Python.
+    notes = db.query(models.Note).options(joinedload(models.Note.task)).filter(
+        models.Note.student_id == student.student_id
+    ).order_by(models.Note.note_id.desc()).limit(notes_limit).all()
+    
+    recent_notes = [{
+        "note_id": note.note_id,
+        "note": note.note,
+        "task_id": note.task_id,
+        "task_name": note.task.name if note.task else None
+    } for note in notes]
+    
+    return {
+        "student": student,
+        "courses": course_info,
+        "open_tasks": open_tasks,
+        "recent_notes": recent_notes
+    }
+
+def get_task_by_id(db: Session, task_id: int):
+    
+    return db.query(models.Task).filter(models.Task.task_id == task_id).first()
+
+def is_student_inscribed(db: Session, course_id: int, student_id: int):
+    
+    return db.query(models.Inscription.inscription_id).filter(
+        models.Inscription.course_id == course_id,
+        models.Inscription.student_id == student_id
+    ).first() is not None
+
+def create_note(db: Session, note: schemes.NoteCreate):
+    
+    db_note = models.Note(
+        note=note.note,
+        task_id=note.task_id,
+        student_id=note.student_id
+    )
+    
+    db.add(db_note)
+    
+    # Los rankings guardados con la versión anterior de notes dejan de usarse.
+    bump_table_versions(db, "notes")
+    
+    task = get_task_by_id(db=db, task_id=note.task_id)
+    
+    stage_event(db, (
+        f"student:{note.student_id}",
+        f"professor:{task.course.professor_id if task and task.course else None}",
+    ), "note.created", {"student_id": note.student_id, "task_id": note.task_id, "note": float(note.note)})
+    
+    db.commit()
+    db.refresh(db_note)
+    
+    return db_note
+
+def _ranking_page(db: Session, ranked, after_rank: int | None, after_student_id: int | None, limit: int):
+    
+    query = db.query(ranked)
+    
+    # Paginación por keyset sobre (rank, student_id).
+    if after_rank is not None:
+        query = query.filter(or_(
+            ranked.c.rank > after_rank,
+            and_(ranked.c.rank == after_rank, ranked.c.student_id > (after_student_id or 0))
+        ))
+        
+    rows = query.order_by(ranked.c.rank, ranked.c.student_id).limit(limit).all()
+    
+    entries = [{
+        "student_id": row.student_id,
+        "student_name": row.student_name,
+        "score": float(row.score),
+        "rank": row.rank,
+        "percentile": round(float(row.percentile) * 100, 2),
+        "quartile": row.quartile
+    } for row in rows]
+    
+    next_cursor = None
+    
+    if len(rows) == limit:
+        next_cursor = {"after_rank": rows[-1].rank, "after_student_id": rows[-1].student_id}
+    
+    return {"entries": entries, "next_cursor": next_cursor}
+
+def get_task_ranking(db: Session, task_id: int, after_rank: int | None = None,
+                     after_student_id: int | None = None, limit: int = 50):
+    
+    key = (after_rank, after_student_id, limit)
+    version = get_table_versions(db=db, names=("notes",))[0]
+    cached = ranking_cache.get("task", task_id, version, key)
+    
+    if cached is not None:
+        return cached
+    
+    ranked = db.query(
+        models.Note.student_id.label("student_id"),
+        models.Student.name.label("student_name"),
+        models.Note.note.label("score"),
+        func.rank().over(order_by=models.Note.note.desc()).label("rank"),
+        func.percent_rank().over(order_by=models.Note.note.asc()).label("percentile"),
+        func.ntile(4).over(order_by=models.Note.note.desc()).label("quartile")
+    ).join(models.Student, models.Student.student_id == models.Note.student_id).filter(
+        models.Note.task_id == task_id
+    ).subquery()
+    
+    page = _ranking_page(db=db, ranked=ranked, after_rank=after_rank,
+                         after_student_id=after_student_id, limit=limit)
+    ranking_cache.set("task", task_id, version, key, page)
+    
+    return page
+
+def get_course_ranking(db: Session, course_id: int, after_rank: int | None = None,
+                       after_student_id: int | None = None, limit: int = 50):
+    
+    key = (after_rank, after_student_id, limit)
+    version = get_table_versions(db=db, names=("notes",))[0]
+    cached = ranking_cache.get("course", course_id, version, key)
+    
+    if cached is not None:
+        return cached
+    
+    averages = db.query(
+        models.Note.student_id.label("student_id"),
+        func.avg(models.Note.note).label("score")
+    ).join(models.Task, models.Task.task_id == models.Note.task_id).filter(
+        models.Task.course_id == course_id
+    ).group_by(models.Note.student_id).subquery()
+    
+    ranked = db.query(
+        averages.c.student_id.label("student_id"),
+        models.Student.name.label("student_name"),
+        averages.c.score.label("score"),
+        func.rank().over(order_by=averages.c.score.desc()).label("rank"),
+        func.percent_rank().over(order_by=averages.c.score.asc()).label("percentile"),
+        func.ntile(4).over(order_by=averages.c.score.desc()).label("quartile")
+    ).join(models.Student, models.Student.student_id == averages.c.student_id).subquery()
+    
+    page = _ranking_page(db=db, ranked=ranked, after_rank=after_rank,
+                         after_student_id=after_student_id, limit=limit)
+    ranking_cache.set("course", course_id, version, key, page)
+    
+    return page
+
+def update_profile_picture(db: Session, db_object, profile_picture: str):
+    
+    db_object.profile_picture = profile_picture
+    
+    db.commit()
+    db.refresh(db_object)
+    
+    return db_object
+
+def _course_search_query(db: Session, query: str):
+    
+    dialect = db.get_bind().dialect.name
+    
+    if dialect == "sqlite":
+        
+        # bm25 devuelve valores menores para los resultados más relevantes; el nombre pesa más.
+        matches = text(
+            "SELECT rowid AS course_id, -bm25(courses_fts, 10.0, 2.0, 5.0) AS score "
+            "FROM courses_fts WHERE courses_fts MATCH :query"
+        ).bindparams(query=fts5_query(query)).columns(course_id=Integer, score=Float).subquery("matches")
+        
+        return db.query(models.Course, matches.c.score).join(
+            matches, matches.c.course_id == models.Course.course_id
+        ), matches.c.score
+        
+    if dialect == "mysql":
+        
+        from sqlalchemy.dialects.mysql import match
+        
+        score = match(models.Course.name, models.Course.description, models.Course.program,
+                      against=query).in_natural_language_mode()
+        
+        return db.query(models.Course, score.label("score")).filter(score > 0), score
+    
+    # Sin índice de texto completo: LIKE sobre cada palabra, priorizando el nombre.
+    conditions = []
+    score = 0
+    
+    for word in words(query):
+        
+        pattern = f"%{word}%"
+        conditions.append(or_(
+            models.Course.name.ilike(pattern),
+            models.Course.description.ilike(pattern),
+            models.Course.program.ilike(pattern)
+        ))
+        score = score + case((models.Course.name.ilike(pattern), 10), else_=0) \
+            + case((models.Course.program.ilike(pattern), 5), else_=0) \
+            + case((models.Course.description.ilike(pattern), 2), else_=0)
+        
+    score = score.label("score")
+        
+    return db.query(models.Course, score).filter(and_(*conditions)), score
+
+def search_courses(db: Session, query: str, semester: int | None = None, program: str | None = None,
+                   limit: int = 20, offset: int = 0):
+    
+    if not words(query):
+        return []
+    
+    search, score = _course_search_query(db=db, query=query)
+    
+    if semester is not None:
+        search = search.filter(models.Course.semester == semester)
+        
+    if program is not None:
+        search = search.filter(models.Course.program == program)
+        
+    rows = search.order_by(score.desc(), models.Course.course_id).offset(offset).limit(limit).all()
+    
+    return [{
+        "course_id": course.course_id,
+        "name": course.name,
+        "description": course.description,
+        "semester": course.semester,
+        "program": course.program,
+        "professor_id": course.professor_id,
+        "score": float(score)
+    } for course, score in rows]
+
+def autocomplete_courses(db: Session, prefix: str, limit: int = 10):
+    
+    version = get_table_versions(db=db, names=("courses",))[0]
+    
+    # Se reconstruye si otro proceso modificó la tabla de cursos.
+    if course_prefix_index.version != version:
+        course_prefix_index.rebuild(db.query(models.Course.course_id, models.Course.name).all(), version=version)
+        
+    return course_prefix_index.search(prefix=prefix, limit=limit)
+
+def revoke_token(db: Session, jti: str, expires_at: datetime):
+    
+    db.merge(models.RevokedToken(jti=jti, expires_at=expires_at, revoked_at=datetime.utcnow()))
+    db.commit()
+
+# Inserta el jti sin sobrescribir: si ya existe lanza IntegrityError, así solo una
+# petición puede usar cada refresh token aunque lleguen a la vez a varios workers.
+def claim_token(db: Session, jti: str, expires_at: datetime):
+    
+    db.add(models.RevokedToken(jti=jti, expires_at=expires_at, revoked_at=datetime.utcnow()))
+    db.commit()
+
+def get_revoked_tokens(db: Session, since: datetime | None = None):
+    
+    query = db.query(models.RevokedToken.jti, models.RevokedToken.expires_at).filter(
+        models.RevokedToken.expires_at > datetime.utcnow()
+    )
+    
+    if since is not None:
+        query = query.filter(models.RevokedToken.revoked_at >= since)
+        
+    return query.all()
+
+def prune_revoked_tokens(db: Session):
+    
+    deleted = db.query(models.RevokedToken).filter(
+        models.RevokedToken.expires_at <= datetime.utcnow()
+    ).delete(synchronize_session=False)
+    db.commit()
+    
+    return deleted
+
+
+# Función para listar los cursos archivados, filtrando por semestre, profesor o
+# estudiante inscrito.
+def get_archived_courses(db: Session, semester: int | None = None, professor_id: int | None = None,
+                         student_id: int | None = None, limit: int = 50, offset: int = 0):
+    
+    query = db.query(models.ArchivedCourse)
+    
+    if semester is not None:
+        query = query.filter(models.ArchivedCourse.semester == semester)
+        
+    if professor_id is not None:
+        query = query.filter(models.ArchivedCourse.professor_id == professor_id)
+        
+    if student_id is not None:
+        query = query.filter(models.ArchivedCourse.course_id.in_(
+            select(models.ArchivedInscription.course_id).where(models.ArchivedInscription.student_id == student_id)
+        ))
+        
+    return query.order_by(
+        models.ArchivedCourse.semester.desc(), models.ArchivedCourse.course_id
+    ).offset(offset).limit(limit).all()
+
+def get_archived_course(db: Session, course_id: int):
+    
+    return db.query(models.ArchivedCourse).filter(models.ArchivedCourse.course_id == course_id).first()
+
+def get_archived_tasks_of_course(db: Session, course_id: int):
+    
+    return db.query(models.ArchivedTask).filter(
+        models.ArchivedTask.course_id == course_id
+    ).order_by(models.ArchivedTask.start_date).all()
+
+def count_archived_inscriptions(db: Session, course_id: int):
+    
+    return db.query(models.ArchivedInscription).filter(models.ArchivedInscription.course_id == course_id).count()
+
+def was_student_inscribed(db: Session, course_id: int, student_id: int):
+    
+    return db.query(models.ArchivedInscription.inscription_id).filter(
+        models.ArchivedInscription.course_id == course_id,
+        models.ArchivedInscription.student_id == student_id
+    ).first() is not None
+
+# Función para obtener las notas archivadas de un estudiante con el nombre de la
+# tarea y del curso, en una sola consulta.
+def get_archived_notes_of_student(db: Session, student_id: int, semester: int | None = None):
+    
+    query = db.query(
+        models.ArchivedNote.note_id,
+        models.ArchivedNote.note,
+        models.ArchivedNote.task_id,
+        models.ArchivedTask.name.label("task_name"),
+        models.ArchivedCourse.course_id,
+        models.ArchivedCourse.name.label("course_name"),
+        models.ArchivedCourse.semester,
+    ).join(
+        models.ArchivedTask, models.ArchivedTask.task_id == models.ArchivedNote.task_id
+    ).join(
+        models.ArchivedCourse, models.ArchivedCourse.course_id == models.ArchivedTask.course_id
+    ).filter(models.ArchivedNote.student_id == student_id)
+    
+    if semester is not None:
+        query = query.filter(models.ArchivedCourse.semester == semester)
+        
+    return query.order_by(models.ArchivedCourse.semester.desc(), models.ArchivedNote.note_id).all()
@@ -1,14 +1,111 @@
+from threading import Lock
+
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
 from os import getenv
+from config import settings
+from .sqlite import configure_sqlite, is_memory_database
 
 load_dotenv()
 
 SQLALCHEMY_DATABASE_URL: str | None = getenv("SQLALCHEMY_DATABASE_URL")
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
-SessionLocal = sessionmaker(autoflush=False, autocommit=False, bind=engine)
+_engine = None
+_engine_lock = Lock()
+
+# Funciones que se ejecutan cada vez que se crea un engine (instrumentación, eventos...).
+_engine_callbacks = []
+
+def on_engine_created(callback):
+    
+    _engine_callbacks.append(callback)
+    
+    if _engine is not None:
+        callback(_engine)
+        
+    return callback
+
+def engine_options(url: str):
+    
+    database_url = make_url(url)
+    
+    if database_url.get_backend_name() == "sqlite":
+        
+        # Las conexiones del pool se usan desde distintos hilos del threadpool.
+        options = {"connect_args": {"check_same_thread": False}}
+        
+        # SQLite en memoria usa un pool que no admite estos parámetros.
+        if is_memory_database(url):
+            return options
+        
+        return {**options, "pool_size": settings.db_pool_size, "max_overflow": settings.db_max_overflow}
+    
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+    }
+
+# El engine se crea la primera vez que se necesita, no al importar el módulo.
+def get_engine():
+    
+    global _engine
+    
+    if _engine is None:
+        
+        with _engine_lock:
+            
+            if _engine is None:
+                
+                engine = create_engine(SQLALCHEMY_DATABASE_URL, **engine_options(SQLALCHEMY_DATABASE_URL))
+                
+                if engine.dialect.name == "sqlite":
+                    configure_sqlite(engine)
+                    
+                for callback in _engine_callbacks:
+                    callback(engine)
+                    
+                SessionLocal.configure(bind=engine)
+                _engine = engine
+                
+    return _engine
+
+def dispose_engine():
+    
+    global _engine
+    
+    with _engine_lock:
+        
+        if _engine is not None:
+            _engine.dispose()
+            
+        _engine = None
+        SessionLocal.configure(bind=None)
+
+# Función para llamar en cada proceso hijo después de un fork. Las conexiones del
+# pool heredado pertenecen al proceso padre: se descartan sin cerrarlas para que
+# el hijo abra las suyas.
+def reset_engine_after_fork():
+    
+    global _engine_lock
+    
+    _engine_lock = Lock()
+    
+    if _engine is not None:
+        _engine.dispose(close=False)
+
+# sessionmaker que crea el engine si todavía no existe.
+class LazySessionmaker(sessionmaker):
+    
+    def __call__(self, **local_kw):
+        
+        if self.kw.get("bind") is None and "bind" not in local_kw:
+            get_engine()
+            
+        return super().__call__(**local_kw)
+
+SessionLocal = LazySessionmaker(autoflush=False, autocommit=False)
 
-Base = declarative_base()
\ No newline at end of file
+Base = declarative_base()
@@ -0,0 +1,83 @@
+# Comando para gestionar el esquema de la base de datos.
+#
+# Uso:
+#     python -m sql.migrate            aplica las migraciones pendientes
+#     python -m sql.migrate --status   muestra las migraciones aplicadas y pendientes
+import argparse
+import logging
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, MetaData, String, Table, select
+
+from .database import get_engine
+from .migrations import MIGRATIONS
+
+logger = logging.getLogger("sql.migrations")
+
+schema_migrations = Table(
+    "schema_migrations",
+    MetaData(),
+    Column("name", String(100), primary_key=True),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+def applied_migrations(connection):
+    
+    schema_migrations.create(bind=connection, checkfirst=True)
+    
+    return {row[0] for row in connection.execute(select(schema_migrations.c.name))}
+
+def pending_migrations(engine=None):
+    
+    engine = engine or get_engine()
+    
+    with engine.begin() as connection:
+        applied = applied_migrations(connection)
+        
+    return [name for name, _ in MIGRATIONS if name not in applied]
+
+# Función para aplicar las migraciones pendientes, cada una en su propia transacción.
+def run_migrations(engine=None):
+    
+    engine = engine or get_engine()
+    applied_now = []
+    
+    with engine.begin() as connection:
+        applied = applied_migrations(connection)
+        
+    for name, migration in MIGRATIONS:
+        
+        if name in applied:
+            continue
+        
+        with engine.begin() as connection:
+            migration(connection)
+            connection.execute(schema_migrations.insert().values(name=name, applied_at=datetime.utcnow()))
+            
+        logger.info("Applied migration %s", name)
+        applied_now.append(name)
+        
+    return applied_now
+
+def main():
+    
+    parser = argparse.ArgumentParser(description="Apply database migrations.")
+    parser.add_argument("--status", action="store_true", help="Show applied and pending migrations.")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    
+    if args.status:
+        
+        pending = pending_migrations()
+        
+        for name, _ in MIGRATIONS:
+            print(f"{'pending' if name in pending else 'applied'}  {name}")
+            
+        return
+    
+    applied = run_migrations()
+    print(f"Applied {len(applied)} migration(s)." if applied else "Database is up to date.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+import logging
+
+from sqlalchemy import func, insert, inspect, select, text
+from sqlalchemy.schema import CreateTable
+
+from . import models
+from .database import Base
+
+logger = logging.getLogger("sql.migrations")
+
+# Las migraciones se aplican en orden y cada una se registra en schema_migrations.
+# Para añadir una nueva, se define la función y se agrega al final de MIGRATIONS.
+
+def initial_schema(connection):
+    
+    Base.metadata.create_all(bind=connection, tables=[
+        models.Admin.__table__,
+        models.Professor.__table__,
+        models.Student.__table__,
+        models.Course.__table__,
+        models.Inscription.__table__,
+        models.Task.__table__,
+        models.Note.__table__,
+    ])
+
+def table_versions(connection):
+    
+    Base.metadata.create_all(bind=connection, tables=[models.TableVersion.__table__])
+    seed_table_versions(connection)
+
+# Crea a 0 los contadores que falten. Las bases de datos que ya tenían la tabla
+# lo reciben en 0008_seed_table_versions.
+def seed_table_versions(connection):
+    
+    table = models.TableVersion.__table__
+    existing = {row[0] for row in connection.execute(select(table.c.name))}
+    missing = [{"name": name, "version": 0} for name in models.VERSIONED_TABLES if name not in existing]
+    
+    if missing:
+        connection.execute(insert(table), missing)
+
+# Las bases de datos creadas con el modelo original tienen un índice único en
+# students.semester que impide tener dos estudiantes en el mismo semestre.
+def drop_unique_student_semester(connection):
+    
+    inspector = inspect(connection)
+    
+    for index in inspector.get_indexes("students"):
+        
+        if index.get("unique") and index["column_names"] == ["semester"] and not index.get("duplicates_constraint"):
+            
+            if connection.dialect.name == "mysql":
+                connection.execute(text(f"ALTER TABLE students DROP INDEX `{index['name']}`"))
+            else:
+                connection.execute(text(f'DROP INDEX "{index["name"]}"'))
+                
+    # En MySQL la restricción es el propio índice, que ya se ha eliminado arriba.
+    if connection.dialect.name == "mysql":
+        return
+                
+    for constraint in inspector.get_unique_constraints("students"):
+        
+        if not constraint["column_names"] == ["semester"]:
+            continue
+        
+        if connection.dialect.name == "sqlite":
+            logger.warning(
+                "students.semester has an inline unique constraint that SQLite cannot drop in place; "
+                "recreate the table to remove it."
+            )
+        else:
+            connection.execute(text(f'ALTER TABLE students DROP CONSTRAINT "{constraint["name"]}"'))
+
+# Índice de texto completo sobre courses(name, description, program): FTS5 en
+# SQLite (tabla externa sincronizada con triggers) y FULLTEXT en MySQL.
+def course_fulltext_index(connection):
+    
+    if connection.dialect.name == "sqlite":
+        
+        connection.execute(text(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS courses_fts USING fts5("
+            "name, description, program, content='courses', content_rowid='course_id')"
+        ))
+        connection.execute(text(
+            "CREATE TRIGGER IF NOT EXISTS courses_fts_insert AFTER INSERT ON courses BEGIN "
+            "INSERT INTO courses_fts(rowid, name, description, program) "
+            "VALUES (new.course_id, new.name, new.description, new.program); END"
+        ))
+        connection.execute(text(
+            "CREATE TRIGGER IF NOT EXISTS courses_fts_delete AFTER DELETE ON courses BEGIN "
+            "INSERT INTO courses_fts(courses_fts, rowid, name, description, program) "
+            "VALUES ('delete', old.course_id, old.name, old.description, old.program); END"
+        ))
+        connection.execute(text(
+            "CREATE TRIGGER IF NOT EXISTS courses_fts_update AFTER UPDATE ON courses BEGIN "
+            "INSERT INTO courses_fts(courses_fts, rowid, name, description, program) "
+            "VALUES ('delete', old.course_id, old.name, old.description, old.program); "
+            "INSERT INTO courses_fts(rowid, name, description, program) "
+            "VALUES (new.course_id, new.name, new.description, new.program); END"
+        ))
+        connection.execute(text("INSERT INTO courses_fts(courses_fts) VALUES ('rebuild')"))
+        
+    elif connection.dialect.name == "mysql":
+        connection.execute(text("ALTER TABLE courses ADD FULLTEXT INDEX courses_fulltext (name, description, program)"))
+        
+    else:
+        logger.warning("No full-text index for %s; course search falls back to LIKE.", connection.dialect.name)
+
+def revoked_tokens(connection):
+    
+    Base.metadata.create_all(bind=connection, tables=[models.RevokedToken.__table__])
+
+def audit_events(connection):
+    
+    Base.metadata.create_all(bind=connection, tables=[models.AuditEvent.__table__])
+
+def archive_tables(connection):
+    
+    Base.metadata.create_all(bind=connection, tables=[
+        models.ArchivedCourse.__table__,
+        models.ArchivedInscription.__table__,
+        models.ArchivedTask.__table__,
+        models.ArchivedNote.__table__,
+    ])
+
+# Tablas vivas que se archivan y su tabla de archivo. Sin AUTOINCREMENT, SQLite
+# reutiliza los ids que el archivo ya guarda.
+ARCHIVED_TABLES = (
+    (models.Course.__table__, models.ArchivedCourse.__table__),
+    (models.Inscription.__table__, models.ArchivedInscription.__table__),
+    (models.Task.__table__, models.ArchivedTask.__table__),
+    (models.Note.__table__, models.ArchivedNote.__table__),
+)
+
+# SQLite no permite añadir AUTOINCREMENT a una tabla existente: se recrea (con sus
+# índices y triggers) y sqlite_sequence empieza después del id más alto, vivo o
+# archivado. Las filas se copian a una tabla temporal y se vuelven a insertar
+# después del DROP; así las claves foráneas diferidas se resuelven antes del commit.
+def sqlite_autoincrement_ids(connection):
+    
+    if connection.dialect.name != "sqlite":
+        return
+    
+    if not connection.connection.driver_connection.in_transaction:
+        connection.exec_driver_sql("BEGIN")
+        
+    connection.exec_driver_sql("PRAGMA defer_foreign_keys=ON")
+    
+    for table, archived in ARCHIVED_TABLES:
+        
+        name = table.name
+        create = connection.execute(text(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"
+        ), {"name": name}).scalar()
+        
+        if create is None or "AUTOINCREMENT" in create.upper():
+            continue
+        
+        extras = connection.execute(text(
+            "SELECT type, name, sql FROM sqlite_master "
+            "WHERE tbl_name = :name AND type IN ('index', 'trigger') AND sql IS NOT NULL"
+        ), {"name": name}).all()
+        
+        columns = ", ".join(f'"{column.name}"' for column in table.columns)
+        
+        connection.exec_driver_sql(f"CREATE TEMP TABLE {name}_copy AS SELECT {columns} FROM {name}")
+        connection.exec_driver_sql(f"DROP TABLE {name}")
+        connection.execute(CreateTable(table))
+        connection.exec_driver_sql(f"INSERT INTO {name} ({columns}) SELECT {columns} FROM {name}_copy")
+        connection.exec_driver_sql(f"DROP TABLE {name}_copy")
+        
+        # Índices y triggers (p. ej. los de courses_fts) se recrean después de copiar las filas.
+        for _, _, sql in extras:
+            connection.exec_driver_sql(sql)
+            
+        key = table.primary_key.columns.values()[0].name
+        last_id = max(
+            connection.execute(select(func.max(table.c[key]))).scalar() or 0,
+            connection.execute(select(func.max(archived.c[key]))).scalar() or 0,
+        )
+        
+        connection.execute(text("DELETE FROM sqlite_sequence WHERE name = :name"), {"name": name})
+        connection.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES (:name, :seq)"),
+                           {"name": name, "seq": last_id})
+
+MIGRATIONS = [
+    ("0001_initial_schema", initial_schema),
+    ("0002_table_versions", table_versions),
+    ("0003_drop_unique_student_semester", drop_unique_student_semester),
+    ("0004_course_fulltext_index", course_fulltext_index),
+    ("0005_revoked_tokens", revoked_tokens),
+    ("0006_audit_events", audit_events),
+    ("0007_archive_tables", archive_tables),
+    ("0008_seed_table_versions", seed_table_versions),
+    ("0009_sqlite_autoincrement_ids", sqlite_autoincrement_ids),
+]
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Boolean, DateTime, ForeignKey, DECIMAL
+from sqlalchemy import Column, String, Integer, Boolean, DateTime, ForeignKey, DECIMAL, Text
 from sqlalchemy.orm import relationship
 from .database import Base
 
@@ -41,7 +41,7 @@ class Student(Base):
     full_name = Column(String(50), unique=True, nullable=False)
     phone_number = Column(String(30), unique=True, nullable=False)
     password = Column(String(70), unique=True, nullable=False)
-    semester = Column(Integer, unique=True, nullable=False)
+    semester = Column(Integer, nullable=False)
     profile_picture = Column(String(255), unique=True, nullable=False)
     role = Column(String(30), nullable=False)
     
@@ -53,6 +53,7 @@ class Student(Base):
     
 class Inscription(Base):
     __tablename__ = "inscriptions"
+    __table_args__ = {"sqlite_autoincrement": True}
     
     inscription_id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     course_id = Column(Integer, ForeignKey("courses.course_id"))
@@ -67,6 +68,10 @@ class Inscription(Base):
 class Course(Base):
 
     __tablename__ = "courses"   
+    
+    # Sin AUTOINCREMENT SQLite reutiliza los ids más altos al borrar filas, y un curso
+    # nuevo podría recibir el id de uno archivado. Igual en inscripciones, tareas y notas.
+    __table_args__ = {"sqlite_autoincrement": True}
 
     course_id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     professor_id = Column(Integer, ForeignKey("professors.professor_id"))
@@ -89,6 +94,7 @@ class Course(Base):
 class Task(Base):
 
     __tablename__ = "tasks"
+    __table_args__ = {"sqlite_autoincrement": True}
     
     task_id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     course_id = Column(Integer, ForeignKey("courses.course_id"))
@@ -108,6 +114,7 @@ class Task(Base):
 class Note(Base):
 
     __tablename__ = "notes"
+    __table_args__ = {"sqlite_autoincrement": True}
     
     note_id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     note = Column(DECIMAL(3,2), nullable=False)
@@ -118,4 +125,94 @@ class Note(Base):
     student = relationship("Student", back_populates="notes")
     
     # Relación con Task
-    task = relationship("Task", back_populates="notes")
\ No newline at end of file
+    task = relationship("Task", back_populates="notes")
+
+class TableVersion(Base):
+
+    __tablename__ = "table_versions"
+    
+    # Contador que se incrementa en cada escritura sobre la tabla, usado para los ETag.
+    name = Column(String(50), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+# Tablas con contador de versión. Las filas se crean en las migraciones, así las
+# escrituras solo tienen que incrementarlas.
+VERSIONED_TABLES = ("professors", "courses", "inscriptions", "notes")
+
+
+class RevokedToken(Base):
+
+    __tablename__ = "revoked_tokens"
+    
+    # jti del token revocado, o "family:<id>" para revocar todos los tokens de una sesión.
+    jti = Column(String(64), primary_key=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    revoked_at = Column(DateTime, nullable=False, index=True)
+
+
+class AuditEvent(Base):
+
+    __tablename__ = "audit_events"
+    
+    # Tabla de solo inserción con las acciones administrativas.
+    event_id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    created_at = Column(DateTime, nullable=False, index=True)
+    actor = Column(String(50), nullable=False, index=True)
+    role = Column(String(30), nullable=False)
+    action = Column(String(50), nullable=False, index=True)
+    target = Column(String(100), nullable=True)
+    details = Column(Text, nullable=True)
+
+
+# Tablas de archivo: copias de los cursos de semestres cerrados con sus
+# inscripciones, tareas y notas. Sin claves foráneas ni índices únicos, para que un
+# curso archivado no bloquee borrar profesores o reutilizar nombres en la tabla viva.
+class ArchivedCourse(Base):
+
+    __tablename__ = "archived_courses"
+    
+    course_id = Column(Integer, primary_key=True, autoincrement=False)
+    professor_id = Column(Integer, index=True)
+    name = Column(String(50), nullable=False)
+    password = Column(String(70), nullable=False)
+    description = Column(String(200), nullable=False)
+    semester = Column(Integer, nullable=False, index=True)
+    program = Column(String(50), nullable=False)
+    profile_picture = Column(String(255), nullable=False)
+    archived_at = Column(DateTime, nullable=False)
+
+
+class ArchivedInscription(Base):
+
+    __tablename__ = "archived_inscriptions"
+    
+    inscription_id = Column(Integer, primary_key=True, autoincrement=False)
+    course_id = Column(Integer, index=True)
+    student_id = Column(Integer, index=True)
+    archived_at = Column(DateTime, nullable=False)
+
+
+class ArchivedTask(Base):
+
+    __tablename__ = "archived_tasks"
+    
+    task_id = Column(Integer, primary_key=True, autoincrement=False)
+    course_id = Column(Integer, index=True)
+    name = Column(String(50), nullable=False)
+    description = Column(String(200), nullable = False)
+    start_date = Column(DateTime, nullable = False)
+    end_date = Column(DateTime, nullable = False)
+    unique_filename = Column(String(50), nullable = False)
+    active = Column(Boolean, nullable = False)
+    archived_at = Column(DateTime, nullable=False)
+
+
+class ArchivedNote(Base):
+
+    __tablename__ = "archived_notes"
+    
+    note_id = Column(Integer, primary_key=True, autoincrement=False)
+    note = Column(DECIMAL(3,2), nullable=False)
+    task_id = Column(Integer, index=True)
+    student_id = Column(Integer, index=True)
+    archived_at = Column(DateTime, nullable=False)
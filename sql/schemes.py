@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List
+from typing import Any, Dict, List
 from datetime import datetime
 
 class AdminBase(BaseModel):
@@ -164,4 +164,122 @@ class StudentResponse(BaseModel):
     name: str
     full_name: str
     phone_number: str
-    semester: int
\ No newline at end of file
+    semester: int
+class DashboardCourse(BaseModel):
+    course_id: int
+    course_name: str
+    description: str
+    semester: int
+    program_name: str
+    professor_name: str | None = None
+
+class DashboardTask(BaseModel):
+    task_id: int
+    course_id: int
+    name: str
+    description: str
+    start_date: datetime
+    end_date: datetime
+
+class DashboardNote(BaseModel):
+    note_id: int
+    note: float
+    task_id: int
+    task_name: str | None = None
+
+class StudentDashboard(BaseModel):
+    student: Student
+    courses: List[DashboardCourse]
+    open_tasks: List[DashboardTask]
+    recent_notes: List[DashboardNote]
+
+class RankingEntry(BaseModel):
+    student_id: int
+    student_name: str
+    score: float
+    rank: int
+    percentile: float
+    quartile: int
+
+class RankingCursor(BaseModel):
+    after_rank: int
+    after_student_id: int
+
+class RankingPage(BaseModel):
+    entries: List[RankingEntry]
+    next_cursor: RankingCursor | None = None
+
+class CourseSearchResult(BaseModel):
+    course_id: int
+    name: str
+    description: str
+    semester: int
+    program: str
+    professor_id: int | None = None
+    score: float
+
+class CourseSearchPage(BaseModel):
+    results: List[CourseSearchResult]
+    next_offset: int | None = None
+
+class CourseSuggestion(BaseModel):
+    course_id: int
+    name: str
+
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
+
+class BatchOperation(BaseModel):
+    method: str = "GET"
+    path: str
+    query: Dict[str, Any] = {}
+    body: Any = None
+
+class BatchRequest(BaseModel):
+    requests: List[BatchOperation]
+    atomic: bool = False
+
+class BatchOperationResult(BaseModel):
+    status: int
+    body: Any = None
+
+class BatchResponse(BaseModel):
+    committed: bool
+    responses: List[BatchOperationResult]
+
+class ArchivedCourse(BaseModel):
+    course_id: int
+    professor_id: int | None = None
+    name: str
+    description: str
+    semester: int
+    program: str
+    profile_picture: str
+    archived_at: datetime
+
+    class Config:
+        orm_mode = True
+
+class ArchivedTask(BaseModel):
+    task_id: int
+    course_id: int
+    name: str
+    description: str
+    start_date: datetime
+    end_date: datetime
+
+    class Config:
+        orm_mode = True
+
+class ArchivedCourseDetail(ArchivedCourse):
+    students: int
+    tasks: List[ArchivedTask]
+
+class ArchivedNote(BaseModel):
+    note_id: int
+    note: float
+    task_id: int
+    task_name: str
+    course_id: int
+    course_name: str
+    semester: int
@@ -0,0 +1,125 @@
+import re
+from bisect import bisect_left
+from threading import Lock
+
+WORD_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+def words(value: str):
+    return WORD_PATTERN.findall(value.lower())
+
+# Convierte el texto del usuario en una consulta FTS5 segura: cada palabra se
+# busca como prefijo y todas deben aparecer.
+def fts5_query(query: str):
+    return " ".join(f'"{word}"*' for word in words(query))
+
+# Índice en memoria para autocompletar nombres de cursos. Guarda una lista ordenada
+# de (palabra, course_id) para cada palabra del nombre, así que "alg" encuentra
+# tanto "Algebra" como "Linear Algebra". Se actualiza al crear y eliminar cursos, y
+# se reconstruye si la versión de la tabla courses cambia en otro proceso.
+class PrefixIndex:
+    
+    def __init__(self):
+        self._lock = Lock()
+        self._entries: list = []
+        self._names: dict = {}
+        self.version = None
+        
+    def rebuild(self, courses, version: int):
+        
+        entries = []
+        names = {}
+        
+        for course_id, name in courses:
+            names[course_id] = name
+            entries.extend((word, course_id) for word in set(words(name)))
+            
+        entries.sort()
+        
+        with self._lock:
+            self._entries = entries
+            self._names = names
+            self.version = version
+            
+    # Con "version" (la de courses tras el commit) el cambio solo se aplica si el
+    # índice estaba en la versión anterior. Si no, otro proceso modificó la tabla
+    # entre medias: el índice se descarta y se reconstruye en la próxima búsqueda.
+    def _advance(self, version: int | None):
+        
+        if version is None:
+            return True
+        
+        if self.version != version - 1:
+            self.version = None
+            self._entries = []
+            self._names = {}
+            return False
+        
+        self.version = version
+        
+        return True
+        
+    def add(self, course_id: int, name: str, version: int | None = None):
+        
+        with self._lock:
+            
+            if not self._advance(version):
+                return
+            
+            self._names[course_id] = name
+            
+            for word in set(words(name)):
+                index = bisect_left(self._entries, (word, course_id))
+                self._entries.insert(index, (word, course_id))
+                
+    def remove(self, course_id: int, version: int | None = None):
+        
+        with self._lock:
+            
+            if not self._advance(version):
+                return
+            
+            name = self._names.pop(course_id, None)
+            
+            if name is not None:
+                for word in set(words(name)):
+                    index = bisect_left(self._entries, (word, course_id))
+                    if index < len(self._entries) and self._entries[index] == (word, course_id):
+                        del self._entries[index]
+                
+    def search(self, prefix: str, limit: int = 10):
+        
+        prefix_words = words(prefix)
+        
+        if not prefix_words:
+            return []
+        
+        last = prefix_words[-1]
+        
+        with self._lock:
+            
+            matches = []
+            seen = set()
+            index = bisect_left(self._entries, (last,))
+            
+            while index < len(self._entries) and self._entries[index][0].startswith(last):
+                
+                course_id = self._entries[index][1]
+                index += 1
+                
+                if course_id in seen:
+                    continue
+                
+                seen.add(course_id)
+                name = self._names[course_id]
+                
+                # Las palabras anteriores a la última deben aparecer completas en el nombre.
+                if all(word in words(name) for word in prefix_words[:-1]):
+                    matches.append((course_id, name))
+                    
+        # Primero los nombres que empiezan por el texto buscado, después los más cortos.
+        lowered = prefix.lower().strip()
+        matches.sort(key=lambda match: (not match[1].lower().startswith(lowered), len(match[1]), match[1]))
+        
+        return [{"course_id": course_id, "name": name} for course_id, name in matches[:limit]]
+
+course_prefix_index = PrefixIndex()
@@ -0,0 +1,127 @@
+# Perfil de despliegue con SQLite.
+#
+# Cada conexión nueva recibe los PRAGMAs de settings.sqlite_pragmas (WAL,
+# synchronous=NORMAL, busy_timeout, foreign_keys, caché y mmap). Las conexiones se
+# crean con check_same_thread=False porque el pool las reparte entre los hilos del
+# threadpool de FastAPI.
+#
+# SQLite solo admite un escritor a la vez. Con settings.sqlite_single_writer las
+# transacciones que escriben hacen cola en el proceso: la primera sentencia
+# INSERT/UPDATE/DELETE de una conexión espera el turno y lo libera con el commit o
+# el rollback. Así los hilos no compiten por el bloqueo del fichero ni fallan con
+# "database is locked"; entre procesos se sigue confiando en busy_timeout.
+#
+# Un '/batch' atómico guarda el turno durante todo el lote, también mientras espera
+# (await) a cada operación. Otra escritura del mismo flujo en una segunda sesión
+# (p. ej. crud.prune_revoked_tokens desde revocation_store.sync) no puede conseguirlo
+# hasta que el lote termine: en lugar de esperar sqlite_writer_timeout más
+# busy_timeout y fallar con "database is locked", falla enseguida. Dentro de un lote
+# se escribe siempre con la sesión del lote.
+import logging
+from contextvars import ContextVar
+from threading import Lock
+from time import perf_counter
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+from monitoring.metrics import SQLITE_WRITER_WAIT
+from config import settings
+
+logger = logging.getLogger("sql.sqlite")
+
+WRITE_STATEMENTS = ("INSERT", "UPDATE", "DELETE", "REPLACE")
+
+# 'info' de la conexión que tiene el turno en el flujo actual (la de un lote atómico).
+writer_owner: ContextVar[dict | None] = ContextVar("sqlite_writer_owner", default=None)
+
+def is_memory_database(url: str) -> bool:
+    
+    database = make_url(url).database
+    
+    return database in (None, "", ":memory:") or database.startswith("file::memory:")
+
+class SingleWriter:
+    
+    def __init__(self, timeout: float):
+        self.timeout = timeout
+        self._lock = Lock()
+    
+    def acquire(self, connection_info: dict):
+        
+        if connection_info.get("sqlite_writer"):
+            return
+        
+        owner = writer_owner.get()
+        
+        if owner is not None and owner.get("sqlite_writer"):
+            raise RuntimeError("The SQLite writer lock is held by this flow's batch connection; "
+                               "write through the batch session instead.")
+        
+        start = perf_counter()
+        acquired = self._lock.acquire(timeout=self.timeout)
+        SQLITE_WRITER_WAIT.observe(perf_counter() - start)
+        
+        # Si el turno no llega, la escritura sigue y SQLite decide con busy_timeout.
+        if not acquired:
+            logger.warning("Timed out waiting %.1f s for the SQLite writer lock", self.timeout)
+            return
+        
+        connection_info["sqlite_writer"] = True
+    
+    def release(self, connection_info: dict):
+        
+        if connection_info.pop("sqlite_writer", False):
+            self._lock.release()
+
+# Función para aplicar el perfil a un engine de SQLite recién creado.
+def configure_sqlite(engine, pragmas: dict | None = None, single_writer: bool | None = None):
+    
+    pragmas = settings.sqlite_pragmas if pragmas is None else pragmas
+    single_writer = settings.sqlite_single_writer if single_writer is None else single_writer
+    
+    if is_memory_database(str(engine.url)):
+        pragmas = {name: value for name, value in pragmas.items() if name not in ("journal_mode", "mmap_size")}
+    
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        
+        cursor = dbapi_connection.cursor()
+        
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+    
+    if not single_writer:
+        return
+    
+    writer = SingleWriter(settings.sqlite_writer_timeout)
+    engine._sqlite_writer = writer
+    
+    @event.listens_for(engine, "before_cursor_execute")
+    def wait_for_writer(conn, cursor, statement, parameters, context, executemany):
+        
+        if statement.lstrip()[:7].upper().startswith(WRITE_STATEMENTS):
+            writer.acquire(conn.info)
+    
+    # Una conexión invalidada no deja leer 'info'; su turno se libera en "invalidate".
+    @event.listens_for(engine, "commit")
+    def release_after_commit(conn):
+        if not conn.invalidated:
+            writer.release(conn.info)
+    
+    @event.listens_for(engine, "rollback")
+    def release_after_rollback(conn):
+        if not conn.invalidated:
+            writer.release(conn.info)
+    
+    @event.listens_for(engine, "invalidate")
+    def release_on_invalidate(dbapi_connection, connection_record, exception):
+        writer.release(connection_record.info)
+    
+    # Por si la conexión vuelve al pool sin commit ni rollback explícitos.
+    @event.listens_for(engine, "checkin")
+    def release_on_checkin(dbapi_connection, connection_record):
+        writer.release(connection_record.info)
@@ -0,0 +1,110 @@
+import os
+import tempfile
+from datetime import datetime, timedelta
+from itertools import count
+
+# La aplicación lee la configuración al importarse: se usa una base de datos
+# SQLite temporal y una clave HS256 fija antes de importar cualquier módulo.
+_directory = tempfile.mkdtemp(prefix="tests-")
+os.environ["SQLALCHEMY_DATABASE_URL"] = f"sqlite:///{os.path.join(_directory, 'app.db')}"
+os.environ["SECRET_KEY"] = "test-secret-key-test-secret-key!"
+os.environ["ALGORITHM"] = "HS256"
+os.environ["TRACING_EXPORTER"] = "none"
+os.environ.pop("RATE_LIMIT_STORE_URL", None)
+
+import pytest
+from fastapi.testclient import TestClient
+
+from auth.token import create_access_token
+from sql import models
+from sql.database import SessionLocal, get_engine
+from sql.migrate import run_migrations
+
+_ids = count(1)
+
+@pytest.fixture(scope="session")
+def engine():
+    
+    run_migrations()
+    
+    return get_engine()
+
+# Sin el bloque "with" no se ejecuta el lifespan (calentamiento en segundo plano).
+@pytest.fixture(scope="session")
+def client(engine):
+    
+    from main import app
+    
+    return TestClient(app)
+
+def auth_headers(username: str, role: str):
+    return {"Authorization": f"Bearer {create_access_token(data={'username': username, 'role': role})}"}
+
+@pytest.fixture
+def db(engine):
+    
+    session = SessionLocal()
+    
+    try:
+        yield session
+    finally:
+        session.rollback()
+        session.close()
+
+# Crea un profesor, un estudiante inscrito en "courses" cursos con una tarea
+# activa cada uno y "notes" notas repartidas entre esas tareas.
+@pytest.fixture
+def make_student(db):
+    
+    def make(courses: int = 2, notes: int = 0):
+        
+        n = next(_ids)
+        
+        professor = models.Professor(username=f"professor-{n}", name=f"Professor {n}", full_name=f"Professor {n}",
+                                     phone_number=f"p{n}", password="x", profile_picture="", role="professor")
+        student = models.Student(username=f"student-{n}", name=f"Student {n}", full_name=f"Student {n}",
+                                 phone_number=f"s{n}", password=f"x-{n}", semester=1,
+                                 profile_picture=f"student-{n}.png", role="student")
+        db.add_all([professor, student])
+        db.flush()
+        
+        tasks = []
+        
+        for i in range(courses):
+            
+            course = models.Course(professor_id=professor.professor_id, name=f"course-{n}-{i}",
+                                   password=f"password-{n}-{i}", description="Course", semester=1,
+                                   program="program", profile_picture="")
+            db.add(course)
+            db.flush()
+            
+            task = models.Task(course_id=course.course_id, name=f"task-{n}-{i}", description="Task",
+                               start_date=datetime.utcnow(), end_date=datetime.utcnow() + timedelta(days=7),
+                               unique_filename=f"task-{n}-{i}", active=True)
+            db.add_all([task, models.Inscription(course_id=course.course_id, student_id=student.student_id)])
+            tasks.append(task)
+            
+        db.flush()
+        
+        for i in range(notes):
+            db.add(models.Note(note=i % 5, task_id=tasks[i % len(tasks)].task_id, student_id=student.student_id))
+            
+        db.commit()
+        
+        return student
+    
+    return make
+
+# Crea otro curso del profesor de un estudiante de make_student, sin inscribirlo.
+def add_course(db, student, prefix: str):
+    
+    professor_id = db.query(models.Course.professor_id).join(models.Inscription).filter(
+        models.Inscription.student_id == student.student_id
+    ).scalar()
+    course = models.Course(professor_id=professor_id, name=f"{prefix}-{student.username}",
+                           password=f"{prefix}-{student.username}", description="Course", semester=1,
+                           program="program", profile_picture="")
+    db.add(course)
+    db.commit()
+    
+    return course
@@ -0,0 +1,21 @@
+from conftest import auth_headers
+
+# Con un campo que solo tienen los estudiantes los profesores siguen apareciendo,
+# identificados por los campos comunes.
+def test_student_only_field_keeps_professors(client, db, make_student):
+    
+    make_student(courses=1)
+    db.commit()
+    
+    response = client.get("/admin/get-all-users", params={"fields": "semester"},
+                          headers=auth_headers("admin", "admin"))
+    
+    assert response.status_code == 200
+    
+    users = response.json()
+    professors = [user for user in users if user["role"] == "professor"]
+    students = [user for user in users if user["role"] == "student"]
+    
+    assert professors and students
+    assert all(set(user) == {"username", "role"} for user in professors)
+    assert all(set(user) == {"semester", "username", "role"} for user in students)
@@ -0,0 +1,131 @@
+import logging
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.schema import CreateTable
+
+from conftest import auth_headers
+from sql import models
+from sql.archive import archive_closed_courses
+from sql.migrations import ARCHIVED_TABLES, sqlite_autoincrement_ids
+from sql.sqlite import configure_sqlite
+
+def course_ids_of(db, student):
+    
+    return [course_id for course_id, in db.query(models.Inscription.course_id).filter(
+        models.Inscription.student_id == student.student_id
+    ).order_by(models.Inscription.course_id)]
+
+# Deja las tareas de los cursos inactivas y terminadas en 'end_date'.
+def close_courses(db, course_ids, end_date: datetime):
+    
+    db.query(models.Task).filter(models.Task.course_id.in_(course_ids)).update(
+        {models.Task.active: False, models.Task.end_date: end_date}, synchronize_session=False
+    )
+    db.commit()
+
+@pytest.fixture
+def archived(db, make_student, caplog):
+    
+    now = datetime.utcnow()
+    student = make_student(courses=3, notes=6)
+    closed = course_ids_of(db, student)
+    close_courses(db, closed, now - timedelta(days=30))
+    
+    # Un curso con tareas activas y otro que termina después del corte siguen vivos.
+    running = make_student(courses=2)
+    running_ids = course_ids_of(db, running)
+    close_courses(db, running_ids[1:], now + timedelta(days=30))
+    
+    with caplog.at_level(logging.INFO, logger="sql.archive"):
+        totals = archive_closed_courses(ended_before=now, batch_size=2)
+        
+    return {"student": student, "closed": closed, "running": running_ids, "totals": totals,
+            "batches": [record.args[0] for record in caplog.records if record.name == "sql.archive"]}
+
+def test_archive_moves_closed_courses_in_batches(db, archived):
+    
+    assert archived["batches"] == [2, 1]
+    assert archived["totals"] == {"courses": 3, "inscriptions": 3, "tasks": 3, "notes": 6}
+    
+    db.expire_all()
+    
+    assert db.query(models.Course).filter(models.Course.course_id.in_(archived["closed"])).count() == 0
+    assert db.query(models.ArchivedCourse).filter(
+        models.ArchivedCourse.course_id.in_(archived["closed"])
+    ).count() == 3
+    assert db.query(models.ArchivedNote).filter(models.ArchivedNote.student_id == archived["student"].student_id).count() == 6
+    assert db.query(models.Course).filter(models.Course.course_id.in_(archived["running"])).count() == 2
+
+def test_archive_refuses_future_cutoff():
+    
+    with pytest.raises(ValueError):
+        archive_closed_courses(ended_before=datetime.utcnow() + timedelta(days=1))
+
+def test_archive_endpoints_are_scoped_by_role(client, db, make_student, archived):
+    
+    student = archived["student"]
+    course_id = archived["closed"][0]
+    owner = auth_headers(student.username.replace("student", "professor"), "professor")
+    other = make_student(courses=1)
+    
+    for headers in (auth_headers(student.username, "student"), owner, auth_headers("admin", "admin")):
+        
+        listed = [course["course_id"] for course in client.get("/archive/courses", params={"limit": 200},
+                                                               headers=headers).json()]
+        
+        assert set(archived["closed"]) <= set(listed)
+        assert client.get(f"/archive/courses/{course_id}", headers=headers).status_code == 200
+        
+    outsiders = (auth_headers(other.username, "student"),
+                 auth_headers(other.username.replace("student", "professor"), "professor"))
+    
+    for headers in outsiders:
+        
+        listed = [course["course_id"] for course in client.get("/archive/courses", headers=headers).json()]
+        
+        assert not set(archived["closed"]) & set(listed)
+        assert client.get(f"/archive/courses/{course_id}", headers=headers).status_code == 403
+        
+    notes = client.get("/archive/notes", headers=auth_headers(student.username, "student"))
+    
+    assert len(notes.json()) == 6
+    assert client.get("/archive/notes", headers=owner).status_code == 403
+
+# Base de datos creada antes de AUTOINCREMENT: tras la migración un curso nuevo no
+# reutiliza el id de uno archivado.
+def test_migration_stops_sqlite_id_reuse(tmp_path):
+    
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    configure_sqlite(engine)
+    tables = [models.Professor.__table__, models.Student.__table__, *(table for pair in ARCHIVED_TABLES for table in pair)]
+    
+    with engine.begin() as connection:
+        
+        for table in tables:
+            connection.exec_driver_sql(str(CreateTable(table).compile(dialect=connection.dialect)).replace(" AUTOINCREMENT", ""))
+            
+        connection.exec_driver_sql("INSERT INTO professors (professor_id, username, name, full_name, phone_number, password, "
+                                   "profile_picture, role) VALUES (1, 'p', 'P', 'P', '1', 'x', '', 'professor')")
+        connection.exec_driver_sql("INSERT INTO courses (course_id, professor_id, name, password, description, semester, "
+                                   "program, profile_picture) VALUES (1, 1, 'live', 'a', 'd', 1, 'x', '')")
+        connection.exec_driver_sql("INSERT INTO archived_courses (course_id, professor_id, name, password, description, "
+                                   "semester, program, profile_picture, archived_at) "
+                                   "VALUES (2, 1, 'archived', 'b', 'd', 1, 'x', '', '2026-01-01')")
+        connection.exec_driver_sql("INSERT INTO tasks (task_id, course_id, name, description, start_date, end_date, "
+                                   "unique_filename, active) VALUES (1, 1, 't', 'd', '2026-01-01', '2026-01-02', 'f', 0)")
+        
+    with engine.begin() as connection:
+        sqlite_autoincrement_ids(connection)
+        
+    with engine.begin() as connection:
+        
+        connection.exec_driver_sql("INSERT INTO courses (professor_id, name, password, description, semester, program, "
+                                   "profile_picture) VALUES (1, 'new', 'c', 'd', 1, 'x', '')")
+        
+        assert connection.exec_driver_sql("SELECT course_id FROM courses WHERE name = 'new'").scalar() == 3
+        assert connection.exec_driver_sql("SELECT course_id FROM tasks").scalar() == 1
+        assert connection.exec_driver_sql("PRAGMA foreign_key_check").all() == []
+        
+    engine.dispose()
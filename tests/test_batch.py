@@ -0,0 +1,94 @@
+from itertools import count
+
+import pytest
+
+from conftest import add_course, auth_headers
+from events import broker
+from events.audit import audit_log
+from sql import models
+
+_ids = count(1)
+
+ADMIN = auth_headers("admin", "admin")
+
+def professor_body():
+    
+    n = next(_ids)
+    
+    return {"username": f"batch-professor-{n}", "name": "P", "full_name": f"Batch Professor {n}",
+            "phone_number": f"batch-{n}", "profile_picture": f"batch-{n}.png", "password": "pw"}
+
+# Registros de auditoría y eventos que llegan a emitirse.
+@pytest.fixture
+def emitted(monkeypatch):
+    
+    emitted = {"audit": [], "events": []}
+    monkeypatch.setattr(audit_log, "_enqueue", emitted["audit"].append)
+    monkeypatch.setattr(broker.broker, "publish", lambda channels, event: emitted["events"].append(event))
+    
+    return emitted
+
+@pytest.fixture
+def enrollment(db, make_student):
+    
+    student = make_student(courses=1)
+    course = add_course(db, student, "batch")
+    
+    return {"student_id": student.student_id, "course_id": course.course_id}
+
+def is_enrolled(db, enrollment) -> bool:
+    
+    db.expire_all()
+    
+    return db.query(models.Inscription).filter_by(**enrollment).first() is not None
+
+def professor_exists(db, username: str) -> bool:
+    
+    return db.query(models.Professor).filter_by(username=username).first() is not None
+
+def test_atomic_batch_commits_and_emits(client, db, enrollment, emitted):
+    
+    professor = professor_body()
+    
+    response = client.post("/batch", headers=ADMIN, json={"atomic": True, "requests": [
+        {"method": "POST", "path": "/admin/inscribe-student", "body": enrollment},
+        {"method": "POST", "path": "/admin/create-professor", "body": professor},
+    ]})
+    
+    assert response.json()["committed"] is True
+    assert is_enrolled(db, enrollment) and professor_exists(db, professor["username"])
+    assert [event["action"] for event in emitted["audit"]] == ["inscribe_student", "create_professor"]
+    assert [event["type"] for event in emitted["events"]] == ["inscription.created"]
+
+def test_failing_operation_rolls_back_atomic_batch(client, db, enrollment, emitted):
+    
+    professor = professor_body()
+    
+    response = client.post("/batch", headers=ADMIN, json={"atomic": True, "requests": [
+        {"method": "POST", "path": "/admin/inscribe-student", "body": enrollment},
+        {"method": "POST", "path": "/admin/create-professor", "body": professor},
+        {"method": "GET", "path": "/not-a-route"},
+        {"method": "POST", "path": "/admin/create-professor", "body": professor_body()},
+    ]})
+    
+    assert response.status_code == 200
+    assert response.json()["committed"] is False
+    assert [result["status"] for result in response.json()["responses"]] == [200, 200, 404, 424]
+    assert not is_enrolled(db, enrollment)
+    assert not professor_exists(db, professor["username"])
+    
+    # Nada de lo que hicieron las operaciones anteriores al fallo llega a emitirse.
+    assert emitted == {"audit": [], "events": []}
+
+def test_independent_batch_keeps_successful_operations(client, db):
+    
+    first, second = professor_body(), professor_body()
+    
+    response = client.post("/batch", headers=ADMIN, json={"requests": [
+        {"method": "POST", "path": "/admin/create-professor", "body": first},
+        {"method": "POST", "path": "/admin/create-professor", "body": first},
+        {"method": "POST", "path": "/admin/create-professor", "body": second},
+    ]})
+    
+    assert [result["status"] for result in response.json()["responses"]] == [200, 409, 200]
+    assert professor_exists(db, first["username"]) and professor_exists(db, second["username"])
@@ -0,0 +1,41 @@
+import pytest
+
+from conftest import auth_headers
+from config import settings
+from middleware.loadshedding import LoadSheddingMiddleware
+
+ORIGIN = settings.origins[0]
+
+# Sin hueco en ningún carril: toda petición que llega al control de carga recibe 503.
+@pytest.fixture
+def overloaded(client, monkeypatch):
+    
+    client.get("/ready")
+    monkeypatch.setattr(settings, "load_shedding_lanes", {
+        lane: {"max_in_flight": 0, "max_queue": 0} for lane in settings.load_shedding_lanes
+    })
+    
+    layer = client.app.middleware_stack
+    
+    while not isinstance(layer, LoadSheddingMiddleware):
+        layer = layer.app
+        
+    monkeypatch.setattr(layer, "_loop", None)
+
+def test_shed_response_carries_cors_headers(client, overloaded):
+    
+    response = client.get("/student/get-courses", headers={"Origin": ORIGIN, **auth_headers("someone", "student")})
+    
+    assert response.status_code == 503
+    assert response.headers["access-control-allow-origin"] == ORIGIN
+    assert "retry-after" in response.headers["access-control-expose-headers"].lower()
+
+def test_preflight_does_not_take_a_lane_slot(client, overloaded):
+    
+    response = client.options("/student/get-courses", headers={
+        "Origin": ORIGIN,
+        "Access-Control-Request-Method": "GET",
+    })
+    
+    assert response.status_code == 200
+    assert response.headers["access-control-allow-origin"] == ORIGIN
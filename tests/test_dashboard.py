@@ -0,0 +1,30 @@
+from monitoring.queries import count_queries
+from sql import crud
+
+def test_dashboard_query_count_does_not_grow_with_courses(engine, db, make_student):
+    
+    few = make_student(courses=1, notes=2).username
+    many = make_student(courses=6, notes=30).username
+    
+    with count_queries(engine) as few_queries:
+        crud.get_student_dashboard(db=db, student_username=few)
+    
+    db.expire_all()
+    
+    with count_queries(engine) as many_queries:
+        crud.get_student_dashboard(db=db, student_username=many)
+    
+    assert few_queries.count == many_queries.count == 4
+
+def test_dashboard_limits_notes_in_sql(engine, db, make_student):
+    
+    username = make_student(courses=3, notes=25).username
+    
+    with count_queries(engine) as counter:
+        dashboard = crud.get_student_dashboard(db=db, student_username=username, notes_limit=10)
+    
+    note_ids = [note["note_id"] for note in dashboard["recent_notes"]]
+    
+    assert len(note_ids) == 10
+    assert note_ids == sorted(note_ids, reverse=True)
+    assert any("FROM notes" in statement and "LIMIT" in statement for statement in counter.statements)
@@ -0,0 +1,29 @@
+from conftest import add_course, auth_headers
+from sql import crud, schemes
+
+def test_conditional_get(client, db, make_student):
+    
+    student = make_student(courses=1)
+    headers = auth_headers(student.username, "student")
+    
+    first = client.get("/student/get-courses", headers=headers)
+    etag = first.headers["ETag"]
+    
+    cached = client.get("/student/get-courses", headers={**headers, "If-None-Match": etag})
+    
+    assert cached.status_code == 304
+    assert cached.headers["ETag"] == etag
+    assert cached.content == b""
+    
+    # Las listas de If-None-Match y los ETag débiles también coinciden.
+    assert client.get("/student/get-courses", headers={**headers, "If-None-Match": f'"other", W/{etag}'}).status_code == 304
+    
+    course = add_course(db, student, "etag")
+    crud.create_inscription(db=db, inscription=schemes.InscriptionCreate(course_id=course.course_id,
+                                                                         student_id=student.student_id))
+    
+    changed = client.get("/student/get-courses", headers={**headers, "If-None-Match": etag})
+    
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert len(changed.json()) == len(first.json()) + 1
@@ -0,0 +1,24 @@
+import pytest
+from fastapi import HTTPException
+
+from conftest import auth_headers
+from apirouters.apievents import redeem_ticket
+
+def test_stream_ticket_is_single_use(client):
+    
+    response = client.post("/events/ticket", headers=auth_headers("ticket-student", "student"))
+    ticket = response.json()["ticket"]
+    
+    assert redeem_ticket(ticket)["username"] == "ticket-student"
+    
+    with pytest.raises(HTTPException) as error:
+        redeem_ticket(ticket)
+        
+    assert error.value.status_code == 401
+    assert client.get("/events/stream", params={"ticket": ticket}).status_code == 401
+
+def test_access_token_is_not_a_ticket(client):
+    
+    token = auth_headers("ticket-student", "student")["Authorization"].removeprefix("Bearer ")
+    
+    assert client.get("/events/stream", params={"ticket": token}).status_code == 401
@@ -0,0 +1,98 @@
+import asyncio
+
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from config import settings
+from middleware.idempotency import IdempotencyMiddleware, IdempotencyStore
+
+# Aplicación mínima detrás del middleware: cuenta cuántas veces se ejecuta cada ruta.
+@pytest.fixture
+def app(monkeypatch):
+    
+    monkeypatch.setattr(settings, "idempotent_routes", {"/create", "/flaky"})
+    calls = {"/create": 0, "/flaky": 0}
+    
+    async def create(request: Request):
+        
+        calls["/create"] += 1
+        body = await request.json()
+        await asyncio.sleep(0.05)
+        
+        return JSONResponse({"call": calls["/create"], **body}, status_code=201)
+    
+    async def flaky(request: Request):
+        
+        calls["/flaky"] += 1
+        
+        return JSONResponse({"call": calls["/flaky"]}, status_code=503 if calls["/flaky"] == 1 else 200)
+    
+    app = IdempotencyMiddleware(Starlette(routes=[Route("/create", create, methods=["POST"]),
+                                                  Route("/flaky", flaky, methods=["POST"])]))
+    app.calls = calls
+    
+    return app
+
+def run(app, *requests):
+    
+    async def send_all():
+        
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await asyncio.gather(*(client.post(path, json=body, headers={"Idempotency-Key": key})
+                                          for path, key, body in requests))
+    
+    return asyncio.run(send_all())
+
+def test_retry_replays_stored_response(app):
+    
+    first, = run(app, ("/create", "k1", {"name": "a"}))
+    second, = run(app, ("/create", "k1", {"name": "a"}))
+    
+    assert app.calls["/create"] == 1
+    assert second.status_code == first.status_code == 201
+    assert second.content == first.content
+    assert second.headers["idempotent-replayed"] == "true"
+
+def test_same_key_with_different_body_is_rejected(app):
+    
+    run(app, ("/create", "k2", {"name": "a"}))
+    response, = run(app, ("/create", "k2", {"name": "b"}))
+    
+    assert response.status_code == 422
+    assert app.calls["/create"] == 1
+
+def test_concurrent_duplicate_waits_for_original(app):
+    
+    first, second = run(app, ("/create", "k3", {"name": "a"}), ("/create", "k3", {"name": "a"}))
+    
+    assert app.calls["/create"] == 1
+    assert first.content == second.content
+    assert "idempotent-replayed" in second.headers
+
+def test_server_errors_are_not_stored(app):
+    
+    first, = run(app, ("/flaky", "k4", {}))
+    second, = run(app, ("/flaky", "k4", {}))
+    
+    assert (first.status_code, second.status_code) == (503, 200)
+    assert app.calls["/flaky"] == 2
+    assert "idempotent-replayed" not in second.headers
+
+def test_store_evicts_finished_entries_past_in_flight_ones(monkeypatch):
+    
+    monkeypatch.setattr(settings, "idempotency_max_entries", 2)
+    store = IdempotencyStore()
+    
+    in_flight = store.start("a", "a")
+    store.start("b", "b").done.set()
+    
+    assert store.start("c", "c") is not None
+    assert store.get("a") is in_flight
+    assert store.get("b") is None
+    
+    # Con todas las entradas en curso no se admiten claves nuevas.
+    assert store.start("d", "d") is None
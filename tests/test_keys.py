@@ -0,0 +1,62 @@
+import sys
+
+import pytest
+from jose import JWTError
+
+import auth.token
+from auth import keys
+from auth.keys import KeyRing
+from config import settings
+
+# Ejecuta la CLI de auth.keys sobre el directorio del test.
+@pytest.fixture
+def manage(tmp_path, monkeypatch):
+    
+    monkeypatch.setattr(keys, "JWT_KEYS_DIR", str(tmp_path))
+    monkeypatch.setattr(keys, "JWT_ACTIVE_KID", None)
+    monkeypatch.setattr(settings, "jwt_keys_reload_interval", 0)
+    
+    def manage(command: str, kid: str):
+        
+        algorithm = [] if command == "activate" else ["--algorithm", "ES256"]
+        monkeypatch.setattr(sys, "argv", ["auth.keys", command, "--kid", kid, *algorithm])
+        keys.main()
+        
+    return manage
+
+def test_rotation_keeps_retired_key_verifiable(tmp_path, manage, client, monkeypatch):
+    
+    ring = KeyRing(algorithm="ES256", keys_dir=str(tmp_path))
+    
+    manage("generate", "first")
+    old_token = ring.encode({"username": "someone"})
+    
+    # Una clave nueva solo se publica; se firma con ella al activarla.
+    manage("generate", "second")
+    
+    assert ring.decode(ring.encode({"username": "someone"})) == {"username": "someone"}
+    assert keys.jwt.get_unverified_header(ring.encode({})).get("kid") == "first"
+    
+    manage("activate", "second")
+    manage("retire", "first")
+    
+    assert keys.jwt.get_unverified_header(ring.encode({})).get("kid") == "second"
+    assert ring.decode(old_token) == {"username": "someone"}
+    
+    monkeypatch.setattr(auth.token, "key_ring", ring)
+    jwks = client.get("/.well-known/jwks.json").json()
+    
+    assert sorted(key["kid"] for key in jwks["keys"]) == ["first", "second"]
+    
+    # Al dejar de publicar la clave retirada sus tokens ya no son válidos.
+    (tmp_path / "first.pub.pem").unlink()
+    
+    with pytest.raises(JWTError):
+        ring.decode(old_token)
+
+def test_missing_key_directory_is_an_error(tmp_path):
+    
+    ring = KeyRing(algorithm="ES256", keys_dir=str(tmp_path / "missing"))
+    
+    with pytest.raises(RuntimeError, match="does not exist"):
+        ring.encode({"username": "someone"})
@@ -0,0 +1,36 @@
+import pytest
+
+from config import settings
+from monitoring.queries import query_budget
+from sql import models
+from conftest import auth_headers
+
+@pytest.mark.parametrize("route", ["/student/dashboard", "/student/get-courses"])
+def test_student_routes_stay_within_query_budget(route, engine, client, make_student):
+    
+    username = make_student(courses=5, notes=20).username
+    headers = auth_headers(username, "student")
+    
+    # La primera petición sincroniza los tokens revocados y calienta las cachés.
+    client.get(route, headers=headers)
+    
+    with query_budget(engine, settings.query_budgets[route]):
+        response = client.get(route, headers=headers)
+    
+    assert response.status_code == 200
+
+def test_professor_courses_stay_within_query_budget(engine, db, client, make_student):
+    
+    student = make_student(courses=5)
+    professor = db.query(models.Professor.username).join(models.Course).join(models.Inscription).filter(
+        models.Inscription.student_id == student.student_id
+    ).first()[0]
+    headers = auth_headers(professor, "professor")
+    
+    client.get("/professor/get-courses", headers=headers)
+    
+    with query_budget(engine, settings.query_budgets["/professor/get-courses"]):
+        response = client.get("/professor/get-courses", headers=headers)
+    
+    assert response.status_code == 200
+    assert len(response.json()) == 5
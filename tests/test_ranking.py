@@ -0,0 +1,15 @@
+from sql import crud, models, schemes
+
+def test_new_note_invalidates_cached_ranking(db, make_student):
+    
+    student = make_student(courses=1, notes=1)
+    task_id = db.query(models.Note.task_id).filter(models.Note.student_id == student.student_id).scalar()
+    
+    assert len(crud.get_task_ranking(db=db, task_id=task_id)["entries"]) == 1
+    
+    other = make_student(courses=1)
+    db.add(models.Inscription(course_id=db.get(models.Task, task_id).course_id, student_id=other.student_id))
+    db.commit()
+    crud.create_note(db=db, note=schemes.NoteCreate(note=4, task_id=task_id, student_id=other.student_id))
+    
+    assert len(crud.get_task_ranking(db=db, task_id=task_id)["entries"]) == 2
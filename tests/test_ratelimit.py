@@ -0,0 +1,140 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from conftest import auth_headers
+from config import settings
+from middleware import ratelimit
+from middleware.ratelimit import MemoryRateLimitStore, RateLimitMiddleware
+
+class Clock:
+    
+    def __init__(self, now: float):
+        self.now = now
+        
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    
+    clock = Clock(1000.0)
+    monkeypatch.setattr(ratelimit, "time", clock)
+    
+    return clock
+
+def hit(store, key: str, limit: int, window: float):
+    return asyncio.run(store.hit(key, limit, window))
+
+async def echo(request: Request):
+    
+    form = await request.form()
+    
+    return JSONResponse({"username": form.get("username")})
+
+# Aplicación mínima detrás del limitador, con un almacén en memoria nuevo en cada test.
+def limited_client(monkeypatch, rules: dict) -> TestClient:
+    
+    monkeypatch.setattr(settings, "rate_limits", rules)
+    app = Starlette(routes=[Route("/limited", echo, methods=["GET", "POST"]),
+                            Route("/token", echo, methods=["POST"])])
+    
+    return TestClient(RateLimitMiddleware(app, store=MemoryRateLimitStore()))
+
+def test_memory_store_sliding_window(clock):
+    
+    store = MemoryRateLimitStore()
+    
+    first = hit(store, "key", 2, 10)
+    second = hit(store, "key", 2, 10)
+    third = hit(store, "key", 2, 10)
+    
+    assert (first.allowed, first.remaining, first.reset) == (True, 1, 10)
+    assert (second.allowed, second.remaining) == (True, 0)
+    assert (third.allowed, third.retry_after) == (False, 10)
+    
+    # A mitad de la ventana siguiente las 2 peticiones anteriores cuentan como 1.
+    clock.now += 15
+    fourth = hit(store, "key", 2, 10)
+    fifth = hit(store, "key", 2, 10)
+    
+    assert (fourth.allowed, fourth.remaining, fourth.reset) == (True, 0, 5)
+    assert (fifth.allowed, fifth.retry_after) == (False, 1)
+    
+    # Dos ventanas después ya no queda nada de las anteriores.
+    clock.now += 20
+    
+    assert hit(store, "key", 2, 10).remaining == 1
+
+def test_rejected_requests_do_not_count(clock):
+    
+    store = MemoryRateLimitStore()
+    
+    assert [hit(store, "key", 1, 10).allowed for _ in range(5)] == [True, False, False, False, False]
+    
+    # Los rechazos no alargan el bloqueo: tras la ventana siguiente vuelve a admitir.
+    clock.now += 20
+    
+    assert hit(store, "key", 1, 10).allowed
+
+def test_limit_per_role(monkeypatch):
+    
+    client = limited_client(monkeypatch, {
+        "/limited": [{"key": "user", "limit": 1, "window": 60, "roles": {"admin": 3}}],
+    })
+    student = auth_headers("limited-student", "student")
+    admin = auth_headers("limited-admin", "admin")
+    
+    assert [client.get("/limited", headers=student).status_code for _ in range(2)] == [200, 429]
+    assert [client.get("/limited", headers=admin).status_code for _ in range(4)] == [200, 200, 200, 429]
+
+def test_token_limit_uses_form_username(monkeypatch):
+    
+    client = limited_client(monkeypatch, {"/token": [{"key": "user", "limit": 1, "window": 60}]})
+    
+    first = client.post("/token", data={"username": "alice", "password": "x"})
+    
+    # El formulario se lee en el middleware y llega intacto al handler.
+    assert first.status_code == 200
+    assert first.json() == {"username": "alice"}
+    assert client.post("/token", data={"username": "alice", "password": "y"}).status_code == 429
+    assert client.post("/token", data={"username": "bob", "password": "x"}).status_code == 200
+
+def test_rate_limit_headers(monkeypatch):
+    
+    client = limited_client(monkeypatch, {"/limited": [{"key": "ip", "limit": 2, "window": 60}]})
+    
+    allowed = client.get("/limited")
+    client.get("/limited")
+    rejected = client.get("/limited")
+    
+    assert allowed.headers["ratelimit-limit"] == "2"
+    assert allowed.headers["ratelimit-remaining"] == "1"
+    assert 0 < int(allowed.headers["ratelimit-reset"]) <= 60
+    assert rejected.status_code == 429
+    assert rejected.headers["ratelimit-remaining"] == "0"
+    assert int(rejected.headers["retry-after"]) >= 1
+
+# En la aplicación completa el 429 sale con las cabeceras de CORS y los preflight no
+# consumen cupo del limitador.
+def test_rate_limited_response_reaches_browsers(client, monkeypatch):
+    
+    monkeypatch.setattr(settings, "rate_limits", {"/limited-by-cors-test": [{"key": "ip", "limit": 1, "window": 60}]})
+    origin = {"Origin": settings.origins[0]}
+    
+    for _ in range(3):
+        preflight = client.options("/limited-by-cors-test", headers={**origin, "Access-Control-Request-Method": "GET"})
+        assert preflight.status_code == 200
+        
+    assert client.get("/limited-by-cors-test", headers=origin).status_code == 404
+    
+    rejected = client.get("/limited-by-cors-test", headers=origin)
+    
+    assert rejected.status_code == 429
+    assert rejected.headers["access-control-allow-origin"] == settings.origins[0]
+    assert "ratelimit-remaining" in rejected.headers["access-control-expose-headers"].lower()
@@ -0,0 +1,23 @@
+from conftest import add_course, auth_headers
+from sql import crud, schemes
+from sql.cache import read_coalescer
+
+# Otro worker no ve el read_coalescer.clear() del commit: el resultado compartido
+# no debe servirse con el ETag posterior a la escritura.
+def test_coalesced_body_matches_etag_after_write(client, db, make_student, monkeypatch):
+    
+    student = make_student(courses=1)
+    headers = auth_headers(student.username, "student")
+    
+    first = client.get("/student/get-courses", headers=headers)
+    
+    monkeypatch.setattr(read_coalescer, "clear", lambda: None)
+    
+    course = add_course(db, student, "extra")
+    crud.create_inscription(db=db, inscription=schemes.InscriptionCreate(course_id=course.course_id,
+                                                                         student_id=student.student_id))
+    
+    second = client.get("/student/get-courses", headers=headers)
+    
+    assert second.headers["ETag"] != first.headers["ETag"]
+    assert len(second.json()) == len(first.json()) + 1
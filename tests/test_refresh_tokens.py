@@ -0,0 +1,20 @@
+from auth.keys import key_ring
+from auth.revocation import revocation_store
+from auth.token import create_token_pair
+
+def test_refresh_token_reused_in_another_worker_revokes_family(client, make_student):
+    
+    username = make_student(courses=0).username
+    refresh_token = create_token_pair(username=username, role="student")["refresh_token"]
+    
+    first = client.post("/token/refresh", json={"refresh_token": refresh_token})
+    assert first.status_code == 200
+    
+    # Otro worker todavía no ha sincronizado la revocación del primer uso.
+    revocation_store._revoked.pop(key_ring.decode(refresh_token)["jti"])
+    
+    replay = client.post("/token/refresh", json={"refresh_token": refresh_token})
+    assert replay.status_code == 401
+    
+    headers = {"Authorization": f"Bearer {first.json()['access_token']}"}
+    assert client.get("/student/get-student", headers=headers).status_code == 401
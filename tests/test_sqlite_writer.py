@@ -0,0 +1,104 @@
+import os
+import tempfile
+import threading
+import time
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from sql.sqlite import configure_sqlite, writer_owner
+
+@pytest.fixture
+def engine():
+    
+    engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='writer-'), 'writer.db')}")
+    configure_sqlite(engine, single_writer=True)
+    
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE items (value INTEGER)"))
+        
+    yield engine
+    
+    engine.dispose()
+
+def writer_is_free(engine) -> bool:
+    return not engine._sqlite_writer._lock.locked()
+
+def test_second_writer_waits_for_first_commit(engine):
+    
+    written = threading.Event()
+    order = []
+    
+    def first():
+        
+        with engine.begin() as connection:
+            connection.execute(text("INSERT INTO items VALUES (1)"))
+            written.set()
+            time.sleep(0.2)
+            order.append("first commit")
+            
+    def second():
+        
+        written.wait()
+        
+        with engine.begin() as connection:
+            connection.execute(text("INSERT INTO items VALUES (2)"))
+            order.append("second write")
+            
+    threads = [threading.Thread(target=first), threading.Thread(target=second)]
+    
+    for thread in threads:
+        thread.start()
+        
+    for thread in threads:
+        thread.join()
+        
+    assert order == ["first commit", "second write"]
+    assert writer_is_free(engine)
+
+def test_rollback_releases_writer(engine):
+    
+    with engine.connect() as connection:
+        connection.execute(text("INSERT INTO items VALUES (1)"))
+        assert not writer_is_free(engine)
+        connection.rollback()
+        
+    assert writer_is_free(engine)
+
+def test_invalidated_connection_releases_writer(engine):
+    
+    connection = engine.connect()
+    connection.execute(text("INSERT INTO items VALUES (1)"))
+    connection.invalidate()
+    
+    assert writer_is_free(engine)
+    
+    # Cerrar una conexión invalidada no lee su 'info' y no falla.
+    connection.close()
+    
+    with engine.begin() as other:
+        other.execute(text("INSERT INTO items VALUES (2)"))
+        
+    assert writer_is_free(engine)
+
+def test_second_connection_in_batch_flow_fails_fast(engine):
+    
+    batch = engine.connect()
+    batch.execute(text("INSERT INTO items VALUES (1)"))
+    token = writer_owner.set(batch.info)
+    
+    try:
+        
+        start = time.perf_counter()
+        
+        with pytest.raises(RuntimeError), engine.begin() as other:
+            other.execute(text("INSERT INTO items VALUES (2)"))
+            
+        assert time.perf_counter() - start < 1
+        
+    finally:
+        writer_owner.reset(token)
+        batch.commit()
+        batch.close()
+        
+    assert writer_is_free(engine)